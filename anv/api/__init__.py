@@ -0,0 +1,14 @@
+import requests
+from requests import adapters
+
+# host 별 keep-alive connection 수. 여러 요청의 조회 thread 가 같은 client 를 공유하므로 넉넉하게
+HTTP_POOL_SIZE = 32
+
+
+def create_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """client 마다 하나를 만들어 재사용하는 session. connection 을 요청 간에 재사용한다."""
+    session = requests.Session()
+    adapter = adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
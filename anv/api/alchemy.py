@@ -3,7 +3,7 @@ import os
 import enum
 from typing import List, Optional
 import pydantic
-import requests
+from anv import api, timeouts
 from anv.models import Chain, NftMetadata, NftAttribute
 
 log = logging.getLogger(f"anv.{__name__}")
@@ -59,11 +59,19 @@ class AlchemyApi:
             AlchemyNet.PolygonMainNet: Chain.POLYGON.value,
             AlchemyNet.PolygonMumbaiNet: Chain.POLYGON_MUMBAI.value,
         }
+        self.session = api.create_session()
+
+    def close(self):
+        self.session.close()
 
     def get_NFTs(
-        self, network: AlchemyNet, owner: str, cursor: str = None
+        self,
+        network: AlchemyNet,
+        owner: str,
+        cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> AlchemyOwnedNftResult:
-        result = self.get_NFTs_raw(network, owner, cursor)
+        result = self.get_NFTs_raw(network, owner, cursor, deadline)
         return AlchemyOwnedNftResult(
             cursor=result.get("pageKey"),
             owned_nfts=[
@@ -76,7 +84,13 @@ class AlchemyApi:
             ],
         )
 
-    def get_NFTs_raw(self, network: AlchemyNet, owner: str, cursor: str = None):
+    def get_NFTs_raw(
+        self,
+        network: AlchemyNet,
+        owner: str,
+        cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
+    ):
         """
         https://docs.alchemy.com/reference/getnfts
 
@@ -106,14 +120,25 @@ class AlchemyApi:
             "pageSize": PAGE_SIZE,
         }
         url = f"https://{network.value}.g.alchemy.com/nft/v2/{self.api_key[network]}/getNFTs"
-        r = requests.get(url, params=params, headers=headers)
+        r = self.session.get(
+            url,
+            params=params,
+            headers=headers,
+            timeout=timeouts.get_timeout(deadline),
+        )
         r.raise_for_status()
         return r.json()
 
     def get_NFT_metadata(
-        self, network: AlchemyNet, contract_address: str, token_id: str
+        self,
+        network: AlchemyNet,
+        contract_address: str,
+        token_id: str,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> NftMetadata:
-        result = self.get_NFT_metadata_raw(network, contract_address, token_id)
+        result = self.get_NFT_metadata_raw(
+            network, contract_address, token_id, deadline
+        )
 
         error = result.get("error", None)
         if error is not None:
@@ -188,7 +213,11 @@ class AlchemyApi:
         )
 
     def get_NFT_metadata_raw(
-        self, network: AlchemyNet, contract_address: str, token_id: str
+        self,
+        network: AlchemyNet,
+        contract_address: str,
+        token_id: str,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         """
         https://docs.alchemy.com/reference/getnftmetadata
@@ -249,7 +278,12 @@ class AlchemyApi:
         headers = {"accept": "application/json"}
         params = {"contractAddress": contract_address, "tokenId": token_id}
         url = f"https://{network.value}.g.alchemy.com/nft/v2/{self.api_key[network]}/getNFTMetadata"
-        r = requests.get(url, params=params, headers=headers)
+        r = self.session.get(
+            url,
+            params=params,
+            headers=headers,
+            timeout=timeouts.get_timeout(deadline),
+        )
         r.raise_for_status()
         return r.json()
 
@@ -265,7 +299,9 @@ class AlchemyApi:
         params = {"contractAddress": contract_address}
         url = f"https://{network.value}.g.alchemy.com/nft/v2/{self.api_key[network]}/getContractMetadata"
 
-        r = requests.get(url, params=params, headers=headers)
+        r = self.session.get(
+            url, params=params, headers=headers, timeout=timeouts.DEFAULT_TIMEOUT
+        )
         r.raise_for_status()
         return r.json()
 
@@ -287,6 +323,8 @@ class AlchemyApi:
         }
         url = f"https://{network.value}.g.alchemy.com/nft/v2/{self.api_key[network]}/getContractsForOwner"
 
-        r = requests.get(url, params=params, headers=headers)
+        r = self.session.get(
+            url, params=params, headers=headers, timeout=timeouts.DEFAULT_TIMEOUT
+        )
         r.raise_for_status()
         return r.json()
@@ -3,12 +3,17 @@ import logging
 import pathlib
 import io
 import tempfile
+from typing import Optional
 from urllib.parse import urljoin
 
 import requests
 
+from anv import api, timeouts
+
 log = logging.getLogger(f"anv.{__name__}")
 
+GATEWAY_TIMEOUT = 1  # gateway 하나의 timeout (seconds)
+
 
 class IPFSError(Exception):
     pass
@@ -18,6 +23,10 @@ class IPFSDownloadError(IPFSError):
     pass
 
 
+class IPFSTimeoutError(IPFSError):
+    """모든 gateway 가 timeout. gateway 가 느린 경우이므로 실패한 uri 로 기록하지 않는다."""
+
+
 class IPFSProxy:
     def __init__(self):
         self.gp_urls = [
@@ -26,41 +35,79 @@ class IPFSProxy:
             "https://gateway.ipfs.io/ipfs/",
             "https://cloudflare-ipfs.com/ipfs/",
         ]
+        self.session = api.create_session()
 
-    def get_json(self, ipfs_uri: str) -> dict:
-        with io.BytesIO() as buffer:
-            self.get_ipfs_binary(ipfs_uri, buffer)
-            buffer.seek(0)
-            data = buffer.read()
-            return json.loads(data)
+    def close(self):
+        self.session.close()
 
-    def get_ipfs_binary(self, ipfs_uri: str, buffer: io.BytesIO) -> io.BytesIO:
+    def get_json(
+        self, ipfs_uri: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> dict:
+        return json.loads(self.get_bytes(ipfs_uri, deadline))
+
+    def get_bytes(
+        self, ipfs_uri: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> bytes:
+        with io.BytesIO() as buffer:
+            self.get_ipfs_binary(ipfs_uri, buffer, deadline)
+            return buffer.getvalue()
+
+    def get_ipfs_binary(
+        self,
+        ipfs_uri: str,
+        buffer: io.BytesIO,
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> io.BytesIO:
         from_ipfs = ipfs_uri.replace("ipfs://", "")
         download_urls = [urljoin(gateway, from_ipfs) for gateway in self.gp_urls]
 
+        timed_out = True
         for url in download_urls:
             try:
-                return self._get_binaray(url, buffer)
+                return self._get_binaray(url, buffer, deadline)
+            except timeouts.DeadlineExceeded:
+                buffer.seek(0)
+                buffer.truncate(0)
+                raise
             except Exception as e:
                 # 예외발생 시 buffer 비움
                 buffer.seek(0)
                 buffer.truncate(0)
                 log.warning("ipfs download error. %s", e)
+                if not isinstance(e, requests.exceptions.Timeout):
+                    timed_out = False
 
+        if timed_out:
+            raise IPFSTimeoutError("ipfs download timeout.", ipfs_uri)
         raise IPFSDownloadError("ipfs download error.", ipfs_uri)
 
-    def get_binary_from_http_url(self, url: str, buffer: io.BytesIO):
+    def get_binary_from_http_url(
+        self,
+        url: str,
+        buffer: io.BytesIO,
+        deadline: Optional[timeouts.Deadline] = None,
+    ):
         _, path = url.split("ipfs/")
         ipfs_url = f"ipfs://{path}"
-        return self.get_ipfs_binary(ipfs_url, buffer)
-
-    def _get_binaray(self, url: str, buffer: io.BytesIO) -> io.BytesIO:
+        return self.get_ipfs_binary(ipfs_url, buffer, deadline)
+
+    def _get_binaray(
+        self,
+        url: str,
+        buffer: io.BytesIO,
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> io.BytesIO:
         url = self._fix_url(url)
         log.debug("downloading... url=%s", url)
-        r = requests.get(url, timeout=1)
+        r = self.session.get(
+            url, timeout=timeouts.get_timeout(deadline, GATEWAY_TIMEOUT)
+        )
         r.raise_for_status()
 
         for chunk in r.iter_content(1024 * 1024):
+            # requests timeout 은 전체 다운로드 시간을 제한하지 않으므로 chunk 마다 확인
+            if deadline is not None:
+                deadline.check()
             buffer.write(chunk)
         log.debug("download done... url=%s", url)
         return buffer
@@ -3,12 +3,16 @@ import json
 import logging
 import os
 import pathlib
+import time
 from typing import Iterable, List, Literal, Optional, TypedDict
 
 import pydantic
 import requests
 
+from anv import api, timeouts
+
 PAGE_SIZE = 20
+TRANSFER_HISTORY_PAGE_SIZE = 1000
 
 log = logging.getLogger(f"anv.{__name__}")
 
@@ -43,6 +47,12 @@ class KlaytnTransferHistory(pydantic.BaseModel):
     from_address: str
     to_address: str
     token_id: str
+    timestamp: Optional[int]  # transaction 의 block 시각 (unix seconds)
+
+
+class KlaytnTransferHistoryResult(pydantic.BaseModel):
+    cursor: Optional[str]
+    transfer_history: List[KlaytnTransferHistory]
 
 
 class KlaytnOwnedNft(pydantic.BaseModel):
@@ -93,8 +103,18 @@ class KasApi:
             self.access_key_id = os.getenv("KAS_ACCESS_KEY_ID")
             self.authorization = os.getenv("KAS_AUTHORIZATION")
             self.secret_access_key = os.getenv("KAS_SECRET_ACCESS_KEY")
+        self.session = api.create_session()
+        self.session.auth = (self.access_key_id, self.secret_access_key)
+
+    def close(self):
+        self.session.close()
 
-    def get_nft_contract_raw(self, chain_id: ChainId, nft_contract: str):
+    def get_nft_contract_raw(
+        self,
+        chain_id: ChainId,
+        nft_contract: str,
+        deadline: Optional[timeouts.Deadline] = None,
+    ):
         """curl --location --request GET "https://th-api.klaytnapi.com/v2/contract/nft/0x90d535c434e967ec6e9accb0de5dcb34010865e0" \
             --header "x-chain-id: {chain-id}" \
             -u {access-key-id}:{secret-access-key}"""
@@ -102,13 +122,24 @@ class KasApi:
         headers = {"x-chain-id": chain_id.value}
         url = f"https://th-api.klaytnapi.com/v2/contract/nft/{nft_contract}"
 
-        return self._kas_api_request("get", url, headers=headers)
+        return self._kas_api_request("get", url, headers=headers, deadline=deadline)
 
     def get_nft_transfer_history_by_owner(
-        self, chain_id: ChainId, owner: str
-    ) -> List[KlaytnTransferHistory]:
+        self,
+        chain_id: ChainId,
+        owner: str,
+        since: Optional[int] = None,
+        cursor: Optional[str] = None,
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> KlaytnTransferHistoryResult:
+        """owner 의 nft, mt 전송 기록 1 page. since(unix seconds) 가 있으면 그 이후 기록만 조회"""
         result = self.get_transfer_history_by_account_raw(
-            chain_id, owner, (TokenKind.NFT,)
+            chain_id,
+            owner,
+            (TokenKind.NFT, TokenKind.MT),
+            time_range=f"{since},{int(time.time())}" if since is not None else None,
+            cursor=cursor,
+            deadline=deadline,
         )
         transfer_history = []
         for item in result["items"]:
@@ -123,17 +154,27 @@ class KasApi:
                 token_id=item["tokenId"],
                 from_address=item["from"],
                 to_address=item["to"],
+                timestamp=item.get("transaction", {}).get("timestamp"),
             )
             transfer_history.append(history)
-        return transfer_history
+        return KlaytnTransferHistoryResult(
+            cursor=result.get("cursor") or None, transfer_history=transfer_history
+        )
 
     def get_transfer_history_by_account_raw(
-        self, chain_id: ChainId, owner: str, kind: Iterable[TokenKind]
+        self,
+        chain_id: ChainId,
+        owner: str,
+        kind: Iterable[TokenKind],
+        time_range: Optional[str] = None,
+        cursor: Optional[str] = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         """
         https://docs.klaytnapi.com/tutorial/token-history-api/th-api-token-history
 
         특정 EOA가 토큰을 주고 받은 기록을 조회합니다.
+        time_range 는 "시작,끝" 형식의 unix seconds 또는 block number 범위.
 
         curl --location --request GET "https://th-api.klaytnapi.com/v2/transfer/account/0xc060632ad88d0dec2bbc44bbea9d4c48c2ead48f?kind=klay,ft,nft&range=1592360291,15991809920" \
             --header "x-chain-id: {chain-id}" \
@@ -141,10 +182,17 @@ class KasApi:
         """
 
         headers = {"x-chain-id": chain_id.value}
-        params = {"kind": ",".join([token.value for token in kind])}
+        params = {
+            "kind": ",".join([token.value for token in kind]),
+            "range": time_range,
+            "cursor": cursor,
+            "size": TRANSFER_HISTORY_PAGE_SIZE,
+        }
         url = f"https://th-api.klaytnapi.com/v2/transfer/account/{owner}"
 
-        return self._kas_api_request("get", url, headers=headers, params=params)
+        return self._kas_api_request(
+            "get", url, headers=headers, params=params, deadline=deadline
+        )
 
     def get_nft_list_by_owner(
         self, chain_id: ChainId, owner: str, contract_address: str
@@ -201,7 +249,11 @@ class KasApi:
         return self._kas_api_request("get", url, headers=headers)
 
     def get_nft(
-        self, chain_id: ChainId, nft_contract: str, token_id: str
+        self,
+        chain_id: ChainId,
+        nft_contract: str,
+        token_id: str,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> KlaytnNftResultTypeDef:
         """
         https://docs.klaytnapi.com/tutorial/token-history-api/th-api-token
@@ -227,7 +279,34 @@ class KasApi:
         headers = {"x-chain-id": chain_id.value}
         url = f"https://th-api.klaytnapi.com/v2/contract/nft/{nft_contract}/token/{token_id}"
 
-        return self._kas_api_request("get", url, headers=headers)
+        return self._kas_api_request("get", url, headers=headers, deadline=deadline)
+
+    def get_nfts_by_contract(
+        self,
+        chain_id: ChainId,
+        nft_contract: str,
+        size: int = None,
+        cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> KlaytnOwndNftResult:
+        """contract 에서 발행한 nft 목록 1 page. 다음 page 가 없으면 cursor 는 빈 값"""
+        result = self.get_nft_list(chain_id, nft_contract, size, cursor, deadline)
+        return KlaytnOwndNftResult(
+            cursor=result.get("cursor"),
+            owned_nfts=[
+                KlaytnOwnedNft(
+                    contract_address=nft_contract,
+                    token_id=item["tokenId"],
+                    owner=item["owner"],
+                    previous_owner=item["previousOwner"],
+                    token_uri=item["tokenUri"],
+                    transaction_hash=item["transactionHash"],
+                    created_at=item["createdAt"],
+                    updated_at=item["updatedAt"],
+                )
+                for item in result["items"]
+            ],
+        )
 
     def get_nft_list(
         self,
@@ -235,6 +314,7 @@ class KasApi:
         nft_contract: str,
         size: int = None,
         cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         """
         https://docs.klaytnapi.com/tutorial/token-history-api/th-api-token
@@ -255,7 +335,9 @@ class KasApi:
         params = {"size": size, "cursor": cursor}
 
         url = f"https://th-api.klaytnapi.com/v2/contract/nft/{nft_contract}/token"
-        return self._kas_api_request("get", url, headers=headers, params=params)
+        return self._kas_api_request(
+            "get", url, headers=headers, params=params, deadline=deadline
+        )
 
     def get_contracts_by_owner(
         self, chain_id: ChainId, owner: str, kind: Iterable[TokenKind]
@@ -278,13 +360,14 @@ class KasApi:
         owner: str,
         kind: Iterable[TokenKind],
         cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> KlaytnOwndNftResult:
         """EOA를 지정하면 해당 EOA가 소유한 토큰 정보를 불러옵니다.
 
         https://refs.klaytnapi.com/ko/tokenhistory/latest#operation/getListOfTokenByOwnerAddress
 
         """
-        result = self.get_tokens_by_owner_raw(chain_id, owner, kind, cursor)
+        result = self.get_tokens_by_owner_raw(chain_id, owner, kind, cursor, deadline)
         return KlaytnOwndNftResult(
             cursor=result["cursor"],
             owned_nfts=[
@@ -308,6 +391,7 @@ class KasApi:
         owner: str,
         kind: Iterable[TokenKind],
         cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         """EOA를 지정하면 해당 EOA가 소유한 토큰 정보를 불러옵니다.
 
@@ -347,7 +431,9 @@ class KasApi:
 
         # https://th-api.klaytnapi.com/v2/account/{address}/token
         url = f"https://th-api.klaytnapi.com/v2/account/{owner}/token"
-        return self._kas_api_request("get", url, params=params, headers=headers)
+        return self._kas_api_request(
+            "get", url, params=params, headers=headers, deadline=deadline
+        )
 
     def update_nft_contract_metadata(self, chain_id: ChainId, contract_address: str):
         """
@@ -367,7 +453,11 @@ class KasApi:
         return self._kas_api_request("put", url, headers=headers)
 
     def update_nft_token_metadata(
-        self, chain_id: ChainId, contract_address: str, token_id: str
+        self,
+        chain_id: ChainId,
+        contract_address: str,
+        token_id: str,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         """
         PUT https://th-api.klaytnapi.com/v2/contract/nft/{nft-address}/token/{token-id}/metadata
@@ -377,7 +467,7 @@ class KasApi:
 
         # https://th-api.klaytnapi.com/v2/account/{address}/token
         url = f"https://th-api.klaytnapi.com/v2/contract/nft/{contract_address}/token/{token_id}/metadata"
-        return self._kas_api_request("put", url, headers)
+        return self._kas_api_request("put", url, headers, deadline=deadline)
 
     def _kas_api_request(
         self,
@@ -385,14 +475,19 @@ class KasApi:
         url: str,
         headers: dict,
         params: dict = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> dict:
 
         try:
-            with requests.Session() as session:
-                session.auth = (self.access_key_id, self.secret_access_key)
-                r = session.request(method, url, params=params, headers=headers)
-                r.raise_for_status()
-                return r.json()
+            r = self.session.request(
+                method,
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeouts.get_timeout(deadline),
+            )
+            r.raise_for_status()
+            return r.json()
         except requests.exceptions.HTTPError as e:
             log.warning(f"KAS API request failed: {e}")
             raise KasApiError(e)
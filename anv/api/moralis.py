@@ -6,6 +6,8 @@ from typing import List, Literal, Optional
 import pydantic
 import requests
 
+from anv import api, timeouts
+
 log = logging.getLogger(f"anv.{__name__}")
 
 PAGE_SIZE = 20
@@ -65,30 +67,48 @@ class MorailsNetwork(enum.Enum):
 class MorailsApi:
     def __init__(self):
         self.api_key = os.getenv("MORALIS_API_KEY")
+        self.session = api.create_session()
+
+    def close(self):
+        self.session.close()
 
     def get_NFT_metadata(
-        self, network: MorailsNetwork, contract_address: str, token_id: str
+        self,
+        network: MorailsNetwork,
+        contract_address: str,
+        token_id: str,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> MoralisNFTMetadata:
         log.debug(
             "getting moralis nft metadata contract_address=%s token_id=%s",
             contract_address,
             token_id,
         )
-        metadata = self.get_NFT_metadata_raw(network, contract_address, token_id)
+        metadata = self.get_NFT_metadata_raw(
+            network, contract_address, token_id, deadline
+        )
         return MoralisNFTMetadata.parse_obj(metadata)
 
     def get_NFTs(
-        self, network: MorailsNetwork, owner: str, cursor: str = None
+        self,
+        network: MorailsNetwork,
+        owner: str,
+        cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> MoralisOwnedNftResult:
         # TODO: 100 개의 NFT 만 가져온다. page 이동 필요
-        owned_nfts = self.get_NFTs_raw(network, owner, cursor)
+        owned_nfts = self.get_NFTs_raw(network, owner, cursor, deadline)
         return MoralisOwnedNftResult(
             cursor=owned_nfts["cursor"],
             owned_nfts=[MoralisOwnedNft.parse_obj(nft) for nft in owned_nfts["result"]],
         )
 
     def get_NFTs_raw(
-        self, network: MorailsNetwork, owner: str, cursor: str = None
+        self,
+        network: MorailsNetwork,
+        owner: str,
+        cursor: str = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> dict:
         """
         https://docs.moralis.io/reference/getwalletnfts
@@ -103,10 +123,16 @@ class MorailsApi:
         }
 
         url = f"https://deep-index.moralis.io/api/v2/{owner}/nft"
-        return self._api_request("get", url, params=params, headers=headers)
+        return self._api_request(
+            "get", url, params=params, headers=headers, deadline=deadline
+        )
 
     def get_NFT_metadata_raw(
-        self, network: MorailsNetwork, contract_address: str, token_id: str
+        self,
+        network: MorailsNetwork,
+        contract_address: str,
+        token_id: str,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         """
         https://docs.moralis.io/reference/getnftmetadata
@@ -115,7 +141,9 @@ class MorailsApi:
         params = {"chain": network.value}
 
         url = f"https://deep-index.moralis.io/api/v2/nft/{contract_address}/{token_id}"
-        return self._api_request("get", url, params=params, headers=headers)
+        return self._api_request(
+            "get", url, params=params, headers=headers, deadline=deadline
+        )
 
     def get_collection_metadata_raw(
         self, network: MorailsNetwork, contract_address: str
@@ -146,13 +174,19 @@ class MorailsApi:
         url: str,
         headers: dict,
         params: dict = None,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> dict:
 
         try:
-            with requests.Session() as session:
-                r = session.request(method, url, params=params, headers=headers)
-                r.raise_for_status()
-                return r.json()
+            r = self.session.request(
+                method,
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeouts.get_timeout(deadline),
+            )
+            r.raise_for_status()
+            return r.json()
         except requests.exceptions.HTTPError as e:
             log.warning(f"KAS API request failed: {e}")
             raise MoralisApiError(e)
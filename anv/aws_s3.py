@@ -1,16 +1,20 @@
 import os
-from typing import IO, Any, Dict, Optional, Union
-import boto3
-import mypy_boto3_s3
-from mypy_boto3_s3 import type_defs
-from botocore.response import StreamingBody
+from typing import IO, TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
+
+# boto3 는 import 시간이 길어 AWSS3Storage 를 만들 때 import 한다
+if TYPE_CHECKING:
+    import mypy_boto3_s3
+    from botocore.response import StreamingBody
+    from mypy_boto3_s3 import type_defs
 
 
 class AWSS3Storage:
     def __init__(self):
+        import boto3
+
         self.region_name = os.environ["AWS_S3_REGION_NAME"]
         self.bucket_name = os.environ["AWS_S3_BUCKET_NAME"]
-        self.s3: mypy_boto3_s3.S3Client = boto3.client(
+        self.s3: "mypy_boto3_s3.S3Client" = boto3.client(
             service_name="s3",
             region_name=self.region_name,
             aws_access_key_id=os.environ["AWS_S3_ACCESS_KEY"],
@@ -19,13 +23,10 @@ class AWSS3Storage:
         self.base_url = (
             f"https://{self.bucket_name}.s3.{self.region_name}.amazonaws.com/"
         )
-        self.resize_base_url = (
-            f"https://{self.bucket_name}-resized.s3.{self.region_name}.amazonaws.com/"
-        )
 
     def upload_object(
         self,
-        file_obj: Union[IO[Any], StreamingBody],
+        file_obj: Union[IO[Any], "StreamingBody"],
         key: str,
         extra_args: Dict[str, Any],
     ):
@@ -33,7 +34,7 @@ class AWSS3Storage:
             Fileobj=file_obj, Bucket=self.bucket_name, Key=key, ExtraArgs=extra_args
         )
 
-    def find_first_object(self, prefix: str) -> Optional[type_defs.ObjectTypeDef]:
+    def find_first_object(self, prefix: str) -> Optional["type_defs.ObjectTypeDef"]:
         objs = self.list_object(prefix)
         contents = objs.get("Contents", [])
         try:
@@ -41,8 +42,17 @@ class AWSS3Storage:
         except IndexError:
             return None
 
-    def get_object(self, key: str):
-        return self.s3.get_object(Bucket=self.bucket_name, Key=key)
+    def get_object(self, key: str, byte_range: Optional[Tuple[int, int]] = None):
+        """byte_range 는 (start, end). end 포함"""
+        if byte_range is None:
+            return self.s3.get_object(Bucket=self.bucket_name, Key=key)
+        start, end = byte_range
+        return self.s3.get_object(
+            Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{end}"
+        )
+
+    def head_object(self, key: str):
+        return self.s3.head_object(Bucket=self.bucket_name, Key=key)
 
     def list_object(self, prefix: str):
         return self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
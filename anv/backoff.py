@@ -0,0 +1,82 @@
+import collections
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from anv import repository
+
+log = logging.getLogger(f"anv.{__name__}")
+
+BASE_DELAY = 5 * 60  # 첫 실패 후 재시도까지 대기 시간 (seconds)
+MAX_DELAY = 24 * 60 * 60  # 재시도 대기 시간 최대값 (seconds)
+MAX_SIZE = 100_000
+
+
+class NegativeCacheEntry:
+    __slots__ = ("failures", "retry_at")
+
+    def __init__(self, failures: int, retry_at: float):
+        self.failures = failures
+        self.retry_at = retry_at
+
+
+class NegativeCache:
+    """조회에 실패한 token, token uri 를 기록하는 저장소.
+
+    실패한 key 는 재시도 시각 전까지 조회하지 않고 건너뛴다.
+    재시도 대기 시간은 실패할 때마다 두 배로 늘어나며 max_delay 를 넘지 않는다.
+    성공하면 기록을 지운다.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+        max_size: int = MAX_SIZE,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self._entries: Dict[str, NegativeCacheEntry] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_blocked(self, key: str) -> bool:
+        """재시도 시각 전이면 True"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.retry_at > time.time()
+
+    def get_retry_at(self, key: str) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.retry_at if entry else None
+
+    def record_failure(self, key: str) -> float:
+        """실패를 기록하고 다음 재시도 시각을 return"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            failures = entry.failures + 1 if entry else 1
+            delay = min(self.base_delay * 2 ** (failures - 1), self.max_delay)
+            retry_at = time.time() + delay
+            self._entries[key] = NegativeCacheEntry(failures, retry_at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)  # type: ignore
+
+        log.debug("negative cache. key=%s failures=%s delay=%s", key, failures, delay)
+        return retry_at
+
+    def record_success(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def token_key(chain: str, contract_address: str, token_id: str) -> str:
+    return f"token:{chain}:{contract_address.lower()}:{token_id}"
+
+
+def uri_key(uri: str) -> str:
+    return f"uri:{repository.get_sha256(uri)}"
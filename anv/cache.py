@@ -0,0 +1,368 @@
+import collections
+import importlib
+import logging
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Type,
+)
+
+import orjson
+import pydantic
+
+# redis 는 SHARED_CACHE_URL 이 redis 인 경우만 사용하므로 사용하는 시점에 import 한다
+if TYPE_CHECKING:
+    import redis
+
+log = logging.getLogger(f"anv.{__name__}")
+
+MAX_SIZE = 10_000
+TTL = 60 * 60  # cache 항목 유지 시간 (seconds)
+# worker process 마다 따로 가진 cache 의 유지 시간 (seconds). 다른 worker 의 갱신이 이 시간 안에 보임
+LOCAL_TTL = 60
+
+# shared cache 가 sqlite 인 경우 만료된 항목을 지우는 주기 (set 횟수)
+SQLITE_PURGE_EVERY = 1_000
+
+
+# shared cache 에 저장하는 값의 (dumps, loads)
+ValueCodec = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+class CacheError(Exception):
+    pass
+
+
+class LRUCacheEntry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value: Any, expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class LRUCache:
+    """process 안의 LRU cache. 최근에 사용한 순서로 max_size 개 까지 보관하고,
+    ttl 이 지난 항목은 조회하지 않는다.
+    """
+
+    def __init__(self, max_size: int = MAX_SIZE, ttl: float = TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, LRUCacheEntry] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)  # type: ignore
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = LRUCacheEntry(value, time.time() + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)  # type: ignore
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def items(self, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        """최근에 사용한 순서로 만료되지 않은 항목을 limit 개 return"""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+        result: List[Tuple[str, Any]] = []
+        for key, entry in reversed(entries):
+            if limit is not None and len(result) >= limit:
+                break
+            if entry.expires_at > now:
+                result.append((key, entry.value))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def metadata_key(chain: str, contract_address: str, token_id: str) -> str:
+    return f"{chain}:{contract_address}:{token_id}"
+
+
+def contract_key(chain: str, contract_address: str) -> str:
+    return f"{chain}:{contract_address.lower()}"
+
+
+def owner_key(owner: str, cursor: Optional[str]) -> str:
+    return f"{owner.lower()}:{cursor or ''}"
+
+
+class SharedCache(Protocol):
+    """여러 process (uvicorn worker) 가 같이 사용하는 cache. 값은 bytes"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        """없거나 만료되었으면 None"""
+
+    def set(self, key: str, value: bytes, ttl: float):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemorySharedCache(SharedCache):
+    """process 안의 dict. process 간 공유되지 않으므로 test, 개발용"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                self._entries.pop(key, None)
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteSharedCache(SharedCache):
+    """같은 host 의 process 가 공유하는 sqlite 파일 cache.
+    /dev/shm 등 memory file system 에 두면 disk io 없이 공유된다.
+    """
+
+    def __init__(self, db_path: Optional[pathlib.Path] = None):
+        self.db_path = db_path or self.default_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._sets = 0
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+
+    @staticmethod
+    def default_path() -> pathlib.Path:
+        shm = pathlib.Path("/dev/shm")
+        base = shm if shm.is_dir() else pathlib.Path(tempfile.gettempdir())
+        return base / "anv-cache.db"
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._sets += 1
+            if self._sets % SQLITE_PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str):
+        with self._get_connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            conn.close()
+            self._local.conn = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=1)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+
+class RedisSharedCache(SharedCache):
+    """redis (또는 redis protocol 호환 서버) cache. 여러 host 의 process 가 공유한다."""
+
+    def __init__(self, url: str):
+        redis_module = importlib.import_module("redis")
+        self.client: "redis.Redis" = redis_module.Redis.from_url(
+            url, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def close(self):
+        self.client.close()
+
+
+def create_shared_cache(url: Optional[str]) -> Optional[SharedCache]:
+    """url 형식. 없으면 None
+    redis://host:port/db, sqlite:///path/to/cache.db, sqlite:// (/dev/shm/anv-cache.db), memory://
+    """
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedCache(url)
+    if url.startswith("sqlite://"):
+        path = url[len("sqlite://") :]
+        return SqliteSharedCache(pathlib.Path(path) if path else None)
+    if url.startswith("memory://"):
+        return MemorySharedCache()
+    raise CacheError(f"unknown shared cache url {url}")
+
+
+def model_codec(model: Type[pydantic.BaseModel]) -> ValueCodec:
+    """pydantic model 을 shared cache 에 저장하는 (dumps, loads)"""
+    return (
+        lambda value: orjson.dumps(value.dict()),
+        lambda raw: model.parse_raw(raw),
+    )
+
+
+JSON_CODEC: ValueCodec = (
+    orjson.dumps,
+    orjson.loads,
+)
+
+
+class TieredCache:
+    """process 안의 LRUCache (local) 와 여러 process 가 공유하는 SharedCache (shared) 를 차례로 조회한다.
+
+    shared 에서 찾은 항목은 local 에 넣는다. 저장은 둘 다 한다.
+    shared 의 오류는 cache miss 로 처리하고 요청을 실패시키지 않는다.
+    tier 별 hit 수를 기록한다.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        local: Optional[LRUCache],
+        shared: Optional[SharedCache],
+        ttl: float = TTL,
+        value_codec: ValueCodec = JSON_CODEC,
+    ):
+        self.namespace = namespace
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.dumps, self.loads = value_codec
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                self.local_hits += 1
+                return value
+
+        if self.shared is not None:
+            try:
+                raw = self.shared.get(self._shared_key(key))
+                value = self.loads(raw) if raw is not None else None
+            except Exception as e:
+                log.warning("shared cache get error. %s. key=%s", e, key)
+                self.shared_errors += 1
+                value = None
+            if value is not None:
+                self.shared_hits += 1
+                if self.local is not None:
+                    self.local.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        if self.local is not None:
+            self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(self._shared_key(key), self.dumps(value), self.ttl)
+            except Exception as e:
+                log.warning("shared cache set error. %s. key=%s", e, key)
+                self.shared_errors += 1
+
+    def delete(self, key: str):
+        if self.local is not None:
+            self.local.delete(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(self._shared_key(key))
+            except Exception as e:
+                log.warning("shared cache delete error. %s. key=%s", e, key)
+                self.shared_errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "shared_errors": self.shared_errors,
+            "local_size": len(self.local) if self.local is not None else 0,
+        }
+
+    def _shared_key(self, key: str) -> str:
+        return f"anv:{self.namespace}:{key}"
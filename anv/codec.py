@@ -0,0 +1,115 @@
+import base64
+import json
+import logging
+from typing import Any, Dict, Optional, Set, Union
+
+import orjson
+import pydantic
+
+from anv import models
+
+log = logging.getLogger(f"anv.{__name__}")
+
+# 저장 형식은 version byte + orjson. None 인 항목은 저장하지 않는다.
+# 현재 version 으로 저장한 데이터는 서비스가 직접 만든 데이터이므로 validation 없이 model 을 만든다.
+# version 이 다르거나 없는 (이전 형식) 데이터는 validation 을 거친다.
+SCHEMA_VERSION = 1
+
+# document(dict) 에 저장하는 schema version key
+VERSION_KEY = "_v"
+
+# 목록 응답의 nft json fragment 에서 제외하는 항목. 목록 응답의 기본 항목과 같다
+FRAGMENT_EXCLUDE = frozenset({"token_data"})
+
+# dict key 가 str 이 아닌 token_data 도 직렬화
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class CodecError(Exception):
+    pass
+
+
+def encode(data: models.NftMetadata, exclude: Optional[Set[str]] = None) -> bytes:
+    return bytes([SCHEMA_VERSION]) + orjson.dumps(to_document(data, exclude))
+
+
+def decode(raw: bytes) -> models.NftMetadata:
+    if not raw:
+        raise CodecError("empty data")
+    if raw[0] == SCHEMA_VERSION:
+        return from_document(orjson.loads(raw[1:]))
+    if raw[:1] == b"{":  # version byte 없는 json
+        return models.NftMetadata.parse_raw(raw)
+    raise CodecError(f"unknown schema version {raw[0]}")
+
+
+def decode_json(data: Union[str, bytes]) -> Any:
+    """token uri 의 json. process pool 에서 실행되므로 module level 함수로 둔다."""
+    return json.loads(data)
+
+
+def decode_base64_json(data: Union[str, bytes]) -> Any:
+    """data:application/json;base64, uri 의 data 부분. process pool 에서 실행된다."""
+    return json.loads(base64.b64decode(data).decode("utf-8"))
+
+
+def to_json(data: pydantic.BaseModel, exclude: Any = None) -> bytes:
+    """응답용 json. model.json() 은 json.dumps 를 거치므로 orjson 으로 직렬화한다.
+    orjson 으로 직렬화할 수 없는 값 (64bit 를 넘는 정수 등) 이 있으면 model.json() 을 사용한다.
+    """
+    try:
+        return orjson.dumps(data.dict(exclude=exclude), option=JSON_OPTIONS)
+    except orjson.JSONEncodeError as e:
+        log.debug("orjson encode error. fallback to json. %s", e)
+        return data.json(exclude=exclude).encode("utf-8")
+
+
+def fragment(data: models.NftMetadata) -> bytes:
+    """목록 응답에 그대로 이어 붙일 수 있는 nft json (token_data 제외).
+    한 번 만든 fragment 는 model 에 보관하고, 항목이 바뀌면 다시 만든다.
+    """
+    if data._json is None:
+        data._json = to_json(data, FRAGMENT_EXCLUDE)
+    return data._json
+
+
+def to_document(
+    data: models.NftMetadata, exclude: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """mongodb 등에 저장할 dict. None 항목과 exclude 항목 제외, schema version 추가"""
+    document = data.dict(exclude_none=True, exclude=exclude)
+    document[VERSION_KEY] = SCHEMA_VERSION
+    return document
+
+
+def from_document(document: Dict[str, Any]) -> models.NftMetadata:
+    if document.get(VERSION_KEY) != SCHEMA_VERSION:
+        return models.NftMetadata.parse_obj(document)
+    return _construct_nft(document)
+
+
+def _construct_nft(document: Dict[str, Any]) -> models.NftMetadata:
+    values = {
+        key: value
+        for key, value in document.items()
+        if key in models.NftMetadata.__fields__
+    }
+    source_url = values.get("source_url")
+    if source_url is not None:
+        values["source_url"] = _construct_url(source_url)
+    attributes = values.get("attributes")
+    if attributes is not None:
+        values["attributes"] = [
+            models.NftAttribute.construct(**attribute) for attribute in attributes
+        ]
+    return models.NftMetadata.construct(**values)
+
+
+def _construct_url(document: Optional[Dict[str, Any]]) -> Optional[models.NftUrl]:
+    if document is None:
+        return None
+    values = dict(document)
+    for key in ("webp", "avif"):
+        if key in values:
+            values[key] = _construct_url(values[key])
+    return models.NftUrl.construct(**values)
@@ -1,4 +1,23 @@
-from anv import models, repository, aws_s3
+import logging
+import os
+import pathlib
+from typing import Any, Dict, Optional, Type
+
+import pydantic
+
+from anv import (
+    aws_s3,
+    backoff,
+    cache,
+    codec,
+    freshness,
+    models,
+    refresh,
+    render,
+    repository,
+    snapshot,
+    workers,
+)
 from anv.api import alchemy, kas, ipfs, moralis
 from anv.service import (
     BinanceNFTService,
@@ -7,19 +26,72 @@ from anv.service import (
     NFTService,
     KlaytnNFTService,
     EthereumNFTService,
+    NFTServiceBase,
     PolygonMumbaiNFTService,
     PolygonNFTService,
     EthereumGoerliNFTService,
+    TOKEN_JSON_DECODE_PROCESSES,
 )
 
+log = logging.getLogger(f"anv.{__name__}")
+
 
 class AppConfig:
+    """service, repository, api client 를 한 번만 만들어 요청 간에 공유한다.
+    app 시작 시 startup() 으로 미리 만들고, 종료 시 close() 로 정리한다.
+    """
+
     def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        """만든 resource 를 모두 버린다. 이후 getter 를 호출하면 다시 만든다."""
         self._ipfs = None
         self._nft_meta_repo = None
         self._nft_src_repo = None
+        self._negative_cache = None
+        self._worker_pool = None
+        self._decode_pool = None
+        self._svg_renderer = None
+        self._nft_service = None
+        self._alchemy_api = None
+        self._moralis_api = None
+        self._kas_api = None
+        self._metadata_cache = None
+        self._contract_cache = None
+        self._snapshot_writer = None
+        self._refresher = None
+        self._shared_cache = None
+        self._tiered_caches: Dict[str, cache.TieredCache] = {}
+
+    def startup(self):
+        self._load_cache_snapshot()
+        self.get_nft_service()
+        self.get_nft_src_repository()
+
+    def close(self):
+        """만든 resource 를 정리한다. 이후 getter 를 호출하면 다시 만든다."""
+        if self._snapshot_writer:
+            self._snapshot_writer.stop()
+        clients = [self._alchemy_api, self._moralis_api, self._kas_api, self._ipfs]
+        for client in clients:
+            if client:
+                client.close()
+        if self._nft_meta_repo:
+            self._nft_meta_repo.close()
+        if self._worker_pool:
+            self._worker_pool.close()
+        if self._decode_pool is not None:
+            self._decode_pool.close()
+        if self._refresher is not None:
+            self._refresher.close()
+        if self._shared_cache is not None:
+            self._shared_cache.close()
+        self._reset()
 
     def get_nft_service(self) -> NFTService:
+        if self._nft_service:
+            return self._nft_service
         chains = {
             models.Chain.ETHEREUM.value: self.get_ethereum_nft_service(),
             models.Chain.POLYGON.value: self.get_polygon_nft_service(),
@@ -30,55 +102,128 @@ class AppConfig:
             models.Chain.BINANCE_TESTNET.value: self.get_binance_test_nft_service(),
             models.Chain.KLAYTN_BAOBAB.value: self.get_klaytn_baobob_nft_service(),
         }
-        return NFTService(**chains)
+        self._nft_service = NFTService(**chains)
+        return self._nft_service
 
     def get_ethereum_nft_service(self) -> EthereumNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         alchemy_api = self.get_alchemy_api()
-        return EthereumNFTService(nft_metadata_repo, ipfs_proxy, alchemy_api)
+        return EthereumNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            alchemy_api,
+            self.get_negative_cache(),
+            **self._get_service_options(models.Chain.ETHEREUM, EthereumNFTService),
+        )
 
     def get_ethereum_goerli_nft_service(self) -> EthereumGoerliNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         alchemy_api = self.get_alchemy_api()
-        return EthereumGoerliNFTService(nft_metadata_repo, ipfs_proxy, alchemy_api)
+        return EthereumGoerliNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            alchemy_api,
+            self.get_negative_cache(),
+            **self._get_service_options(
+                models.Chain.ETHEREUM_GOERLI, EthereumGoerliNFTService
+            ),
+        )
 
     def get_polygon_nft_service(self) -> PolygonNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         alchemy_api = self.get_alchemy_api()
-        return PolygonNFTService(nft_metadata_repo, ipfs_proxy, alchemy_api)
+        return PolygonNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            alchemy_api,
+            self.get_negative_cache(),
+            **self._get_service_options(models.Chain.POLYGON, PolygonNFTService),
+        )
 
     def get_polygon_mumbai_nft_service(self) -> PolygonMumbaiNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         alchemy_api = self.get_alchemy_api()
-        return PolygonMumbaiNFTService(nft_metadata_repo, ipfs_proxy, alchemy_api)
+        return PolygonMumbaiNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            alchemy_api,
+            self.get_negative_cache(),
+            **self._get_service_options(
+                models.Chain.POLYGON_MUMBAI, PolygonMumbaiNFTService
+            ),
+        )
 
     def get_klaytn_nft_service(self) -> KlaytnNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         klaytn_api = self.get_kas_api()
-        return KlaytnNFTService(nft_metadata_repo, ipfs_proxy, klaytn_api)
+        return KlaytnNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            klaytn_api,
+            self.get_negative_cache(),
+            self.get_contract_tiered_cache(),
+            **self._get_service_options(models.Chain.KLAYTN, KlaytnNFTService),
+        )
 
     def get_klaytn_baobob_nft_service(self) -> KlaytnBaobobNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         klaytn_api = self.get_kas_api()
-        return KlaytnBaobobNFTService(nft_metadata_repo, ipfs_proxy, klaytn_api)
+        return KlaytnBaobobNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            klaytn_api,
+            self.get_negative_cache(),
+            self.get_contract_tiered_cache(),
+            **self._get_service_options(
+                models.Chain.KLAYTN_BAOBAB, KlaytnBaobobNFTService
+            ),
+        )
 
     def get_binance_nft_service(self) -> BinanceNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         moralis_api = self.get_moralis_api()
-        return BinanceNFTService(nft_metadata_repo, ipfs_proxy, moralis_api)
+        return BinanceNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            moralis_api,
+            self.get_negative_cache(),
+            **self._get_service_options(models.Chain.BINANCE, BinanceNFTService),
+        )
 
     def get_binance_test_nft_service(self) -> BinanceTestNFTService:
         nft_metadata_repo = self.get_nft_meta_repository()
         ipfs_proxy = self.get_ipfs_proxy()
         moralis_api = self.get_moralis_api()
-        return BinanceTestNFTService(nft_metadata_repo, ipfs_proxy, moralis_api)
+        return BinanceTestNFTService(
+            nft_metadata_repo,
+            ipfs_proxy,
+            moralis_api,
+            self.get_negative_cache(),
+            **self._get_service_options(
+                models.Chain.BINANCE_TESTNET, BinanceTestNFTService
+            ),
+        )
+
+    def _get_service_options(
+        self, chain: models.Chain, service_class: Type[NFTServiceBase]
+    ) -> Dict[str, Any]:
+        """chain 별 service 가 공유하는 pool, cache 등. ingest, reveal 에서 만든 service 도 같이 사용"""
+        return {
+            "worker_pool": self.get_decode_pool(),
+            "refresher": self.get_refresher(),
+            "freshness_policy": self.get_freshness_policy(),
+            "token_uri_cache": self.get_token_uri_cache(),
+            "owner_cache": self.get_owner_cache(
+                chain.value, service_class.owned_nfts_model
+            ),
+        }
 
     def get_ipfs_proxy(self) -> ipfs.IPFSProxy:
         if self._ipfs:
@@ -86,28 +231,258 @@ class AppConfig:
         self._ipfs = ipfs.IPFSProxy()
         return self._ipfs
 
+    def get_negative_cache(self) -> backoff.NegativeCache:
+        if self._negative_cache is not None:
+            return self._negative_cache
+        self._negative_cache = backoff.NegativeCache(
+            base_delay=float(
+                os.getenv("NEGATIVE_CACHE_BASE_DELAY", backoff.BASE_DELAY)
+            ),
+            max_delay=float(os.getenv("NEGATIVE_CACHE_MAX_DELAY", backoff.MAX_DELAY)),
+        )
+        return self._negative_cache
+
     def get_nft_meta_repository(self) -> repository.NFTMetadataRespository:
         if self._nft_meta_repo:
             return self._nft_meta_repo
-        self._nft_meta_repo = repository.MongodbRepository()
+        repo_type = os.getenv("NFT_METADATA_REPOSITORY", "mongodb")
+        repo: repository.NFTMetadataRespository
+        if repo_type == "sqlite":
+            repo = self._get_sqlite_repository()
+        elif repo_type == "tiered":
+            repo = repository.TieredRepository(
+                self._get_sqlite_repository(), repository.MongodbRepository()
+            )
+        else:
+            repo = repository.MongodbRepository()
+
+        metadata_cache = self._get_tiered_cache(
+            "metadata",
+            self.get_metadata_cache(),
+            float(os.getenv("METADATA_SHARED_CACHE_TTL", cache.TTL)),
+            (
+                lambda data: codec.encode(data, repository.TOKEN_DATA_EXCLUDE),
+                codec.decode,
+            ),
+        )
+        if metadata_cache is not None:
+            repo = repository.CachedMetadataRepository(repo, metadata_cache)
+        self._nft_meta_repo = repo
         return self._nft_meta_repo
 
+    def get_metadata_cache(self) -> Optional[cache.LRUCache]:
+        """worker process 안의 metadata cache.
+        METADATA_CACHE_SIZE 가 0 이거나 shared cache 가 있으면 None.
+        다른 worker 의 resync, 갱신 결과가 늦게 보이지 않도록 유지 시간은 짧게 둔다.
+        """
+        if self._metadata_cache is not None:
+            return self._metadata_cache
+        self._metadata_cache = self._get_worker_local_cache(
+            int(os.getenv("METADATA_CACHE_SIZE", cache.MAX_SIZE)),
+            float(os.getenv("METADATA_CACHE_TTL", cache.LOCAL_TTL)),
+        )
+        return self._metadata_cache
+
+    def get_contract_cache(self) -> cache.LRUCache:
+        if self._contract_cache is not None:
+            return self._contract_cache
+        self._contract_cache = cache.LRUCache(
+            ttl=float(os.getenv("CONTRACT_CACHE_TTL", 24 * 60 * 60))
+        )
+        return self._contract_cache
+
+    def get_contract_tiered_cache(self) -> Optional[cache.TieredCache]:
+        contract_cache = self.get_contract_cache()
+        return self._get_tiered_cache(
+            "contract",
+            contract_cache,
+            contract_cache.ttl,
+            cache.model_codec(models.KlaytnNftContract),
+        )
+
+    def get_token_uri_cache(self) -> Optional[cache.TieredCache]:
+        """TOKEN_URI_CACHE_TTL 이 0 이면 None"""
+        ttl = float(os.getenv("TOKEN_URI_CACHE_TTL", 5 * 60))
+        if ttl <= 0:
+            return None
+        max_size = int(os.getenv("TOKEN_URI_CACHE_SIZE", 1_000))
+        return self._get_tiered_cache(
+            "token_uri",
+            self._get_worker_local_cache(max_size, ttl),
+            ttl,
+            cache.JSON_CODEC,
+        )
+
+    def get_owner_cache(
+        self, chain: str, model: Type[pydantic.BaseModel]
+    ) -> Optional[cache.TieredCache]:
+        """wallet 목록 page cache. OWNER_CACHE_TTL 이 0 이면 None"""
+        ttl = float(os.getenv("OWNER_CACHE_TTL", 30))
+        if ttl <= 0:
+            return None
+        max_size = int(os.getenv("OWNER_CACHE_SIZE", 1_000))
+        return self._get_tiered_cache(
+            f"owner:{chain}",
+            self._get_worker_local_cache(max_size, ttl),
+            ttl,
+            cache.model_codec(model),
+        )
+
+    def _get_worker_local_cache(
+        self, max_size: int, ttl: float
+    ) -> Optional[cache.LRUCache]:
+        """worker process 안의 cache. shared cache 가 있으면 사용하지 않음.
+        다른 worker 가 갱신하거나 지운 항목을 local 에서 ttl 동안 계속 읽지 않도록 하기 위함.
+        """
+        if max_size <= 0 or self.get_shared_cache() is not None:
+            return None
+        return cache.LRUCache(max_size, ttl)
+
+    def get_shared_cache(self) -> Optional[cache.SharedCache]:
+        """uvicorn worker 가 공유하는 cache. SHARED_CACHE_URL 이 없으면 None"""
+        if self._shared_cache is not None:
+            return self._shared_cache
+        self._shared_cache = cache.create_shared_cache(os.getenv("SHARED_CACHE_URL"))
+        return self._shared_cache
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            namespace: tiered_cache.stats()
+            for namespace, tiered_cache in self._tiered_caches.items()
+        }
+
+    def _get_tiered_cache(
+        self,
+        namespace: str,
+        local: Optional[cache.LRUCache],
+        ttl: float,
+        value_codec: cache.ValueCodec,
+    ) -> Optional[cache.TieredCache]:
+        """local, shared 가 모두 없으면 None"""
+        if namespace in self._tiered_caches:
+            return self._tiered_caches[namespace]
+        shared = self.get_shared_cache()
+        if local is None and shared is None:
+            return None
+        self._tiered_caches[namespace] = cache.TieredCache(
+            namespace, local, shared, ttl, value_codec
+        )
+        return self._tiered_caches[namespace]
+
+    def _load_cache_snapshot(self):
+        """CACHE_SNAPSHOT_PATH 가 있으면 snapshot 으로 cache 를 채우고 주기적으로 저장한다."""
+        snapshot_path = os.getenv("CACHE_SNAPSHOT_PATH")
+        if not snapshot_path:
+            return
+        path = pathlib.Path(snapshot_path)
+        metadata_cache = self.get_metadata_cache()
+        contract_cache = self.get_contract_cache()
+        try:
+            snapshot.load_snapshot(
+                path,
+                metadata_cache,
+                contract_cache,
+                max_age=snapshot.SNAPSHOT_MAX_AGE,
+            )
+        except snapshot.SnapshotError as e:
+            log.warning("cache snapshot load error. %s", e)
+
+        self._snapshot_writer = snapshot.SnapshotWriter(
+            path,
+            metadata_cache,
+            contract_cache,
+            limit=int(os.getenv("CACHE_SNAPSHOT_SIZE", snapshot.SNAPSHOT_SIZE)),
+            interval=float(
+                os.getenv("CACHE_SNAPSHOT_INTERVAL", snapshot.SNAPSHOT_INTERVAL)
+            ),
+        )
+        self._snapshot_writer.start()
+
+    def _get_sqlite_repository(self) -> repository.SqliteRepository:
+        db_path = os.getenv("NFT_METADATA_SQLITE_PATH")
+        return repository.SqliteRepository(pathlib.Path(db_path) if db_path else None)
+
     def get_nft_src_repository(self) -> repository.NFTSourceRepositoryProtocol:
         if self._nft_src_repo:
             return self._nft_src_repo
 
         repo = self.get_nft_meta_repository()
         ipfs = self.get_ipfs_proxy()
+        if os.getenv("NFT_SOURCE_REPOSITORY") == "disk":
+            source_dir = os.getenv("NFT_SOURCE_DIR")
+            self._nft_src_repo = repository.DiskNFSSourceRepository(
+                repo,
+                ipfs,
+                repo_dir=pathlib.Path(source_dir) if source_dir else None,
+                svg_renderer=self.get_svg_renderer(),
+            )
+            return self._nft_src_repo
+
         s3_storage = aws_s3.AWSS3Storage()
 
-        self._nft_src_repo = repository.AWSS3SourceRepository(s3_storage, repo, ipfs)
+        self._nft_src_repo = repository.AWSS3SourceRepository(
+            s3_storage,
+            repo,
+            ipfs,
+            svg_renderer=self.get_svg_renderer(),
+            worker_pool=self.get_worker_pool(),
+        )
         return self._nft_src_repo
 
+    def get_refresher(self) -> refresh.BackgroundRefresher:
+        if self._refresher is not None:
+            return self._refresher
+        self._refresher = refresh.BackgroundRefresher(
+            workers=int(os.getenv("REFRESH_WORKERS", refresh.REFRESH_WORKERS))
+        )
+        return self._refresher
+
+    def get_freshness_policy(self) -> freshness.FreshnessPolicy:
+        """METADATA_EXPIRE_TTL 이 0 이면 만료되지 않음"""
+        expire_ttl = float(os.getenv("METADATA_EXPIRE_TTL", 0))
+        return freshness.FreshnessPolicy(
+            fresh_ttl=float(os.getenv("METADATA_FRESH_TTL", freshness.FRESH_TTL)),
+            expire_ttl=expire_ttl or None,
+        )
+
+    def get_worker_pool(self) -> workers.ProcessWorkerPool:
+        if self._worker_pool:
+            return self._worker_pool
+        self._worker_pool = workers.ProcessWorkerPool()
+        return self._worker_pool
+
+    def get_decode_pool(self) -> workers.ProcessWorkerPool:
+        """큰 token json decoding 전용 pool. 이미지, svg 변환 작업과 process 를 나누어 사용한다."""
+        if self._decode_pool is not None:
+            return self._decode_pool
+        self._decode_pool = workers.ProcessWorkerPool(
+            processes=int(
+                os.getenv("TOKEN_JSON_DECODE_PROCESSES", TOKEN_JSON_DECODE_PROCESSES)
+            )
+        )
+        return self._decode_pool
+
+    def get_svg_renderer(self) -> render.SvgRenderer:
+        if self._svg_renderer:
+            return self._svg_renderer
+        self._svg_renderer = render.SvgRenderer(self.get_worker_pool())
+        return self._svg_renderer
+
     def get_alchemy_api(self) -> alchemy.AlchemyApi:
-        return alchemy.AlchemyApi()
+        if self._alchemy_api:
+            return self._alchemy_api
+        self._alchemy_api = alchemy.AlchemyApi()
+        return self._alchemy_api
 
     def get_moralis_api(self) -> moralis.MorailsApi:
-        return moralis.MorailsApi()
+        if self._moralis_api:
+            return self._moralis_api
+        self._moralis_api = moralis.MorailsApi()
+        return self._moralis_api
 
     def get_kas_api(self) -> kas.KasApi:
-        return kas.KasApi()
+        # credential 파일은 처음 만들 때 한 번만 읽음
+        if self._kas_api:
+            return self._kas_api
+        self._kas_api = kas.KasApi()
+        return self._kas_api
@@ -0,0 +1,40 @@
+import enum
+import time
+from typing import Optional
+
+from anv import models
+
+FRESH_TTL = 24 * 60 * 60  # 이 시간(seconds) 동안은 cache 를 그대로 사용
+
+# 이 시간(seconds) 이 지난 cache 는 사용하지 않고 api 로 조회. None 이면 만료되지 않음
+EXPIRE_TTL: Optional[float] = None
+
+
+class Freshness(enum.Enum):
+    FRESH = "fresh"  # 그대로 사용
+    STALE = "stale"  # 사용하고 background 에서 갱신
+    EXPIRED = "expired"  # 사용하지 않고 api 로 조회
+
+
+class FreshnessPolicy:
+    """cache 된 nft metadata 의 저장 시각(cached_at) 으로 사용 방법을 정한다.
+
+    cached_at 이 없는 (저장 시각 기록 이전의) 데이터는 fresh 로 본다.
+    배포 직후 이전 데이터 전체를 한꺼번에 갱신하지 않도록 하기 위함. 저장 시각은 다음 저장 시 기록됨.
+    """
+
+    def __init__(
+        self, fresh_ttl: float = FRESH_TTL, expire_ttl: Optional[float] = EXPIRE_TTL
+    ):
+        self.fresh_ttl = fresh_ttl
+        self.expire_ttl = expire_ttl
+
+    def check(self, nft: models.NftMetadata, now: Optional[float] = None) -> Freshness:
+        if nft.cached_at is None:
+            return Freshness.FRESH
+        age = (now if now is not None else time.time()) - nft.cached_at
+        if self.expire_ttl is not None and age > self.expire_ttl:
+            return Freshness.EXPIRED
+        if age > self.fresh_ttl:
+            return Freshness.STALE
+        return Freshness.FRESH
@@ -0,0 +1,246 @@
+"""collection 전체의 nft metadata (와 source) 를 미리 caching 하는 offline 명령.
+
+    python -m anv.ingest --chain klaytn --contract 0x... [--contract 0x...]
+"""
+import argparse
+import logging
+import threading
+import time
+from concurrent import futures
+from typing import Iterable, List, Optional, Sequence
+
+import dotenv
+import pydantic
+
+from anv import config, models, repository, service
+from anv.api import kas
+
+log = logging.getLogger(f"anv.{__name__}")
+
+# KAS 목록 조회 page 크기 최대값
+PAGE_SIZE = 1000
+WORKERS = 8
+
+# token uri 조회 초당 요청 수. 0 이면 제한하지 않음
+RATE = 10.0
+
+INGEST_CHAINS = (models.Chain.KLAYTN, models.Chain.KLAYTN_BAOBAB)
+
+
+class IngestError(Exception):
+    pass
+
+
+class IngestResult(pydantic.BaseModel):
+    contract_address: str
+    pages: int = 0
+    tokens: int = 0
+    skipped: int = 0  # 이미 cache 된 token
+    saved: int = 0
+    failed: int = 0
+    sources: int = 0
+    cursor: Optional[str]  # 마지막으로 처리한 page 의 다음 cursor. 중단된 경우 이어서 실행
+
+
+class RateLimiter:
+    """초당 rate 개 까지 허용하는 token bucket. 여러 thread 에서 공유한다."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(int(rate), 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CollectionIngester:
+    """contract 의 모든 nft 를 page 단위로 조회하여 metadata 를 만들고 page 마다 한 번에 저장한다.
+    token uri 조회는 workers 개의 thread 에서 rate 제한을 두고 실행한다.
+    """
+
+    def __init__(
+        self,
+        nft_service: service.KlaytnNFTServiceBase,
+        src_repo: Optional[repository.NFTSourceRepositoryProtocol] = None,
+        page_size: int = PAGE_SIZE,
+        workers: int = WORKERS,
+        rate: float = RATE,
+        resync: bool = False,
+    ):
+        self.nft_service = nft_service
+        self.src_repo = src_repo
+        self.page_size = page_size
+        self.workers = workers
+        self.rate_limiter = RateLimiter(rate)
+        self.resync = resync
+
+    def ingest(
+        self,
+        contract_address: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> IngestResult:
+        result = IngestResult(contract_address=contract_address, cursor=cursor)
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as exec:
+            while True:
+                page = self.nft_service.kas_api.get_nfts_by_contract(
+                    self.nft_service.kas_chain,
+                    contract_address,
+                    self.page_size,
+                    result.cursor,
+                )
+                nfts = page.owned_nfts
+                if limit is not None:
+                    nfts = nfts[: max(limit - result.tokens, 0)]
+                self._ingest_page(exec, nfts, result)
+                result.pages += 1
+                if len(nfts) < len(page.owned_nfts):
+                    # page 중간에 멈춘 경우 이어서 실행할 때 이 page 부터 (cache 된 token 은 건너뜀)
+                    return result
+                result.cursor = page.cursor or None
+                log.info(
+                    "ingest page done. contract=%s pages=%s tokens=%s saved=%s failed=%s cursor=%s",
+                    contract_address,
+                    result.pages,
+                    result.tokens,
+                    result.saved,
+                    result.failed,
+                    result.cursor,
+                )
+                if not result.cursor:
+                    return result
+
+    def _ingest_page(
+        self,
+        exec: futures.Executor,
+        nfts: Sequence[kas.KlaytnOwnedNft],
+        result: IngestResult,
+    ):
+        result.tokens += len(nfts)
+        targets = [nft for nft in nfts if self.resync or not self._is_cached(nft)]
+        result.skipped += len(nfts) - len(targets)
+
+        metadata_list: List[models.NftMetadata] = []
+        future_to_nft = {exec.submit(self._build_metadata, nft): nft for nft in targets}
+        for f in futures.as_completed(future_to_nft):
+            nft = future_to_nft[f]
+            try:
+                metadata_list.append(f.result())
+            except Exception as e:
+                log.warning("ingest nft error. %s. nft=%s", e, nft)
+                result.failed += 1
+
+        if metadata_list:
+            self.nft_service.repo.set_NFT_metadata_many(metadata_list)
+            result.saved += len(metadata_list)
+
+        if self.src_repo is not None:
+            result.sources += self._cache_sources(exec, self.src_repo, metadata_list)
+
+    def _is_cached(self, nft: kas.KlaytnOwnedNft) -> bool:
+        return (
+            self.nft_service.repo.get_NFT_metadata(
+                self.nft_service.chain, nft.contract_address, nft.token_id
+            )
+            is not None
+        )
+
+    def _build_metadata(self, nft: kas.KlaytnOwnedNft) -> models.NftMetadata:
+        self.rate_limiter.acquire()
+        # --resync 는 바뀐 token uri 데이터를 가져와야 하므로 token_uri_cache 를 사용하지 않음
+        return self.nft_service.build_nft_metadata(nft, use_cache=not self.resync)
+
+    def _cache_sources(
+        self,
+        exec: futures.Executor,
+        src_repo: repository.NFTSourceRepositoryProtocol,
+        metadata_list: Iterable[models.NftMetadata],
+    ) -> int:
+        def cache_source(nft: models.NftMetadata):
+            self.rate_limiter.acquire()
+            src_repo.cache_nft_source(nft)
+
+        count = 0
+        future_to_nft = {
+            exec.submit(cache_source, nft): nft
+            for nft in metadata_list
+            if nft.source_url is None
+        }
+        for f in futures.as_completed(future_to_nft):
+            try:
+                f.result()
+                count += 1
+            except Exception as e:
+                log.warning("ingest source error. %s. nft=%s", e, future_to_nft[f])
+        return count
+
+
+def get_nft_service(
+    app_config: config.AppConfig, chain: models.Chain
+) -> service.KlaytnNFTServiceBase:
+    if chain == models.Chain.KLAYTN:
+        return app_config.get_klaytn_nft_service()
+    if chain == models.Chain.KLAYTN_BAOBAB:
+        return app_config.get_klaytn_baobob_nft_service()
+    raise IngestError(f"unsupported chain {chain.value}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m anv.ingest", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        "--chain",
+        required=True,
+        choices=[chain.value for chain in INGEST_CHAINS],
+    )
+    parser.add_argument("--contract", required=True, action="append")
+    parser.add_argument("--cursor", help="이어서 실행할 page cursor. contract 하나인 경우만")
+    parser.add_argument("--limit", type=int, help="contract 마다 처리할 최대 token 수")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rate", type=float, default=RATE, help="초당 요청 수")
+    parser.add_argument("--resync", action="store_true", help="cache 된 token 도 다시 조회")
+    parser.add_argument("--sources", action="store_true", help="source 도 caching")
+    args = parser.parse_args(argv)
+    if args.cursor and len(args.contract) > 1:
+        parser.error("--cursor 는 contract 하나인 경우만 사용할 수 있음")
+
+    logging.basicConfig(level=logging.INFO)
+    dotenv.load_dotenv()
+    app_config = config.AppConfig()
+    try:
+        ingester = CollectionIngester(
+            get_nft_service(app_config, models.Chain(args.chain)),
+            app_config.get_nft_src_repository() if args.sources else None,
+            page_size=args.page_size,
+            workers=args.workers,
+            rate=args.rate,
+            resync=args.resync,
+        )
+        for contract_address in args.contract:
+            result = ingester.ingest(contract_address, args.cursor, args.limit)
+            print(result.json())
+    finally:
+        app_config.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,54 @@
 import pathlib
-import tempfile
+from typing import Optional, Tuple
 
+from anv import render
 
-from svglib.svglib import svg2rlg
-from reportlab.graphics import renderPM
 
+def svg_text_to_png(
+    svg_text: str, output_path: pathlib.Path, max_size: int = render.SVG_MAX_SIZE
+) -> pathlib.Path:
+    """dpi 1440 으로 변환한다. 단 png 의 긴 변은 max_size(px) 를 넘지 않도록 dpi 를 낮춘다.
+    (기본값 SVG_RENDER_MAX_SIZE, 2048px)
+    """
+    target = output_path / "img.png"
+    target.write_bytes(
+        render.render_svg_to_png(svg_text, dpi=72 * 20, max_size=max_size)
+    )
+    return target
 
-def svg_text_to_png(svg_text: str, output_path: pathlib.Path) -> pathlib.Path:
-    with tempfile.TemporaryDirectory() as dir:
-        svg_filepath = pathlib.Path(dir) / "tmp.svg"
-        with svg_filepath.open("w") as f:
-            f.write(svg_text)
 
-        drawing = svg2rlg(svg_filepath)
-        target = output_path / "img.png"
+class RangeNotSatisfiableError(Exception):
+    pass
 
-        renderPM.drawToFile(drawing, target, dpi=72 * 20, fmt="PNG")
-        return target
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """HTTP Range header 를 (start, end) 로 변환. end 포함.
+    header 가 없거나, 형식이 잘못되었거나, 여러 구간을 요청한 경우 None (전체 전송).
+    요청 구간이 파일 범위를 벗어난 경우 RangeNotSatisfiableError.
+    """
+    if not range_header:
+        return None
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, sep, end_text = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:  # bytes=-500 : 마지막 500 byte
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiableError(range_header)
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiableError(range_header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
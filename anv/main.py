@@ -1,12 +1,17 @@
 from concurrent import futures
 import logging
-from typing import List
+from typing import AbstractSet, Callable, Iterator, List, Optional, Set
 
 import dotenv
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+import orjson
+import pydantic
+import requests
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from anv import config, models, service, repository
+from anv import codec, config, lib, models, responses, service, repository, timeouts
 
 log = logging.getLogger("anv")
 log.setLevel(logging.DEBUG)
@@ -14,6 +19,14 @@ log.addHandler(logging.StreamHandler())
 
 dotenv.load_dotenv()
 
+# 목록 응답에서 기본으로 제외하는 항목. nft 원본 데이터는 크기가 크므로 fields 로 요청한 경우만 포함
+# 기본 항목의 응답은 nft 마다 보관된 json fragment 를 사용한다
+LIST_EXCLUDE = codec.FRAGMENT_EXCLUDE
+NFT_KEY_FIELDS = {"chain", "contract_address", "token_id"}
+
+# /v1/source 응답의 Cache-Control. uri hash 의 source 는 바뀌지 않으므로 1년
+SOURCE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 app = FastAPI()
 app_config = config.AppConfig()
 
@@ -32,62 +45,358 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def startup():
+    # 첫 요청 전에 service, repository, api client 를 만들어 둔다
+    app_config.startup()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    app_config.close()
+
+
+async def get_nft_service() -> service.NFTService:
+    return app_config.get_nft_service()
+
+
+async def get_nft_src_repository() -> repository.NFTSourceRepositoryProtocol:
+    return app_config.get_nft_src_repository()
+
+
 @app.get("/")
 async def root():
     log.debug("GET /")
     return {"message": "nft viewer api"}
 
 
+# service 조회는 deadline 까지 기다리는 blocking 작업이므로 async 가 아닌 함수로 선언하여
+# event loop 대신 threadpool 에서 실행한다
 @app.get("/v1/nfts/{chain}", response_model=models.NftResponse)
-async def get_nft_by_owner_v1(
+def get_nft_by_owner_v1(
     chain: models.Chain,
     owner: str,
     background_tasks: BackgroundTasks,
     cursor: str = None,
     resync: bool = False,
+    incremental: bool = False,
+    cache_only: bool = False,
+    timeout: float = timeouts.REQUEST_TIMEOUT,
+    fields: str = None,
+    nft_service: service.NFTService = Depends(get_nft_service),
+    repo: repository.NFTSourceRepositoryProtocol = Depends(get_nft_src_repository),
 ):
-    nft_service = app_config.get_nft_service()
-    owned_nfts_result = nft_service.get_NFTs_by_owner(
-        chain=chain, owner=owner, cursor=cursor, resync=resync
+    """timeout(초) 내에 조회하지 못한 nft 는 pending 으로 반환한다.
+    pending nft 는 background 에서 조회가 계속되어 이후 token 단위 조회로 받을 수 있다.
+    fields 는 ',' 로 구분된 응답 항목. 없으면 token_data 를 제외한 전체.
+    incremental 은 지난 sync 이후 소유권이 바뀐 nft 만 resync 한다.
+    cache_only 는 조회한 적이 있는 wallet 을 ownership index 와 cache 로 바로 응답하고
+    목록은 background 에서 다시 조회한다. 조회한 적이 없는 wallet 은 일반 조회와 같다.
+    """
+    exclude = get_nft_exclude(fields, LIST_EXCLUDE)
+    owned_nfts_result = None
+    if cache_only:
+        try:
+            owned_nfts_result = nft_service.get_indexed_NFTs_by_owner(
+                chain, owner, cursor
+            )
+        except service.NFTServiceError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if owned_nfts_result is None:
+        try:
+            owned_nfts_result = nft_service.get_NFTs_by_owner(
+                chain=chain,
+                owner=owner,
+                cursor=cursor,
+                resync=resync,
+                deadline=timeouts.Deadline(timeout),
+                incremental=incremental,
+            )
+        except (
+            timeouts.DeadlineExceeded,
+            requests.exceptions.Timeout,
+            service.NFTServiceTimeoutError,
+        ) as e:
+            # 목록 조회가 시간 내에 끝나지 않은 경우. token 단위 조회와 같이 504
+            raise HTTPException(status_code=504, detail=str(e))
+
+    task_list = list(filter(lambda nft: nft.source_url is None, owned_nfts_result.nfts))
+    background_tasks.add_task(cache_nft_source_list, task_list, repo)
+
+    if "token_data" not in exclude:
+        owned_nfts_result.nfts = nft_service.load_token_data(owned_nfts_result.nfts)
+    response = models.NftResponse(
+        items=owned_nfts_result.nfts,
+        cursor=owned_nfts_result.cursor,
+        pending=owned_nfts_result.pending,
     )
+    return responses.NftListResponse(response, exclude)
+
+
+@app.get("/v1/nfts", response_model=models.MultiChainNftResponse)
+def get_nft_by_owner_multi_chain_v1(
+    owner: str,
+    background_tasks: BackgroundTasks,
+    chains: str = None,
+    cursor: str = None,
+    resync: bool = False,
+    incremental: bool = False,
+    timeout: float = service.MULTI_CHAIN_TIMEOUT,
+    fields: str = None,
+    nft_service: service.NFTService = Depends(get_nft_service),
+    repo: repository.NFTSourceRepositoryProtocol = Depends(get_nft_src_repository),
+):
+    """여러 chain 의 nft 목록을 동시에 조회한다. chains 는 ',' 로 구분된 chain 목록"""
+    exclude = get_nft_exclude(fields, LIST_EXCLUDE)
+    try:
+        chain_list = (
+            [models.Chain(chain.strip()) for chain in chains.split(",")]
+            if chains
+            else None
+        )
+        owned_nfts_result = nft_service.get_NFTs_by_owner_multi_chain(
+            owner=owner,
+            chains=chain_list,
+            cursor=cursor,
+            resync=resync,
+            deadline=timeouts.Deadline(timeout),
+            incremental=incremental,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except service.NFTServiceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     task_list = list(filter(lambda nft: nft.source_url is None, owned_nfts_result.nfts))
-    repo = app_config.get_nft_src_repository()
     background_tasks.add_task(cache_nft_source_list, task_list, repo)
 
-    return models.NftResponse(
-        items=owned_nfts_result.nfts, cursor=owned_nfts_result.cursor
+    if "token_data" not in exclude:
+        owned_nfts_result.nfts = nft_service.load_token_data(owned_nfts_result.nfts)
+    response = models.MultiChainNftResponse(
+        items=owned_nfts_result.nfts,
+        cursor=owned_nfts_result.cursor,
+        pending=owned_nfts_result.pending,
+        pending_chains=owned_nfts_result.pending_chains,
+        failed_chains=owned_nfts_result.failed_chains,
+    )
+    return responses.NftListResponse(response, exclude)
+
+
+@app.get("/v1/nfts/{chain}/stream")
+async def stream_nft_by_owner_v1(
+    chain: models.Chain,
+    owner: str,
+    format: models.StreamFormat = models.StreamFormat.NDJSON,
+    resync: bool = False,
+    fields: str = None,
+    nft_service: service.NFTService = Depends(get_nft_service),
+    repo: repository.NFTSourceRepositoryProtocol = Depends(get_nft_src_repository),
+):
+    """wallet 의 모든 nft 를 준비되는 대로 ndjson 또는 server-sent events 로 전송한다.
+    cache 된 nft 가 먼저 전송되고, cache 가 없는 nft 의 source 는 전송 완료 후 caching 한다.
+    """
+    exclude = get_nft_exclude(fields, LIST_EXCLUDE)
+    nfts = nft_service.iter_NFTs_by_owner(chain=chain, owner=owner, resync=resync)
+
+    task_list: List[models.NftMetadata] = []
+    media_type = (
+        "text/event-stream"
+        if format == models.StreamFormat.SSE
+        else "application/x-ndjson"
+    )
+    # cache 에서 읽은 nft 는 token_data 가 없으므로 전송 전에 nft 마다 채운다
+    load_token_data = (
+        nft_service.load_token_data if "token_data" not in exclude else None
+    )
+    return StreamingResponse(
+        stream_nfts(nfts, format, task_list, exclude, load_token_data),
+        media_type=media_type,
+        background=BackgroundTask(cache_nft_source_list, task_list, repo),
     )
 
 
 @app.get(
     "/v1/nfts/{chain}/{contract_address}/{token_id}", response_model=models.NftMetadata
 )
-async def get_nft_by_contract_token_id_v1(
+def get_nft_by_contract_token_id_v1(
     chain: models.Chain,
     contract_address: str,
     token_id: str,
     background_tasks: BackgroundTasks,
     resync: bool = False,
+    timeout: float = timeouts.REQUEST_TIMEOUT,
+    fields: str = None,
+    nft_service: service.NFTService = Depends(get_nft_service),
+    repo: repository.NFTSourceRepositoryProtocol = Depends(get_nft_src_repository),
 ):
+    exclude = get_nft_exclude(fields)
     try:
-        nft_service = app_config.get_nft_service()
         nft = nft_service.get_NFT_by_contract_token_id(
             chain=chain,
             contract_address=contract_address,
             token_id=token_id,
             resync=resync,
+            deadline=timeouts.Deadline(timeout),
         )
         if nft:
-            repo = app_config.get_nft_src_repository()
             background_tasks.add_task(cache_nft_source, nft, repo)
-            return nft
+            if "token_data" not in exclude:
+                nft = nft_service.load_token_data([nft])[0]
+            return json_response(nft, exclude)
         else:
             raise HTTPException(status_code=404, detail="not found.")
+    except service.NFTServiceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except service.NFTServiceError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/v1/cache/stats")
+def get_cache_stats_v1():
+    """cache 별 tier (local, shared) hit 수"""
+    return app_config.get_cache_stats()
+
+
+@app.get("/v1/source/{uri_hash}")
+def get_source_v1(
+    uri_hash: str,
+    request: Request,
+    repo: repository.NFTSourceRepositoryProtocol = Depends(get_nft_src_repository),
+):
+    """caching 된 NFT source. Range, If-None-Match 요청을 지원한다.
+    uri hash 에 해당하는 source 는 바뀌지 않으므로 오래 caching 하도록 응답한다.
+    """
+    source = repo.get_source(uri_hash)
+    if source is None:
+        raise HTTPException(status_code=404, detail="not found.")
+
+    etag = f'"{source.digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": SOURCE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        # 다른 버전의 일부를 받은 경우 전체 전송
+        range_header = None
+    try:
+        byte_range = lib.parse_range(range_header, source.size)
+    except lib.RangeNotSatisfiableError:
+        return Response(
+            status_code=416, headers={"Content-Range": f"bytes */{source.size}"}
+        )
+
+    status_code = 200
+    start, end = 0, source.size - 1
+    if byte_range:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{source.size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    if source.size == 0:
+        return Response(
+            status_code=200, headers=headers, media_type=source.content_type
+        )
+    if source.path is not None:
+        # disk 에 있는 source 는 generator 를 거치지 않고 파일에서 바로 전송
+        return responses.FileRangeResponse(
+            source.path,
+            start,
+            end,
+            status_code=status_code,
+            headers=headers,
+            media_type=source.content_type,
+            method=request.method,
+        )
+    return StreamingResponse(
+        repo.read_source(source, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=source.content_type,
+    )
+
+
+def get_nft_exclude(
+    fields: Optional[str], default_exclude: AbstractSet[str] = frozenset()
+) -> Set[str]:
+    """fields query parameter 로 응답에서 제외할 NftMetadata 항목을 구한다.
+    fields 가 없으면 default_exclude. chain, contract_address, token_id 는 항상 포함.
+    """
+    if not fields:
+        return set(default_exclude)
+    include = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = include - models.NftMetadata.__fields__.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"unknown fields. {','.join(sorted(unknown))}"
+        )
+    return models.NftMetadata.__fields__.keys() - include - NFT_KEY_FIELDS
+
+
+def json_response(data: pydantic.BaseModel, exclude) -> Response:
+    return responses.ModelResponse(data, exclude)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak 비교. W/"..." 도 같은 것으로 처리
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag in (etag, f"W/{etag}") for tag in tags)
+
+
+def stream_nfts(
+    nfts: Iterator[models.NftMetadata],
+    stream_format: models.StreamFormat,
+    task_list: List[models.NftMetadata],
+    exclude: Optional[Set[str]] = None,
+    load_token_data: Optional[
+        Callable[[List[models.NftMetadata]], List[models.NftMetadata]]
+    ] = None,
+) -> Iterator[str]:
+    """nft metadata 를 stream format 에 맞게 변환한다.
+    source_url 이 None 인 nft 는 task_list 에 추가하여 전송 후 cache 작업을 한다.
+    load_token_data 가 있으면 token_data 를 채운 nft 를 전송한다.
+    """
+    sse = stream_format == models.StreamFormat.SSE
+    try:
+        for nft in nfts:
+            if nft.source_url is None:
+                task_list.append(nft)
+            if load_token_data is not None:
+                nft = load_token_data([nft])[0]
+            data = (
+                codec.fragment(nft)
+                if exclude == codec.FRAGMENT_EXCLUDE
+                else codec.to_json(nft, exclude)
+            ).decode("utf-8")
+            if sse:
+                yield f"event: nft\ndata: {data}\n\n"
+            else:
+                yield f"{data}\n"
+    except Exception as e:
+        # response 전송이 시작된 후에는 status code 를 바꿀 수 없으므로 마지막에 error 를 전송
+        # client 가 지갑의 끝과 오류로 중단된 경우를 구분할 수 있도록 하기 위함
+        log.exception("stream nft error. %s", e)
+        error = orjson.dumps({"error": str(e)}).decode("utf-8")
+        if sse:
+            yield f"event: error\ndata: {error}\n\n"
+        else:
+            yield f"{error}\n"
+        return
+
+    if sse:
+        yield "event: end\ndata: {}\n\n"
+
+
 def cache_nft_source_list(
     nft_list: List[models.NftMetadata], repo: repository.NFTSourceRepositoryProtocol
 ):
@@ -15,6 +15,11 @@ class Chain(enum.Enum):
     BINANCE_TESTNET = "binance_testnet"
 
 
+class StreamFormat(enum.Enum):
+    NDJSON = "ndjson"
+    SSE = "sse"
+
+
 class NftAttribute(pydantic.BaseModel):
     display_type: Optional[str]
     trait_type: str
@@ -28,6 +33,13 @@ class NftUrl(pydantic.BaseModel):
     h750: Optional[str]
     h1000: Optional[str]
     content_type: Optional[str]
+    webp: Optional["NftUrl"]  # webp 로 변환된 이미지 url
+    avif: Optional["NftUrl"]  # avif 로 변환된 이미지 url
+    poster: Optional[str]  # video, audio 의 대표 이미지 url
+    preview: Optional[str]  # video, audio 의 짧은 저용량 preview url
+
+
+NftUrl.update_forward_refs()
 
 
 class NftMetadata(pydantic.BaseModel):
@@ -47,14 +59,64 @@ class NftMetadata(pydantic.BaseModel):
     attributes: Optional[List[NftAttribute]]
     token_data: Optional[dict]  # nft 원본 데이터
     cached: bool = True  # cache 데이터인지 ? API 데이터인지
+    cached_at: Optional[int]  # api 로 조회하여 저장한 시각 (unix seconds)
+
+    # 목록 응답용 json fragment (codec.fragment). 항목이 바뀌면 버린다
+    _json: Optional[bytes] = pydantic.PrivateAttr(None)
+
+    class Config:
+        # NftResponse 등에 넣을 때 복사하지 않음. 복사본에 만든 fragment 는 재사용되지 않으므로
+        copy_on_model_validation = "none"
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        # token_data 는 fragment 에 포함되지 않음
+        if name in self.__fields__ and name != "token_data":
+            object.__setattr__(self, "_json", None)
 
     def __str__(self) -> str:
         return f"[{self.chain} - {self.token_type}] {self.name} - {self.contract_address} - {self.token_id}"
 
 
+class PendingNft(pydantic.BaseModel):
+    """deadline 까지 조회하지 못한 nft. 이후 token 단위 조회로 받을 수 있음"""
+
+    chain: str
+    contract_address: str
+    token_id: str
+
+
+class SyncState(pydantic.BaseModel):
+    """wallet 의 incremental resync, ownership index 진행 상태"""
+
+    chain: str
+    owner: str  # 소문자 wallet address
+    synced_at: Optional[int]  # 이 시각 (unix seconds) 까지의 소유권 변경은 반영됨
+    started_at: Optional[int]  # 진행중인 sync 의 첫 page 조회 시각
+    listed_at: Optional[int]  # 진행중인 목록 조회의 첫 page 조회 시각
+    indexed_at: Optional[int]  # 소유 nft index 를 마지막으로 완성한 목록 조회 시각
+
+
+class OwnedToken(pydantic.BaseModel):
+    """ownership index 의 항목"""
+
+    contract_address: str
+    token_id: str
+    last_seen: int  # 마지막으로 소유를 확인한 시각 (unix seconds)
+
+
 class NftResponse(pydantic.BaseModel):
     cursor: Optional[str]
     items: Optional[List[NftMetadata]]
+    pending: Optional[List[PendingNft]]
+
+
+class MultiChainNftResponse(pydantic.BaseModel):
+    cursor: Optional[str]
+    items: Optional[List[NftMetadata]]
+    pending: Optional[List[PendingNft]]
+    pending_chains: Optional[List[Chain]]  # 제한시간 내 응답하지 않은 chain
+    failed_chains: Optional[List[Chain]]  # 오류가 발생한 chain
 
 
 class KlaytnNftContract(pydantic.BaseModel):
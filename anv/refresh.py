@@ -0,0 +1,74 @@
+import logging
+import threading
+from concurrent import futures
+from typing import Any, Callable, Hashable, Optional, Set
+
+log = logging.getLogger(f"anv.{__name__}")
+
+REFRESH_WORKERS = 4
+
+# 대기중인 작업 수 최대값. 넘으면 새 작업은 버린다
+MAX_PENDING = 1_000
+
+
+class BackgroundRefresher:
+    """응답을 먼저 보내고 데이터 갱신은 background thread 에서 실행한다.
+
+    같은 key 의 작업이 대기중이거나 실행중이면 새로 등록하지 않는다.
+    """
+
+    def __init__(self, workers: int = REFRESH_WORKERS, max_pending: int = MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._exec: Optional[futures.ThreadPoolExecutor] = None
+        self._keys: Set[Hashable] = set()
+        # 아직 끝나지 않은 작업. close 시 실행 전인 작업을 취소
+        self._futures: Set[futures.Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(
+        self, key: Hashable, func: Callable[..., Any], *args: Any
+    ) -> Optional[futures.Future]:
+        """등록하지 않은 경우 None"""
+        with self._lock:
+            if key in self._keys:
+                return None
+            if len(self._keys) >= self.max_pending:
+                log.warning("too many refresh tasks. drop key=%s", key)
+                return None
+            if self._exec is None:
+                self._exec = futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="refresh"
+                )
+            self._keys.add(key)
+            future = self._exec.submit(self._run, key, func, *args)
+            self._futures.add(future)
+        future.add_done_callback(self._discard_future)
+        return future
+
+    def close(self):
+        with self._lock:
+            exec, self._exec = self._exec, None
+            self._keys.clear()
+            pending, self._futures = self._futures, set()
+        # shutdown(cancel_futures=True) 는 python 3.9 부터 지원
+        for future in pending:
+            future.cancel()
+        if exec:
+            exec.shutdown(wait=False)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _discard_future(self, future: futures.Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(self, key: Hashable, func: Callable[..., Any], *args: Any) -> Any:
+        try:
+            return func(*args)
+        except Exception as e:
+            log.exception("refresh error. %s. key=%s", e, key)
+        finally:
+            with self._lock:
+                self._keys.discard(key)
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Optional
+
+from anv import workers
+
+log = logging.getLogger(f"anv.{__name__}")
+
+# svg rasterize 기본 dpi
+SVG_DPI = int(os.getenv("SVG_RENDER_DPI", 72 * 10))
+
+# 결과 png 의 긴 변 최대 길이(px). 넘는 경우 dpi 를 낮춤
+SVG_MAX_SIZE = int(os.getenv("SVG_RENDER_MAX_SIZE", 2048))
+
+# svg 하나의 rasterize 에 허용되는 시간 (seconds)
+SVG_RENDER_TIMEOUT = float(os.getenv("SVG_RENDER_TIMEOUT", 10))
+
+# 복잡도 제한. 넘는 svg 는 rasterize 하지 않음
+SVG_MAX_BYTES = 5 * 1024 * 1024
+SVG_MAX_ELEMENTS = 100_000
+
+SVG_CACHE_DIR = pathlib.Path(
+    os.getenv("SVG_RENDER_CACHE_DIR", pathlib.Path(tempfile.gettempdir()) / "anv-svg")
+)
+# disk cache 크기 최대값(byte). 넘으면 오래 사용하지 않은 결과부터 삭제
+SVG_CACHE_MAX_BYTES = int(os.getenv("SVG_RENDER_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# cache 크기를 확인하는 주기 (저장 횟수). 매번 directory 전체를 읽지 않도록 하기 위함
+SVG_CACHE_EVICT_EVERY = 100
+
+
+class SvgRenderError(Exception):
+    pass
+
+
+class SvgTooComplexError(SvgRenderError):
+    pass
+
+
+def check_svg_complexity(svg_text: str):
+    if len(svg_text) > SVG_MAX_BYTES:
+        raise SvgTooComplexError(f"svg too large. size={len(svg_text)}")
+    elements = svg_text.count("<")
+    if elements > SVG_MAX_ELEMENTS:
+        raise SvgTooComplexError(f"svg too complex. elements={elements}")
+
+
+def render_svg_to_png(
+    svg_text: str, dpi: int = SVG_DPI, max_size: int = SVG_MAX_SIZE
+) -> bytes:
+    """svg 를 png 로 rasterize. 긴 변이 max_size(px) 를 넘지 않도록 dpi 를 조정한다.
+    process pool 에서 실행되므로 module level 함수로 둔다.
+    svglib, reportlab 은 import 시간이 길어 rasterize 하는 process 에서만 import 한다.
+    """
+    from reportlab.graphics import renderPM
+    from svglib.svglib import svg2rlg
+
+    check_svg_complexity(svg_text)
+    with io.StringIO(svg_text) as svg_buffer:
+        drawing = svg2rlg(svg_buffer)
+    if drawing is None:
+        raise SvgRenderError("invalid svg")
+
+    longest = max(drawing.width, drawing.height)
+    if longest > 0:
+        dpi = min(dpi, int(max_size * 72 / longest))
+    return renderPM.drawToString(drawing, fmt="PNG", dpi=max(dpi, 1))
+
+
+def render_svg_data_to_png(
+    svg_data: bytes, dpi: int = SVG_DPI, max_size: int = SVG_MAX_SIZE
+) -> bytes:
+    """utf-8 svg. 큰 svg 를 process pool 에 shared memory 로 전달할 때 사용"""
+    return render_svg_to_png(svg_data.decode("utf-8"), dpi, max_size)
+
+
+class SvgRenderer:
+    """svg rasterize 결과를 content hash 기준으로 disk 에 caching 하고,
+    rasterize 는 process pool 에서 실행한다.
+    pool 이 없으면 현재 process 에서 실행한다.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[workers.ProcessWorkerPool] = None,
+        cache_dir: Optional[pathlib.Path] = SVG_CACHE_DIR,
+        dpi: int = SVG_DPI,
+        max_size: int = SVG_MAX_SIZE,
+        timeout: float = SVG_RENDER_TIMEOUT,
+        cache_max_bytes: int = SVG_CACHE_MAX_BYTES,
+    ):
+        self.pool = pool
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cache_max_bytes = cache_max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def render(self, svg_text: str) -> bytes:
+        check_svg_complexity(svg_text)
+
+        cache_path = self._get_cache_path(svg_text)
+        if cache_path and cache_path.exists():
+            log.debug("svg render cache hit. %s", cache_path.name)
+            try:
+                png = cache_path.read_bytes()
+                # 사용 시각을 mtime 으로 기록. 삭제 시 오래 사용하지 않은 결과부터 지움
+                os.utime(cache_path)
+                return png
+            except FileNotFoundError:  # 다른 process 가 삭제한 경우
+                pass
+
+        if self.pool is None:
+            png = render_svg_to_png(svg_text, self.dpi, self.max_size)
+        else:
+            try:
+                png = self.pool.run_with_buffer(
+                    render_svg_data_to_png,
+                    svg_text.encode("utf-8"),
+                    self.dpi,
+                    self.max_size,
+                    timeout=self.timeout,
+                )
+            except workers.WorkerTimeoutError as e:
+                raise SvgRenderError(e)
+
+        if cache_path:
+            self._write_cache(cache_path, png)
+        return png
+
+    def _get_cache_path(self, svg_text: str) -> Optional[pathlib.Path]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(
+            f"{self.dpi}:{self.max_size}:{svg_text}".encode("utf-8")
+        ).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _write_cache(self, cache_path: pathlib.Path, png: bytes):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # 동시에 같은 svg 를 caching 하더라도 깨진 파일이 남지 않도록 rename 으로 교체
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(png)
+        os.replace(tmp_path, cache_path)
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % SVG_CACHE_EVICT_EVERY == 0
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        """cache 크기가 cache_max_bytes 를 넘으면 mtime 이 오래된 결과부터 삭제한다."""
+        assert self.cache_dir is not None
+        entries = []
+        for path in self.cache_dir.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.cache_max_bytes:
+            return
+        entries.sort(key=lambda entry: entry[0])
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.cache_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        log.info("svg render cache evicted. removed=%s size=%s", removed, total)
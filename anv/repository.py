@@ -5,28 +5,107 @@ import logging
 import mimetypes
 import os
 import pathlib
-from typing import Optional, Protocol
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent import futures
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urljoin
 
-import boto3
-import magic
-import mypy_boto3_s3
-import pymongo
+import orjson
 import requests
-from google.cloud import storage
-from reportlab.graphics import renderPM
-from svglib.svglib import svg2rlg
 
-from anv import models, aws_s3
+from anv import cache, codec, models, render, thumbnail, video, workers
 from anv.api import ipfs
 
+# backend 별 package (pymongo, boto3, google-cloud-storage, python-magic) 는
+# 시작 시간을 줄이기 위해 사용하는 시점에 import 한다
+if TYPE_CHECKING:
+    import pymongo
+
+    from anv import aws_s3
+
 log = logging.getLogger(f"anv.{__name__}")
 
+# nft 원본 데이터(token_data) 는 크기가 크므로 metadata 와 따로 저장
+TOKEN_DATA_EXCLUDE = {"token_data"}
+METADATA_PROJECTION = {"_id": 0, "token_data": 0}
+
+# sqlite 의 write lock 대기 시간 (seconds)
+SQLITE_BUSY_TIMEOUT = 30
+
+# DiskNFSSourceRepository 설정
+SOURCE_BASE_URL = os.getenv("NFT_SOURCE_BASE_URL", "http://localhost:8000/v1/source/")
+SOURCE_MAX_BYTES = int(os.getenv("NFT_SOURCE_MAX_BYTES", 10 * 1024**3))
+URI_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+SOURCE_CHUNK_SIZE = 1024 * 1024
+
+# resize 된 이미지는 원본과 같은 bucket 의 resized/ 아래에 저장
+RESIZED_PREFIX = "resized/"
+RESIZED_KEY_PATTERN = re.compile(rf"^{RESIZED_PREFIX}[0-9a-f]+(?:_h(\d+))?(\.\w+)$")
+VIDEO_ASSET_KEY_PATTERN = re.compile(
+    rf"^{RESIZED_PREFIX}[0-9a-f]+_(poster|preview)(\.\w+)$"
+)
+UPLOAD_WORKERS = 8
+
+# 이미지 하나의 resize 에 허용되는 시간 (seconds)
+THUMBNAIL_TIMEOUT = 30
+
+# video 하나의 poster, preview 추출에 허용되는 시간 (seconds)
+VIDEO_TIMEOUT = video.FFMPEG_TIMEOUT * 3
+
+
+# mime type 판별에 사용하는 source 앞부분 크기 (byte)
+MIME_SNIFF_BYTES = 8 * 1024
+
 
 def get_sha256(string: str) -> str:
     return hashlib.sha256(string.encode("utf-8")).hexdigest()
 
 
+def get_mime_type(data: bytes) -> str:
+    """앞 MIME_SNIFF_BYTES 만으로 판별한다. 큰 source 전체를 libmagic 이 검사하지 않도록 하기 위함."""
+    import magic
+
+    return magic.from_buffer(data[:MIME_SNIFF_BYTES], mime=True)
+
+
+def mark_cached(data: models.NftMetadata):
+    """저장하는 nft 를 cache 데이터로 표시한다.
+    저장 시각은 api 로 새로 만든 데이터에만 기록한다. 다른 저장소에서 읽은 데이터를 다시 저장해도 유지됨.
+    """
+    data.cached = True
+    if data.cached_at is None:
+        data.cached_at = int(time.time())
+
+
+def metadata_update(document: Dict[str, Any]) -> Dict[str, Any]:
+    """token_data 를 유지하는 mongodb update. document 는 None 항목이 제외되어 있으므로
+    None 이 된 항목(reveal 후 없어진 animation_url 등)은 $unset 으로 지운다.
+    """
+    update: Dict[str, Any] = {"$set": document}
+    unset = models.NftMetadata.__fields__.keys() - document.keys() - TOKEN_DATA_EXCLUDE
+    if unset:
+        update["$unset"] = {field: "" for field in sorted(unset)}
+    return update
+
+
 class NFTMetadataRespository(Protocol):
     def get_NFT_metadata(
         self, network: models.Chain, contract_address: str, token_id: str
@@ -38,8 +117,71 @@ class NFTMetadataRespository(Protocol):
     def set_NFT_metadata(self, data: models.NftMetadata) -> bool:
         """nft metadata 를 저장한다.
         이미 존재하는 nft metadata 인 경우 chain, contract_address, token_id 기준으로 기존 데이터를 덮어쓴다.
+        token_data 가 None 이면 기존 token_data 는 유지한다.
         """
 
+    def set_NFT_metadata_many(self, data_list: Sequence[models.NftMetadata]) -> bool:
+        """여러 nft metadata 를 저장한다. 한 번에 저장할 수 있는 repository 는 override"""
+        for data in data_list:
+            self.set_NFT_metadata(data)
+        return True
+
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        """nft 원본 데이터(token_data). get_NFT_metadata 에는 포함되지 않으므로 필요한 경우 따로 조회한다.
+        없으면 return None.
+        """
+
+    def get_sync_state(
+        self, network: models.Chain, owner: str
+    ) -> Optional[models.SyncState]:
+        """wallet 의 incremental resync 상태. 지원하지 않는 repository 는 None"""
+        return None
+
+    def set_sync_state(self, state: models.SyncState) -> bool:
+        return False
+
+    def get_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[models.OwnedToken]:
+        """ownership index 의 wallet 소유 nft. (contract_address, token_id) 순서
+
+        offset 부터 limit 개만 읽는다. limit = None 이면 끝까지.
+        """
+        return []
+
+    def set_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        tokens: Sequence[Tuple[str, str]],
+        seen_at: int,
+    ) -> bool:
+        """(contract_address, token_id) 목록의 last_seen 을 seen_at 으로 갱신한다."""
+        return False
+
+    def delete_owned_tokens(
+        self, network: models.Chain, owner: str, before: int
+    ) -> bool:
+        """before 이전에 마지막으로 확인된 (더 이상 소유하지 않는) 항목을 지운다."""
+        return False
+
+    def close(self):
+        """connection 등 resource 를 정리한다. app 종료 시 호출"""
+
+
+class SourceObject(NamedTuple):
+    key: str  # 저장소의 key. disk 인 경우 파일 경로
+    content_type: str
+    digest: str  # content hash. ETag 로 사용
+    size: int
+    path: Optional[pathlib.Path] = None  # disk 에 저장된 경우 파일 경로
+
 
 class NFTSourceRepositoryProtocol(Protocol):
     """NFT source(image, video) 를 caching 하는 저장소.
@@ -49,9 +191,19 @@ class NFTSourceRepositoryProtocol(Protocol):
     def cache_nft_source(self, nft: models.NftMetadata):
         pass
 
+    def get_source(self, uri_hash: str) -> Optional[SourceObject]:
+        """uri hash 로 저장된 source. 없으면 return None"""
+
+    def read_source(
+        self, source: SourceObject, start: int, end: int
+    ) -> Iterator[bytes]:
+        """source 의 start ~ end(포함) byte 를 chunk 단위로 return"""
+
 
 class DiskRepository(NFTMetadataRespository):
-    """NFT metadat 를 disk 에 caching 한다. test 용"""
+    """NFT metadat 를 disk 에 caching 한다. test 용
+    token_data 는 metadata 와 다른 파일에 저장한다.
+    """
 
     def __init__(self):
         self.repo_dir = pathlib.Path(__file__).parent / ".data"
@@ -63,6 +215,8 @@ class DiskRepository(NFTMetadataRespository):
         if not json_filepath.exists():
             return None
         result = models.NftMetadata.parse_file(json_filepath)
+        # token_data 를 같이 저장하던 이전 파일
+        result.token_data = None
         result.cached = True
         return result
 
@@ -77,16 +231,47 @@ class DiskRepository(NFTMetadataRespository):
         if not json_filepath.parent.exists():
             json_filepath.parent.mkdir()
 
+        mark_cached(data)
+        # cache 에서 읽은 데이터(token_data 없음) 를 다시 저장하는 경우. 기존 token_data 유지
+        if data.token_data is not None:
+            with self._get_token_data_filepath(json_filepath).open("w") as f:
+                f.write(json.dumps(data.token_data, indent=4))
+        elif json_filepath.exists():
+            self._move_legacy_token_data(json_filepath)
         with json_filepath.open("w") as f:
-            f.write(json.dumps(data.dict(), indent=4))
+            f.write(json.dumps(data.dict(exclude=TOKEN_DATA_EXCLUDE), indent=4))
         return True
 
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        json_filepath = self._get_json_filepath(network, contract_address, token_id)
+        token_data_filepath = self._get_token_data_filepath(json_filepath)
+        if token_data_filepath.exists():
+            return json.loads(token_data_filepath.read_text())
+        if json_filepath.exists():
+            return json.loads(json_filepath.read_text()).get("token_data")
+        return None
+
+    def _move_legacy_token_data(self, json_filepath: pathlib.Path):
+        """token_data 를 같이 저장하던 이전 파일을 덮어쓰기 전에 token_data 를 옮긴다."""
+        token_data_filepath = self._get_token_data_filepath(json_filepath)
+        if token_data_filepath.exists():
+            return
+        token_data = json.loads(json_filepath.read_text()).get("token_data")
+        if token_data is not None:
+            with token_data_filepath.open("w") as f:
+                f.write(json.dumps(token_data, indent=4))
+
     def _get_json_filepath(
         self, network: models.Chain, contract_address: str, token_id: str
     ):
         filename = get_sha256(f"{network.value}_{contract_address}_{token_id}")
         return self.repo_dir / pathlib.Path(network.value) / f"{filename}.json"
 
+    def _get_token_data_filepath(self, json_filepath: pathlib.Path) -> pathlib.Path:
+        return json_filepath.with_suffix(".token_data.json")
+
 
 class DBRepository(NFTMetadataRespository):
     def get_NFT_metadata(
@@ -100,10 +285,475 @@ class DBRepository(NFTMetadataRespository):
     ) -> bool:
         return True
 
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        return None
+
+
+class SqliteRepository(NFTMetadataRespository):
+    """NFT metadata 를 sqlite 파일 하나에 caching 한다.
+    local cache tier 또는 mongodb 없이 운영하는 경우 사용.
+
+    WAL mode 로 읽기와 쓰기가 서로 막지 않으며, connection 은 thread 별로 만든다.
+    (chain, contract_address, token_id) 가 primary key 이므로 contract 단위 조회가 빠르다.
+    """
+
+    def __init__(self, db_path: Optional[pathlib.Path] = None):
+        self.db_path = db_path or pathlib.Path(__file__).parent / ".data" / "nft.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS nft_metadata (
+                    chain TEXT NOT NULL,
+                    contract_address TEXT NOT NULL,
+                    token_id TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    updated_at REAL NOT NULL,
+                    fragment BLOB,
+                    PRIMARY KEY (chain, contract_address, token_id)
+                ) WITHOUT ROWID
+                """
+            )
+            columns = {
+                row[1] for row in conn.execute("PRAGMA table_info(nft_metadata)")
+            }
+            if "fragment" not in columns:  # fragment 이전에 만든 db
+                conn.execute("ALTER TABLE nft_metadata ADD COLUMN fragment BLOB")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS nft_token_data (
+                    chain TEXT NOT NULL,
+                    contract_address TEXT NOT NULL,
+                    token_id TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (chain, contract_address, token_id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    chain TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    synced_at INTEGER,
+                    started_at INTEGER,
+                    listed_at INTEGER,
+                    indexed_at INTEGER,
+                    PRIMARY KEY (chain, owner)
+                ) WITHOUT ROWID
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sync_state)")}
+            for column in ("listed_at", "indexed_at"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE sync_state ADD COLUMN {column} INTEGER")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ownership (
+                    chain TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    contract_address TEXT NOT NULL,
+                    token_id TEXT NOT NULL,
+                    last_seen INTEGER NOT NULL,
+                    PRIMARY KEY (chain, owner, contract_address, token_id)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def get_NFT_metadata(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[models.NftMetadata]:
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT data, fragment FROM nft_metadata"
+                " WHERE chain = ? AND contract_address = ? AND token_id = ?",
+                (network.value, contract_address, token_id),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return self._decode(*row)
+
+    def set_NFT_metadata(self, data: models.NftMetadata) -> bool:
+        return self.set_NFT_metadata_many([data])
+
+    def set_NFT_metadata_many(self, data_list: Sequence[models.NftMetadata]) -> bool:
+        """여러 nft metadata 를 한 transaction 으로 저장한다.
+        token_data 는 별도 table 에 저장하고, 목록 응답용 json fragment 를 같이 저장한다.
+        """
+        now = time.time()
+        rows = [
+            (
+                data.chain,
+                data.contract_address,
+                data.token_id,
+                self._encode(data),
+                now,
+                codec.fragment(data),
+            )
+            for data in data_list
+        ]
+        token_data_rows = [
+            (
+                data.chain,
+                data.contract_address,
+                data.token_id,
+                orjson.dumps(data.token_data),
+            )
+            for data in data_list
+            if data.token_data is not None
+        ]
+        with self._get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO nft_metadata"
+                " (chain, contract_address, token_id, data, updated_at, fragment)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO nft_token_data"
+                " (chain, contract_address, token_id, data) VALUES (?, ?, ?, ?)",
+                token_data_rows,
+            )
+        return True
+
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT data FROM nft_token_data"
+                " WHERE chain = ? AND contract_address = ? AND token_id = ?",
+                (network.value, contract_address, token_id),
+            )
+            .fetchone()
+        )
+        return orjson.loads(row[0]) if row else None
+
+    def get_NFT_metadata_by_contract(
+        self,
+        network: models.Chain,
+        contract_address: str,
+        after_token_id: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[models.NftMetadata]:
+        """contract 의 nft metadata 를 token_id(문자열) 순서로 limit 개 return.
+        다음 page 는 마지막 token_id 를 after_token_id 로 넘겨 조회한다.
+        """
+        rows = (
+            self._get_connection()
+            .execute(
+                "SELECT data, fragment FROM nft_metadata"
+                " WHERE chain = ? AND contract_address = ? AND token_id > ?"
+                " ORDER BY token_id LIMIT ?",
+                (network.value, contract_address, after_token_id or "", limit),
+            )
+            .fetchall()
+        )
+        return [self._decode(*row) for row in rows]
+
+    def get_sync_state(
+        self, network: models.Chain, owner: str
+    ) -> Optional[models.SyncState]:
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT synced_at, started_at, listed_at, indexed_at FROM sync_state"
+                " WHERE chain = ? AND owner = ?",
+                (network.value, owner.lower()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return models.SyncState(
+            chain=network.value,
+            owner=owner.lower(),
+            synced_at=row[0],
+            started_at=row[1],
+            listed_at=row[2],
+            indexed_at=row[3],
+        )
+
+    def set_sync_state(self, state: models.SyncState) -> bool:
+        with self._get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state"
+                " (chain, owner, synced_at, started_at, listed_at, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    state.chain,
+                    state.owner,
+                    state.synced_at,
+                    state.started_at,
+                    state.listed_at,
+                    state.indexed_at,
+                ),
+            )
+        return True
+
+    def get_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[models.OwnedToken]:
+        rows = (
+            self._get_connection()
+            .execute(
+                "SELECT contract_address, token_id, last_seen FROM ownership"
+                " WHERE chain = ? AND owner = ?"
+                " ORDER BY contract_address, token_id LIMIT ? OFFSET ?",
+                (network.value, owner.lower(), -1 if limit is None else limit, offset),
+            )
+            .fetchall()
+        )
+        return [
+            models.OwnedToken(
+                contract_address=row[0], token_id=row[1], last_seen=row[2]
+            )
+            for row in rows
+        ]
+
+    def set_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        tokens: Sequence[Tuple[str, str]],
+        seen_at: int,
+    ) -> bool:
+        with self._get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ownership"
+                " (chain, owner, contract_address, token_id, last_seen)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (network.value, owner.lower(), contract_address, token_id, seen_at)
+                    for contract_address, token_id in tokens
+                ],
+            )
+        return True
+
+    def delete_owned_tokens(
+        self, network: models.Chain, owner: str, before: int
+    ) -> bool:
+        with self._get_connection() as conn:
+            conn.execute(
+                "DELETE FROM ownership WHERE chain = ? AND owner = ? AND last_seen < ?",
+                (network.value, owner.lower(), before),
+            )
+        return True
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            conn.close()
+            self._local.conn = None
+
+    def _encode(self, data: models.NftMetadata) -> bytes:
+        mark_cached(data)
+        return codec.encode(data, exclude=TOKEN_DATA_EXCLUDE)
+
+    def _decode(
+        self, raw: bytes, fragment: Optional[bytes] = None
+    ) -> models.NftMetadata:
+        data = codec.decode(raw)
+        # 다른 schema version 으로 저장된 fragment 는 현재 model 과 항목이 다를 수 있음
+        if fragment and raw[:1] == bytes([codec.SCHEMA_VERSION]):
+            data._json = fragment
+        return data
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class TieredRepository(NFTMetadataRespository):
+    """local(sqlite 등) 을 먼저 조회하고 없으면 remote(mongodb 등) 를 조회한다.
+    remote 에서 찾은 데이터는 local 에 저장하고, 저장은 둘 다 한다.
+    """
+
+    def __init__(self, local: NFTMetadataRespository, remote: NFTMetadataRespository):
+        self.local = local
+        self.remote = remote
+
+    def get_NFT_metadata(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[models.NftMetadata]:
+        result = self.local.get_NFT_metadata(network, contract_address, token_id)
+        if result:
+            return result
+
+        result = self.remote.get_NFT_metadata(network, contract_address, token_id)
+        if result:
+            self.local.set_NFT_metadata(result)
+        return result
+
+    def set_NFT_metadata(self, data: models.NftMetadata) -> bool:
+        self.remote.set_NFT_metadata(data)
+        return self.local.set_NFT_metadata(data)
+
+    def set_NFT_metadata_many(self, data_list: Sequence[models.NftMetadata]) -> bool:
+        self.remote.set_NFT_metadata_many(data_list)
+        return self.local.set_NFT_metadata_many(data_list)
+
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        result = self.local.get_NFT_token_data(network, contract_address, token_id)
+        if result is not None:
+            return result
+        return self.remote.get_NFT_token_data(network, contract_address, token_id)
+
+    def get_sync_state(
+        self, network: models.Chain, owner: str
+    ) -> Optional[models.SyncState]:
+        # 여러 instance 가 공유하는 remote 기준
+        return self.remote.get_sync_state(network, owner)
+
+    def set_sync_state(self, state: models.SyncState) -> bool:
+        return self.remote.set_sync_state(state)
+
+    def get_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[models.OwnedToken]:
+        return self.remote.get_owned_tokens(network, owner, offset, limit)
+
+    def set_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        tokens: Sequence[Tuple[str, str]],
+        seen_at: int,
+    ) -> bool:
+        return self.remote.set_owned_tokens(network, owner, tokens, seen_at)
+
+    def delete_owned_tokens(
+        self, network: models.Chain, owner: str, before: int
+    ) -> bool:
+        return self.remote.delete_owned_tokens(network, owner, before)
+
+    def close(self):
+        self.local.close()
+        self.remote.close()
+
+
+class CachedMetadataRepository(NFTMetadataRespository):
+    """repository 앞에 cache (process 안의 LRU cache, worker 간 shared cache) 를 둔다.
+    LRU cache 의 model 을 그대로 return 하므로 json fragment (codec.fragment) 도 재사용된다.
+    저장하면 cache 의 항목도 새 데이터로 바꾼다.
+    """
+
+    def __init__(
+        self,
+        repo: NFTMetadataRespository,
+        metadata_cache: Union[cache.LRUCache, cache.TieredCache],
+    ):
+        self.repo = repo
+        self.cache = metadata_cache
+
+    def get_NFT_metadata(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[models.NftMetadata]:
+        key = cache.metadata_key(network.value, contract_address, token_id)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        result = self.repo.get_NFT_metadata(network, contract_address, token_id)
+        if result is not None:
+            self.cache.set(key, result)
+        return result
+
+    def set_NFT_metadata(self, data: models.NftMetadata) -> bool:
+        result = self.repo.set_NFT_metadata(data)
+        self._set_cache(data)
+        return result
+
+    def set_NFT_metadata_many(self, data_list: Sequence[models.NftMetadata]) -> bool:
+        result = self.repo.set_NFT_metadata_many(data_list)
+        for data in data_list:
+            self._set_cache(data)
+        return result
+
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        return self.repo.get_NFT_token_data(network, contract_address, token_id)
+
+    def get_sync_state(
+        self, network: models.Chain, owner: str
+    ) -> Optional[models.SyncState]:
+        return self.repo.get_sync_state(network, owner)
+
+    def set_sync_state(self, state: models.SyncState) -> bool:
+        return self.repo.set_sync_state(state)
+
+    def get_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[models.OwnedToken]:
+        return self.repo.get_owned_tokens(network, owner, offset, limit)
+
+    def set_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        tokens: Sequence[Tuple[str, str]],
+        seen_at: int,
+    ) -> bool:
+        return self.repo.set_owned_tokens(network, owner, tokens, seen_at)
+
+    def delete_owned_tokens(
+        self, network: models.Chain, owner: str, before: int
+    ) -> bool:
+        return self.repo.delete_owned_tokens(network, owner, before)
+
+    def close(self):
+        self.repo.close()
+
+    def _set_cache(self, data: models.NftMetadata):
+        # token_data 는 get_NFT_metadata 에 포함되지 않으므로 cache 에서 제외
+        cached = data.copy(update={"token_data": None})
+        self.cache.set(
+            cache.metadata_key(data.chain, data.contract_address, data.token_id),
+            cached,
+        )
+
 
 class MongodbRepository(NFTMetadataRespository):
     def __init__(self):
-        self.client = self._get_mongo_client()
+        self._client: Optional["pymongo.MongoClient"] = None
+        self._lock = threading.Lock()
+        self._ownership_indexed = False
+
+    @property
+    def client(self) -> "pymongo.MongoClient":
+        # 처음 사용할 때 client 를 만든다. pymongo import 가 시작 시간에 포함되지 않도록
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._get_mongo_client()
+        return self._client
 
     def get_NFT_metadata(
         self, network: models.Chain, contract_address: str, token_id: str
@@ -113,30 +763,173 @@ class MongodbRepository(NFTMetadataRespository):
                 "chain": network.value,
                 "contract_address": contract_address,
                 "token_id": token_id,
-            }
+            },
+            projection=METADATA_PROJECTION,
         )
         if result is None:
             return None
 
-        return models.NftMetadata.parse_obj(result)
+        return codec.from_document(result)
 
     def set_NFT_metadata(self, data: models.NftMetadata) -> bool:
         # log.debug("set nft metadata data=%s", data)
-        data.cached = True
-        result = self.client.nft.metadata.find_one_and_replace(
-            {
-                "chain": data.chain,
-                "contract_address": data.contract_address,
-                "token_id": data.token_id,
-            },
-            data.dict(),
+        mark_cached(data)
+        key = self._get_key(data)
+        document = codec.to_document(data, exclude=TOKEN_DATA_EXCLUDE)
+        if data.token_data is None:
+            # cache 에서 읽은 데이터(token_data 없음) 를 다시 저장하는 경우. 기존 token_data 유지
+            self.client.nft.metadata.update_one(
+                key, metadata_update(document), upsert=True
+            )
+            return True
+
+        self.client.nft.token_data.replace_one(
+            key, {**key, "token_data": data.token_data}, upsert=True
         )
+        result = self.client.nft.metadata.find_one_and_replace(key, document)
         if result is None:
             log.debug("data not exists. insert data=%s", data)
-            result = self.client.nft.metadata.insert_one(data.dict())
+            result = self.client.nft.metadata.insert_one(document)
+        return True
+
+    def get_NFT_token_data(
+        self, network: models.Chain, contract_address: str, token_id: str
+    ) -> Optional[dict]:
+        key = {
+            "chain": network.value,
+            "contract_address": contract_address,
+            "token_id": token_id,
+        }
+        result = self.client.nft.token_data.find_one(key)
+        if result is None:
+            # token_data 를 metadata 에 같이 저장하던 이전 형식
+            result = self.client.nft.metadata.find_one(
+                key, projection={"_id": 0, "token_data": 1}
+            )
+        return result.get("token_data") if result else None
+
+    def set_NFT_metadata_many(self, data_list: Sequence[models.NftMetadata]) -> bool:
+        """bulk write 로 저장한다. 저장 방식은 set_NFT_metadata 와 같음"""
+        from pymongo import ReplaceOne, UpdateOne
+
+        metadata_ops: list = []
+        token_data_ops: list = []
+        for data in data_list:
+            mark_cached(data)
+            key = self._get_key(data)
+            document = codec.to_document(data, exclude=TOKEN_DATA_EXCLUDE)
+            if data.token_data is None:
+                metadata_ops.append(
+                    UpdateOne(key, metadata_update(document), upsert=True)
+                )
+                continue
+            token_data_ops.append(
+                ReplaceOne(key, {**key, "token_data": data.token_data}, upsert=True)
+            )
+            metadata_ops.append(ReplaceOne(key, document, upsert=True))
+
+        if token_data_ops:
+            self.client.nft.token_data.bulk_write(token_data_ops, ordered=False)
+        if metadata_ops:
+            self.client.nft.metadata.bulk_write(metadata_ops, ordered=False)
         return True
 
-    def _get_mongo_client(self) -> pymongo.MongoClient:
+    def get_sync_state(
+        self, network: models.Chain, owner: str
+    ) -> Optional[models.SyncState]:
+        result = self.client.nft.sync_state.find_one(
+            {"chain": network.value, "owner": owner.lower()}, projection={"_id": 0}
+        )
+        return models.SyncState.parse_obj(result) if result else None
+
+    def set_sync_state(self, state: models.SyncState) -> bool:
+        self.client.nft.sync_state.replace_one(
+            {"chain": state.chain, "owner": state.owner}, state.dict(), upsert=True
+        )
+        return True
+
+    def get_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[models.OwnedToken]:
+        cursor = self.client.nft.ownership.find(
+            {"chain": network.value, "owner": owner.lower()},
+            projection={"_id": 0, "contract_address": 1, "token_id": 1, "last_seen": 1},
+        ).sort([("contract_address", 1), ("token_id", 1)])
+        cursor = cursor.skip(offset)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [models.OwnedToken.parse_obj(document) for document in cursor]
+
+    def set_owned_tokens(
+        self,
+        network: models.Chain,
+        owner: str,
+        tokens: Sequence[Tuple[str, str]],
+        seen_at: int,
+    ) -> bool:
+        from pymongo import UpdateOne
+
+        if not tokens:
+            return True
+        self._create_ownership_index()
+        ops = [
+            UpdateOne(
+                {
+                    "chain": network.value,
+                    "owner": owner.lower(),
+                    "contract_address": contract_address,
+                    "token_id": token_id,
+                },
+                {"$set": {"last_seen": seen_at}},
+                upsert=True,
+            )
+            for contract_address, token_id in tokens
+        ]
+        self.client.nft.ownership.bulk_write(ops, ordered=False)
+        return True
+
+    def delete_owned_tokens(
+        self, network: models.Chain, owner: str, before: int
+    ) -> bool:
+        self.client.nft.ownership.delete_many(
+            {
+                "chain": network.value,
+                "owner": owner.lower(),
+                "last_seen": {"$lt": before},
+            }
+        )
+        return True
+
+    def _create_ownership_index(self):
+        # wallet 단위 조회, token 단위 upsert 에 사용. process 마다 한 번만 확인
+        if self._ownership_indexed:
+            return
+        self.client.nft.ownership.create_index(
+            [("chain", 1), ("owner", 1), ("contract_address", 1), ("token_id", 1)],
+            unique=True,
+        )
+        self._ownership_indexed = True
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def _get_key(self, data: models.NftMetadata) -> dict:
+        return {
+            "chain": data.chain,
+            "contract_address": data.contract_address,
+            "token_id": data.token_id,
+        }
+
+    def _get_mongo_client(self) -> "pymongo.MongoClient":
+        import pymongo
+
         mongodb_uri = os.environ.get("MONGODB_URI_HOST")
         host = os.environ.get("MONGODB_HOST")
         user = os.environ.get("MONGODB_USER")
@@ -149,21 +942,18 @@ class MongodbRepository(NFTMetadataRespository):
         )
 
 
-class DiskNFSSourceRepository(NFTSourceRepositoryProtocol):
-    def __init__(self):
-        self.repo_dir = pathlib.Path(__file__).parent / ".data"
-
-    def cache_nft_source(self, nft: models.NftMetadata):
-        pass
-
-    def _remove_quote_escape(self, uri: str):
-        return uri
-
-
 class NFTSourceRepository(NFTSourceRepositoryProtocol):
-    def __init__(self, repo: NFTMetadataRespository, ipfs: ipfs.IPFSProxy):
+    svg_renderer: Optional[render.SvgRenderer] = None
+
+    def __init__(
+        self,
+        repo: NFTMetadataRespository,
+        ipfs: ipfs.IPFSProxy,
+        svg_renderer: Optional[render.SvgRenderer] = None,
+    ):
         self.repo = repo
         self.ipfs = ipfs
+        self.svg_renderer = svg_renderer
 
     def _get_binary_from_uri(
         self, uri: str, buffer: io.BytesIO
@@ -205,19 +995,184 @@ class NFTSourceRepository(NFTSourceRepositoryProtocol):
     def _get_binary_from_raw_data(
         self, uri: str, buffer: io.BytesIO
     ) -> Optional[io.BytesIO]:
-        _, data = uri.split(",")
+        _, data = uri.split(",", 1)
+
+        try:
+            if self.svg_renderer:
+                png = self.svg_renderer.render(data)
+            else:
+                png = render.render_svg_to_png(data)
+        except render.SvgRenderError as e:
+            log.error("svg render error. %s", e)
+            return None
+
+        buffer.write(png)
+        return buffer
 
-        with io.StringIO() as data_buffer:
-            data_buffer.write(data)
-            data_buffer.seek(0)
-            drawing = svg2rlg(data_buffer)
-            renderPM.drawToFile(drawing, buffer, dpi=72 * 10, fmt="PNG")
+
+class DiskNFSSourceRepository(NFTSourceRepository):
+    """NFT source 를 disk(NFS 등) 에 caching 한다. S3, GCS 없이 운영하거나 test 용.
+
+    objects/ 아래에 content 의 sha256 으로 나눈 directory 에 저장하고(같은 내용은 한 번만 저장),
+    refs/ 에 uri hash 별로 object 와 content_type 을 기록한다.
+    파일은 임시 파일에 쓴 후 rename 하여 교체한다.
+    전체 크기가 max_bytes 를 넘으면 가장 오래 사용되지 않은 object 부터 삭제한다.
+    """
+
+    def __init__(
+        self,
+        repo: NFTMetadataRespository,
+        ipfs: ipfs.IPFSProxy,
+        repo_dir: Optional[pathlib.Path] = None,
+        base_url: str = SOURCE_BASE_URL,
+        max_bytes: int = SOURCE_MAX_BYTES,
+        svg_renderer: Optional[render.SvgRenderer] = None,
+    ):
+        self.repo = repo
+        self.ipfs = ipfs
+        self.repo_dir = repo_dir or pathlib.Path(__file__).parent / ".data" / "source"
+        self.base_url = base_url
+        self.max_bytes = max_bytes
+        self.svg_renderer = svg_renderer
+        self._lock = threading.Lock()
+        self._size = sum(stat.st_size for _, stat in self._stat_objects())
+
+    def cache_nft_source(self, nft: models.NftMetadata):
+        uri = nft.image or nft.animation_url
+        if not uri:
+            return
+
+        log.debug("cache nft source %s", nft)
+        nft_url = self._cache_uri_source(uri)
+        if nft_url is None:
+            return
+        nft.source_url = nft_url
+        nft.content_type = nft_url.content_type
+        self.repo.set_NFT_metadata(nft)
+
+    def get_source(self, uri_hash: str) -> Optional[SourceObject]:
+        """uri hash 로 저장된 source. 없으면 return None"""
+        if not URI_HASH_PATTERN.match(uri_hash):
+            return None
+        ref_path = self._get_ref_path(uri_hash)
+        try:
+            ref = json.loads(ref_path.read_text())
+            path = self._get_object_path(ref["digest"])
+            size = path.stat().st_size
+            # LRU 판단을 위해 사용 시각 갱신
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return SourceObject(str(path), ref["content_type"], ref["digest"], size, path)
+
+    def read_source(
+        self, source: SourceObject, start: int, end: int
+    ) -> Iterator[bytes]:
+        with open(source.key, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(SOURCE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def store_source(
+        self, uri_hash: str, data: bytes, content_type: str
+    ) -> SourceObject:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._get_object_path(digest)
+        if not path.exists():
+            self._write_file(path, data)
+            with self._lock:
+                self._size += len(data)
+        else:
+            os.utime(path)
+
+        ref = {"digest": digest, "content_type": content_type}
+        self._write_file(self._get_ref_path(uri_hash), json.dumps(ref).encode("utf-8"))
+
+        if self._size > self.max_bytes:
+            self.evict()
+        return SourceObject(str(path), content_type, digest, len(data), path)
+
+    def evict(self):
+        """전체 크기가 max_bytes 의 90% 이하가 될 때까지 오래 사용되지 않은 object 를 삭제.
+        삭제된 object 를 가리키는 ref 는 get_source 에서 없는 것으로 처리된다.
+        """
+        with self._lock:
+            target = self.max_bytes * 0.9
+            if self._size <= target:
+                return
+            objects = sorted(
+                (stat.st_mtime, stat.st_size, path)
+                for path, stat in self._stat_objects()
+            )
+            # 동시에 저장된 object 로 인한 오차를 없애기 위해 다시 계산
+            self._size = sum(size for _, size, _ in objects)
+            for _, size, path in objects:
+                if self._size <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                self._size -= size
+                log.debug("evict source object %s size=%s", path.name, size)
+
+    def _cache_uri_source(self, uri: str) -> Optional[models.NftUrl]:
+        uri_hash = get_sha256(uri)
+        source = self.get_source(uri_hash)
+        if source is None:
+            with io.BytesIO() as buffer:
+                self._get_binary_from_uri(uri, buffer)
+                data = buffer.getvalue()
+            if not data:
+                return None
+            content_type = get_mime_type(data)
+            source = self.store_source(uri_hash, data, content_type)
+
+        return models.NftUrl(
+            original=urljoin(self.base_url, uri_hash),
+            content_type=source.content_type,
+        )
+
+    def _get_object_path(self, digest: str) -> pathlib.Path:
+        return self.repo_dir / "objects" / digest[:2] / digest[2:4] / digest
+
+    def _get_ref_path(self, uri_hash: str) -> pathlib.Path:
+        return self.repo_dir / "refs" / uri_hash[:2] / f"{uri_hash}.json"
+
+    def _stat_objects(self) -> Iterator[Tuple[pathlib.Path, os.stat_result]]:
+        for path in self.repo_dir.glob("objects/*/*/*"):
+            try:
+                yield path, path.stat()
+            except FileNotFoundError:
+                continue
+
+    def _write_file(self, path: pathlib.Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _remove_quote_escape(self, uri: str):
+        return uri
 
 
 class GcpNFTSourceRepository(NFTSourceRepository):
-    def __init__(self, repo: NFTMetadataRespository, ipfs: ipfs.IPFSProxy):
+    def __init__(
+        self,
+        repo: NFTMetadataRespository,
+        ipfs: ipfs.IPFSProxy,
+        svg_renderer: Optional[render.SvgRenderer] = None,
+    ):
         self.repo = repo
         self.ipfs = ipfs
+        self.svg_renderer = svg_renderer
+        from google.cloud import storage
+
         self.storage = storage.Client()
         self.bucket = self.storage.bucket("nft_source")
 
@@ -248,12 +1203,28 @@ class GcpNFTSourceRepository(NFTSourceRepository):
         nft.content_type = blob.content_type
         self.repo.set_NFT_metadata(nft)
 
+    def get_source(self, uri_hash: str) -> Optional[SourceObject]:
+        if not URI_HASH_PATTERN.match(uri_hash):
+            return None
+        blob = self.bucket.get_blob(f"{uri_hash}_original")
+        if blob is None:
+            return None
+        return SourceObject(blob.name, blob.content_type, blob.md5_hash, blob.size)
+
+    def read_source(
+        self, source: SourceObject, start: int, end: int
+    ) -> Iterator[bytes]:
+        blob = self.bucket.blob(source.key)
+        for chunk_start in range(start, end + 1, SOURCE_CHUNK_SIZE):
+            chunk_end = min(chunk_start + SOURCE_CHUNK_SIZE - 1, end)
+            yield blob.download_as_bytes(start=chunk_start, end=chunk_end)
+
     def _upload_blob(self, file_obj, destination_blob_name):
         """Uploads a file to the bucket."""
 
         blob = self.bucket.blob(destination_blob_name)
         file_obj.seek(0)
-        content_type = magic.from_buffer(file_obj.read(), mime=True)
+        content_type = get_mime_type(file_obj.read(MIME_SNIFF_BYTES))
         log.debug("uploading blob...")
         blob.upload_from_file(file_obj, rewind=True, content_type=content_type)
 
@@ -269,41 +1240,64 @@ class GcpNFTSourceRepository(NFTSourceRepository):
 class AWSS3SourceRepository(NFTSourceRepository):
     def __init__(
         self,
-        s3_storage: aws_s3.AWSS3Storage,
+        s3_storage: "aws_s3.AWSS3Storage",
         repo: NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
+        svg_renderer: Optional[render.SvgRenderer] = None,
+        worker_pool: Optional[workers.ProcessWorkerPool] = None,
+        image_formats: Sequence[str] = thumbnail.IMAGE_FORMATS,
     ):
         self.repo = repo
         self.ipfs = ipfs
         self.s3_storage = s3_storage
-        self.s3: mypy_boto3_s3.S3Client = boto3.client(
-            service_name="s3",
-            region_name=os.getenv("AWS_S3_REGION_NAME"),
-            aws_access_key_id=os.getenv("AWS_S3_ACCESS_KEY"),
-            aws_secret_access_key=os.getenv("AWS_S3_SECRET_KEY"),
-        )
-        self.bucket_name = os.environ["AWS_S3_BUCKET_NAME"]
-        self.base_url = "https://abc-nft-source.s3.us-east-2.amazonaws.com/"
-        self.resize_base_url = (
-            "https://abc-nft-source-resized.s3.us-east-2.amazonaws.com/"
-        )
+        self.svg_renderer = svg_renderer
+        self.worker_pool = worker_pool
+        self.image_formats = image_formats
+        self.base_url = s3_storage.base_url
 
     def cache_nft_source(self, nft: models.NftMetadata):
-        """AWS S3 에 NFT source 를 저장."""
+        """AWS S3 에 NFT source 를 저장.
+        image 와 animation_url 이 모두 있으면 url 은 image 로 만들고,
+        poster, preview 는 animation_url 의 video, audio 로 만든다.
+        """
         uri = nft.image or nft.animation_url
         if not uri:
             return
 
         log.debug("cache nft source %s", nft)
         nft_url = self._cache_uri_source(uri)
+        if nft_url is None:
+            return
+        if nft.animation_url and nft.animation_url != uri:
+            self._set_animation_assets(nft_url, nft.animation_url)
         nft.source_url = nft_url
         nft.content_type = nft_url.content_type
         self.repo.set_NFT_metadata(nft)
 
-    def _cache_uri_source(self, uri: str):
-        """S3 에 저장 시 content_type 에 따른 확장자를 넣어야 함
-        resize lambda function 에서는 파일의 내용을 참고하지 않고
-        확장자만으로 content_type 을 결정함(mimetype 사용)
+    def get_source(self, uri_hash: str) -> Optional[SourceObject]:
+        if not URI_HASH_PATTERN.match(uri_hash):
+            return None
+        obj = self.s3_storage.find_first_object(uri_hash)
+        if obj is None:
+            return None
+        head = self.s3_storage.head_object(obj["Key"])
+        return SourceObject(
+            obj["Key"],
+            head["ContentType"],
+            head["ETag"].strip('"'),
+            head["ContentLength"],
+        )
+
+    def read_source(
+        self, source: SourceObject, start: int, end: int
+    ) -> Iterator[bytes]:
+        obj = self.s3_storage.get_object(source.key, byte_range=(start, end))
+        yield from obj["Body"].iter_chunks(SOURCE_CHUNK_SIZE)
+
+    def _cache_uri_source(self, uri: str) -> Optional[models.NftUrl]:
+        """S3 에 원본과 resize 된 이미지를 저장한다.
+        원본 key 에는 content_type 에 따른 확장자를 넣는다.
+        원본을 받지 못한 경우 None. 빈 object 를 저장하지 않음
         """
         # surfix = ""  # AWS s3 의 key 에 들어갈 확장자
         uri_hash = get_sha256(uri)
@@ -312,37 +1306,214 @@ class AWSS3SourceRepository(NFTSourceRepository):
         # guess_extension 이 webp 확장자를 지원하지 않으므로 추가
         mimetypes.add_type("image/webp", ".webp")
         if obj:
-            obj = self.s3_storage.get_object(obj["Key"])
+            key = obj["Key"]
+            source_obj = self.s3_storage.get_object(key)
             content_type = (
-                obj.get("ResponseMetadata", {})
+                source_obj.get("ResponseMetadata", {})
                 .get("HTTPHeaders", {})
                 .get("content-type")
             )
-            surfix = mimetypes.guess_extension(str(content_type))
-            if surfix is None:
-                surfix = ""
+            get_data = source_obj["Body"].read
         else:
             with io.BytesIO() as buffer:
                 self._get_binary_from_uri(uri, buffer)
-                buffer.seek(0)
-                content_type = magic.from_buffer(buffer.read(), mime=True)
-                surfix = mimetypes.guess_extension(str(content_type))
-                if surfix is None:
-                    surfix = ""
-                new_key = f"{uri_hash}{surfix}"
-                self._upload_object(buffer, new_key, content_type)
-
-        nft_url = models.NftUrl(original=urljoin(self.base_url, f"{uri_hash}{surfix}"))
-        # image 인 경우 lambda 에 의해 resize 되므로 resize url 추가
+                data = buffer.getvalue()
+            if not data:
+                return None
+            content_type = get_mime_type(data)
+            surfix = mimetypes.guess_extension(str(content_type))
+            if surfix is None:
+                surfix = ""
+            key = f"{uri_hash}{surfix}"
+            self._upload_object(io.BytesIO(data), key, content_type)
+            get_data = lambda: data  # noqa: E731
+
+        nft_url = models.NftUrl(original=urljoin(self.base_url, key))
         if content_type and content_type.startswith("image/"):
-            nft_url.h250 = urljoin(self.resize_base_url, f"{uri_hash}_h250{surfix}")
-            nft_url.h500 = urljoin(self.resize_base_url, f"{uri_hash}_h500{surfix}")
-            nft_url.h750 = urljoin(self.resize_base_url, f"{uri_hash}_h750{surfix}")
-            nft_url.h1000 = urljoin(self.resize_base_url, f"{uri_hash}_h1000{surfix}")
+            self._cache_thumbnails(nft_url, uri_hash, content_type, get_data)
+        elif content_type and content_type.startswith(("video/", "audio/")):
+            self._cache_video_assets(nft_url, uri_hash, content_type, get_data)
 
         nft_url.content_type = content_type
         return nft_url
 
+    def _cache_thumbnails(
+        self,
+        nft_url: models.NftUrl,
+        uri_hash: str,
+        content_type: str,
+        get_data: Callable[[], bytes],
+    ):
+        """resize, format 변환된 이미지가 S3 에 있으면 해당 url 을, 없으면 만들어 upload 한 후 url 을 넣는다.
+        원본보다 큰 크기는 만들지 않으므로 원본 url 을 넣는다.
+        실패한 경우 h*, webp, avif 항목은 비워둔다.
+        """
+        img_format = content_type.split("/")[-1].upper()
+        formats = [
+            fmt
+            for fmt in self.image_formats
+            if fmt != img_format and thumbnail.can_encode(fmt)
+        ]
+        variants = self._find_variants(uri_hash, img_format)
+        if not variants or any(fmt not in variants for fmt in formats):
+            try:
+                variants = self._upload_variants(uri_hash, get_data(), formats)
+            except (thumbnail.ThumbnailError, workers.WorkerError) as e:
+                log.error("thumbnail error. %s uri_hash=%s", e, uri_hash)
+                return
+
+        self._set_thumbnail_urls(nft_url, variants.get(None, {}))
+        for fmt, keys in variants.items():
+            if fmt is None or None not in keys:
+                continue
+            content_type, _ = thumbnail.TRANSCODE_FORMATS[fmt]
+            url = models.NftUrl(
+                original=urljoin(self.base_url, keys[None]), content_type=content_type
+            )
+            self._set_thumbnail_urls(url, keys)
+            setattr(nft_url, fmt.lower(), url)
+
+    def _set_thumbnail_urls(
+        self, nft_url: models.NftUrl, keys: Dict[Optional[int], str]
+    ):
+        for height in thumbnail.HEIGHTS:
+            key = keys.get(height)
+            url = urljoin(self.base_url, key) if key else nft_url.original
+            setattr(nft_url, f"h{height}", url)
+
+    def _find_variants(
+        self, uri_hash: str, img_format: str
+    ) -> Dict[Optional[str], Dict[Optional[int], str]]:
+        """S3 에 저장된 resize, format 변환 이미지의 key. make_variants 와 같은 구조"""
+        suffix_to_format = {
+            suffix: fmt
+            for fmt, (_, suffix) in thumbnail.TRANSCODE_FORMATS.items()
+            if fmt != img_format
+        }
+        objs = self.s3_storage.list_object(f"{RESIZED_PREFIX}{uri_hash}")
+        result: Dict[Optional[str], Dict[Optional[int], str]] = {}
+        for obj in objs.get("Contents", []):
+            match = RESIZED_KEY_PATTERN.match(obj["Key"])
+            if not match:
+                continue
+            height = int(match.group(1)) if match.group(1) else None
+            fmt = suffix_to_format.get(match.group(2))
+            result.setdefault(fmt, {})[height] = obj["Key"]
+        return result
+
+    def _upload_variants(
+        self, uri_hash: str, data: bytes, formats: Sequence[str]
+    ) -> Dict[Optional[str], Dict[Optional[int], str]]:
+        if self.worker_pool:
+            variants = self.worker_pool.run(
+                thumbnail.make_variants,
+                data,
+                thumbnail.HEIGHTS,
+                formats,
+                timeout=THUMBNAIL_TIMEOUT,
+            )
+        else:
+            variants = thumbnail.make_variants(data, thumbnail.HEIGHTS, formats)
+
+        uploads = []
+        keys: Dict[Optional[str], Dict[Optional[int], str]] = {}
+        for fmt, thumbnails in variants.items():
+            for height, thumb in thumbnails.items():
+                size = "" if height is None else f"_h{height}"
+                key = f"{RESIZED_PREFIX}{uri_hash}{size}{thumb.suffix}"
+                keys.setdefault(fmt, {})[height] = key
+                uploads.append((key, thumb.data, thumb.content_type))
+
+        self._upload_objects(uploads)
+        return keys
+
+    def _set_animation_assets(self, nft_url: models.NftUrl, animation_url: str):
+        """image 와 별도인 animation_url 의 poster, preview 를 nft_url 에 넣는다."""
+        animation = self._cache_uri_source(animation_url)
+        if animation is None:
+            return
+        if animation.content_type and animation.content_type.startswith(
+            ("video/", "audio/")
+        ):
+            nft_url.poster = animation.poster
+            nft_url.preview = animation.preview
+
+    def _cache_video_assets(
+        self,
+        nft_url: models.NftUrl,
+        uri_hash: str,
+        content_type: str,
+        get_data: Callable[[], bytes],
+    ):
+        """video, audio 의 poster 이미지와 preview 가 S3 에 있으면 해당 url 을,
+        없으면 만들어 upload 한 후 url 을 넣는다.
+        """
+        keys = self._find_video_assets(uri_hash)
+        if not keys:
+            try:
+                keys = self._upload_video_assets(uri_hash, content_type, get_data())
+            except (video.VideoError, workers.WorkerError) as e:
+                log.error("video assets error. %s uri_hash=%s", e, uri_hash)
+                return
+
+        if "poster" in keys:
+            nft_url.poster = urljoin(self.base_url, keys["poster"])
+        if "preview" in keys:
+            nft_url.preview = urljoin(self.base_url, keys["preview"])
+
+    def _find_video_assets(self, uri_hash: str) -> Dict[str, str]:
+        objs = self.s3_storage.list_object(f"{RESIZED_PREFIX}{uri_hash}_p")
+        result = {}
+        for obj in objs.get("Contents", []):
+            match = VIDEO_ASSET_KEY_PATTERN.match(obj["Key"])
+            if match:
+                result[match.group(1)] = obj["Key"]
+        return result
+
+    def _upload_video_assets(
+        self, uri_hash: str, content_type: str, data: bytes
+    ) -> Dict[str, str]:
+        # 큰 video 를 process 간에 전달하지 않도록 파일 경로를 넘김
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            if self.worker_pool:
+                assets = self.worker_pool.run(
+                    video.extract_video_assets,
+                    f.name,
+                    content_type,
+                    timeout=VIDEO_TIMEOUT,
+                )
+            else:
+                assets = video.extract_video_assets(f.name, content_type)
+
+        uploads = []
+        keys = {}
+        if assets.poster:
+            keys["poster"] = f"{RESIZED_PREFIX}{uri_hash}_poster.jpg"
+            uploads.append((keys["poster"], assets.poster, "image/jpeg"))
+        if assets.preview and assets.preview_content_type:
+            surfix = (
+                ".m4a" if assets.preview_content_type.startswith("audio/") else ".mp4"
+            )
+            keys["preview"] = f"{RESIZED_PREFIX}{uri_hash}_preview{surfix}"
+            uploads.append(
+                (keys["preview"], assets.preview, assets.preview_content_type)
+            )
+
+        self._upload_objects(uploads)
+        return keys
+
+    def _upload_objects(self, uploads: List[Tuple[str, bytes, str]]):
+        """(key, data, content_type) 목록을 동시에 upload"""
+        with futures.ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as exec:
+            fs = [
+                exec.submit(self._upload_object, io.BytesIO(data), key, content_type)
+                for key, data, content_type in uploads
+            ]
+            for f in fs:
+                f.result()
+
     def _upload_object(self, buffer, key: str, content_type: str):
         buffer.seek(0)
         self.s3_storage.upload_object(buffer, key, {"ContentType": content_type})
@@ -0,0 +1,111 @@
+import logging
+import os
+from typing import AbstractSet, Any, List, Optional, Union
+
+import anyio
+import pydantic
+from fastapi import Response
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from anv import codec, models
+
+log = logging.getLogger(f"anv.{__name__}")
+
+
+class ModelResponse(Response):
+    """pydantic model 을 orjson 으로 직렬화하는 응답. exclude 는 model.dict() 의 exclude"""
+
+    media_type = "application/json"
+
+    def __init__(self, content: pydantic.BaseModel, exclude: Any = None, **kwargs):
+        self.exclude = exclude
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Optional[pydantic.BaseModel]) -> bytes:
+        if content is None:
+            return b"null"
+        return codec.to_json(content, self.exclude)
+
+
+class NftListResponse(ModelResponse):
+    """items 가 nft 목록인 응답 (NftResponse, MultiChainNftResponse).
+    exclude 는 item 하나에 적용하는 exclude. 기본 항목을 요청한 경우
+    nft 마다 보관된 json fragment 를 이어 붙여 다시 직렬화하지 않는다.
+    """
+
+    def render(self, content: Optional[pydantic.BaseModel]) -> bytes:
+        if content is None:
+            return b"null"
+        return dumps_nft_list(content, self.exclude or frozenset())
+
+
+def dumps_nft_list(data: pydantic.BaseModel, item_exclude: AbstractSet[str]) -> bytes:
+    nfts: Optional[List[models.NftMetadata]] = getattr(data, "items", None)
+    if nfts is None or item_exclude != codec.FRAGMENT_EXCLUDE:
+        return codec.to_json(data, {"items": {"__all__": item_exclude}})
+
+    items = b"[" + b",".join(codec.fragment(nft) for nft in nfts) + b"]"
+    rest = codec.to_json(data, {"items"})
+    if rest == b"{}":
+        return b'{"items":' + items + b"}"
+    return b'{"items":' + items + b"," + rest[1:]
+
+
+class FileRangeResponse(FileResponse):
+    """disk 파일의 start ~ end(포함) byte 를 전송한다. 전체 파일과 단일 range 에 사용.
+    server 가 ASGI zerocopy extension 을 지원하면 sendfile 로 전송하고,
+    아니면 file 을 직접 chunk 단위로 읽어 전송한다 (python generator 를 거치지 않음).
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        start: int,
+        end: int,
+        **kwargs: Any,
+    ):
+        self.start = start
+        self.end = end
+        super().__init__(path, **kwargs)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        count = self.end - self.start + 1
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopy" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopy",
+                        "file": file,
+                        "offset": self.start,
+                        "count": count,
+                        "more_body": False,
+                    }
+                )
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                while count > 0:
+                    chunk = await file.read(min(self.chunk_size, count))
+                    count -= len(chunk)
+                    more_body = count > 0 and len(chunk) > 0
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": more_body,
+                        }
+                    )
+                    if not more_body:
+                        break
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,169 @@
+"""placeholder metadata 로 시작하여 나중에 공개(reveal) 되는 collection 을 찾아 다시 caching 하는 명령.
+
+    python -m anv.reveal --chain klaytn --contract 0x... [--contract 0x...] [--interval 3600]
+
+contract 마다 일부 token 의 token uri 를 다시 조회하여 저장된 token_data 와 hash 를 비교하고,
+바뀐 token 이 있으면 collection 전체를 다시 조회한다.
+"""
+import argparse
+import hashlib
+import logging
+import random
+import threading
+from typing import Optional, Sequence
+
+import dotenv
+import orjson
+import pydantic
+
+from anv import config, ingest, models, service
+
+log = logging.getLogger(f"anv.{__name__}")
+
+# contract 마다 다시 조회하는 token 수
+SAMPLE_SIZE = 5
+
+# 바뀐 token 이 이 수 이상이면 collection 전체를 다시 조회
+CHANGED_THRESHOLD = 1
+
+SCAN_INTERVAL = 60 * 60  # seconds
+
+
+class RevealScanResult(pydantic.BaseModel):
+    contract_address: str
+    sampled: int = 0
+    compared: int = 0  # 저장된 token_data 가 있어 비교한 token
+    changed: int = 0
+    failed: int = 0
+    refreshed: Optional[ingest.IngestResult]  # collection 전체를 다시 조회한 결과
+
+
+def token_data_hash(token_data: dict) -> str:
+    """key 순서와 관계없이 같은 내용이면 같은 hash"""
+    data = orjson.dumps(
+        token_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    )
+    return hashlib.sha256(data).hexdigest()
+
+
+class RevealScanner:
+    """contract 의 첫 page 에서 sample_size 개 token 을 골라 token uri 를 다시 조회한다.
+    저장된 token_data 와 다른 token 이 threshold 개 이상이면 ingester 로 collection 전체를 다시 조회한다.
+    """
+
+    def __init__(
+        self,
+        nft_service: service.KlaytnNFTServiceBase,
+        ingester: ingest.CollectionIngester,
+        sample_size: int = SAMPLE_SIZE,
+        threshold: int = CHANGED_THRESHOLD,
+        rng: Optional[random.Random] = None,
+    ):
+        self.nft_service = nft_service
+        self.ingester = ingester
+        self.sample_size = sample_size
+        self.threshold = threshold
+        self.rng = rng or random.Random()
+
+    def scan(self, contract_address: str) -> RevealScanResult:
+        result = RevealScanResult(contract_address=contract_address)
+        page = self.nft_service.kas_api.get_nfts_by_contract(
+            self.nft_service.kas_chain, contract_address, self.ingester.page_size
+        )
+        nfts = page.owned_nfts
+        sample = self.rng.sample(nfts, min(self.sample_size, len(nfts)))
+        result.sampled = len(sample)
+
+        for nft in sample:
+            stored = self.nft_service.repo.get_NFT_token_data(
+                self.nft_service.chain, nft.contract_address, nft.token_id
+            )
+            if stored is None:  # cache 되지 않은 token 은 비교할 수 없음
+                continue
+            try:
+                self.ingester.rate_limiter.acquire()
+                # 공개 여부는 token uri 의 현재 데이터로 판단하므로 token_uri_cache 를 사용하지 않음
+                metadata = self.nft_service.build_nft_metadata(nft, use_cache=False)
+            except Exception as e:
+                log.warning("reveal scan error. %s. nft=%s", e, nft)
+                result.failed += 1
+                continue
+            result.compared += 1
+            if token_data_hash(metadata.token_data or {}) != token_data_hash(stored):
+                log.info(
+                    "token data changed. contract=%s token_id=%s",
+                    contract_address,
+                    nft.token_id,
+                )
+                result.changed += 1
+
+        if result.changed >= self.threshold:
+            log.info("collection revealed. refresh contract=%s", contract_address)
+            result.refreshed = self.ingester.ingest(contract_address)
+        return result
+
+    def run(
+        self,
+        contract_addresses: Sequence[str],
+        interval: float = SCAN_INTERVAL,
+        stop: Optional[threading.Event] = None,
+    ):
+        """stop 될 때까지 interval 마다 모든 contract 를 scan 한다."""
+        stop = stop or threading.Event()
+        while True:
+            for contract_address in contract_addresses:
+                try:
+                    log.info(
+                        "reveal scan result. %s", self.scan(contract_address).json()
+                    )
+                except Exception as e:
+                    log.exception(
+                        "reveal scan error. %s. contract=%s", e, contract_address
+                    )
+            if stop.wait(interval):
+                return
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m anv.reveal", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        "--chain",
+        required=True,
+        choices=[chain.value for chain in ingest.INGEST_CHAINS],
+    )
+    parser.add_argument("--contract", required=True, action="append")
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE)
+    parser.add_argument("--threshold", type=int, default=CHANGED_THRESHOLD)
+    parser.add_argument("--interval", type=float, help="scan 주기(초). 없으면 한 번만 실행")
+    parser.add_argument("--workers", type=int, default=ingest.WORKERS)
+    parser.add_argument("--rate", type=float, default=ingest.RATE, help="초당 요청 수")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    dotenv.load_dotenv()
+    app_config = config.AppConfig()
+    try:
+        nft_service = ingest.get_nft_service(app_config, models.Chain(args.chain))
+        ingester = ingest.CollectionIngester(
+            nft_service, workers=args.workers, rate=args.rate, resync=True
+        )
+        scanner = RevealScanner(
+            nft_service,
+            ingester,
+            sample_size=args.sample_size,
+            threshold=args.threshold,
+        )
+        if args.interval:
+            scanner.run(args.contract, args.interval)
+        else:
+            for contract_address in args.contract:
+                print(scanner.scan(contract_address).json())
+    finally:
+        app_config.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
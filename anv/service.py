@@ -1,18 +1,85 @@
+import abc
 import base64
 from concurrent import futures
 import json
 import logging
-from typing import List, Optional, Protocol, TypedDict
+import os
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    Type,
+    TypedDict,
+    Union,
+)
 import pydantic
 
 import requests
 
-from anv import models, repository
+from anv import (
+    backoff,
+    cache,
+    codec,
+    freshness,
+    models,
+    refresh,
+    repository,
+    timeouts,
+    workers,
+)
 from anv.api import alchemy, kas, moralis, ipfs
 
 log = logging.getLogger(f"anv.{__name__}")
 
 MAX_WORKERS = 5
+MULTI_CHAIN_TIMEOUT = 10  # seconds
+# chain 별 deadline 을 전체 deadline 보다 먼저 마감하여 chain 의 부분 결과를 받을 시간을 남김
+CHAIN_DEADLINE_MARGIN = 0.2  # seconds
+TOKEN_URI_TIMEOUT = 1  # http token uri 조회 timeout (seconds)
+
+# 이 크기(byte) 이상의 token json 은 worker_pool 의 process 에서 decoding. 작은 json 은 전달 비용이 더 큼
+TOKEN_JSON_OFFLOAD_BYTES = int(os.getenv("TOKEN_JSON_OFFLOAD_BYTES", 64 * 1024))
+# decoding 시간 상한. 요청의 남은 시간이 더 짧으면 남은 시간까지만 기다림. 넘으면 decoding 하던 worker process 를 종료
+TOKEN_JSON_DECODE_TIMEOUT = 5  # seconds
+# token json decoding 전용 process pool 크기. timeout 시 이미지 변환 등 다른 작업이 같이 종료되지 않도록 따로 사용
+TOKEN_JSON_DECODE_PROCESSES = 2
+# cache 만으로 응답하는 목록 조회의 page 크기
+OWNERSHIP_PAGE_SIZE = 100
+# ownership index 가 이 시간(seconds) 보다 오래되었으면 background 에서 다시 조회
+OWNERSHIP_REVALIDATE_AFTER = 60
+# incremental resync 시 조회하는 전송 기록 page 수 최대값. 넘으면 전체 resync
+TRANSFER_HISTORY_MAX_PAGES = 5
+
+# chain 을 지정하지 않은 multi chain 조회 시 사용하는 chain 목록
+DEFAULT_MULTI_CHAINS = (
+    models.Chain.ETHEREUM,
+    models.Chain.POLYGON,
+    models.Chain.KLAYTN,
+    models.Chain.BINANCE,
+)
+
+
+class NFTServiceError(Exception):
+    pass
+
+
+class NFTServiceTokenDataError(Exception):
+    pass
+
+
+class NFTServiceTimeoutError(NFTServiceError):
+    pass
+
+
+class NFTServiceNegativeCacheError(NFTServiceError):
+    """최근 조회에 실패하여 재시도 시각 전까지 조회하지 않는 token, token uri"""
 
 
 class NFTAttribute(TypedDict):
@@ -34,26 +101,521 @@ class NFTTokenJson(TypedDict):
 class OwnedNftResult(pydantic.BaseModel):
     cursor: Optional[str]
     nfts: List[models.NftMetadata]
+    pending: List[models.PendingNft] = []  # deadline 까지 조회하지 못한 nft
+
+
+class MultiChainOwnedNftResult(pydantic.BaseModel):
+    cursor: Optional[str]
+    nfts: List[models.NftMetadata]
+    pending: List[models.PendingNft]
+    pending_chains: List[models.Chain]  # 제한시간 내 응답하지 않은 chain. 다음 cursor 로 재시도
+    failed_chains: List[models.Chain]  # 오류가 발생한 chain. 다음 cursor 에서 제외
 
 
 class NFTServiceProtocol(Protocol):
     def get_NFTs_by_owner(
-        self, owner: str, cursor: str = None, resync: bool = False
+        self,
+        owner: str,
+        cursor: str = None,
+        resync: bool = False,
+        deadline: Optional[timeouts.Deadline] = None,
+        incremental: bool = False,
     ) -> OwnedNftResult:
         pass
 
+    def get_indexed_NFTs_by_owner(
+        self, owner: str, cursor: Optional[str] = None
+    ) -> Optional[OwnedNftResult]:
+        pass
+
     def get_NFT_by_contract_token_id(
-        self, contract_address: str, token_id: str, resync: bool
+        self,
+        contract_address: str,
+        token_id: str,
+        resync: bool,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> Optional[models.NftMetadata]:
         pass
 
+    def iter_NFTs_by_owner(
+        self, owner: str, resync: bool = False
+    ) -> Iterator[models.NftMetadata]:
+        pass
+
+    def load_token_data(self, nft: models.NftMetadata) -> models.NftMetadata:
+        pass
+
 
 class NFTServiceBase(NFTServiceProtocol):
-    def __init__(self, ipfs: ipfs.IPFSProxy):
+    # token 단위 metadata 조회 시 결과에서 제외하고 계속 진행하는 오류
+    token_errors: Tuple[Type[Exception], ...] = ()
+    max_workers = MAX_WORKERS
+    negative_cache: Optional[backoff.NegativeCache] = None
+    # ownership index, cache 갱신을 background 에서 실행. 없으면 갱신하지 않음
+    refresher: Optional[refresh.BackgroundRefresher] = None
+    # cache 사용 방법. 없으면 cache 를 항상 그대로 사용
+    freshness_policy: Optional[freshness.FreshnessPolicy] = None
+    # token uri 데이터, wallet 목록 page 의 cache. uvicorn worker 간 공유할 수 있음
+    token_uri_cache: Optional[cache.TieredCache] = None
+    owner_cache: Optional[cache.TieredCache] = None
+    # _get_owned_nfts 결과 model. owner_cache 에서 읽을 때 사용
+    owned_nfts_model: Type[pydantic.BaseModel]
+    # 큰 token json 을 decoding 하는 전용 process pool. 없으면 현재 process 에서 decoding
+    worker_pool: Optional[workers.ProcessWorkerPool] = None
+    repo: repository.NFTMetadataRespository
+    chain: models.Chain
+
+    def __init__(
+        self,
+        ipfs: ipfs.IPFSProxy,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        *,
+        worker_pool: Optional[workers.ProcessWorkerPool] = None,
+        refresher: Optional[refresh.BackgroundRefresher] = None,
+        freshness_policy: Optional[freshness.FreshnessPolicy] = None,
+        token_uri_cache: Optional[cache.TieredCache] = None,
+        owner_cache: Optional[cache.TieredCache] = None,
+    ):
         self.ipfs = ipfs
+        self.negative_cache = negative_cache
+        self.worker_pool = worker_pool
+        self.refresher = refresher
+        self.freshness_policy = freshness_policy
+        self.token_uri_cache = token_uri_cache
+        self.owner_cache = owner_cache
+
+    def load_token_data(self, nft: models.NftMetadata) -> models.NftMetadata:
+        """cache 에서 읽은 nft 는 token_data 가 없으므로 repository 에서 따로 읽어 채운다.
+        cache 의 nft 는 여러 요청이 같이 사용하므로 바꾸지 않고 token_data 를 채운 복사본을 return.
+        """
+        if nft.token_data is not None:
+            return nft
+        token_data = self.repo.get_NFT_token_data(
+            self.chain, nft.contract_address, nft.token_id
+        )
+        if token_data is None:
+            return nft
+        return nft.copy(update={"token_data": token_data})
+
+    def get_NFTs_by_owner(
+        self,
+        owner: str,
+        cursor: str = None,
+        resync: bool = False,
+        deadline: Optional[timeouts.Deadline] = None,
+        incremental: bool = False,
+    ) -> OwnedNftResult:
+        """wallet address 의 nft 목록 1 page 를 가져온다.
+
+        repository 로부터 caching nft metadata 데이터를 가져오고 없으면 api 를 호출한다.
+
+        resync = False 인 경우 repository cache data 사용,
+        resync = True 인 경우 repository cache data 를 사용하지 않고 API 데이터 return, repository 를 갱신함.
+        incremental = True 인 경우 지난 sync 이후 소유권이 바뀐 nft 만 API 로 조회하고 나머지는 cache 사용.
+        지난 sync 기록이 없거나 전송 기록을 조회할 수 없는 chain 은 resync 와 같다.
+
+        deadline 까지 조회하지 못한 nft 는 결과의 pending 에 담는다.
+        pending nft 는 background 에서 조회를 계속하여 repository 에 caching 된다.
+
+        Args:
+            owner: wallet address
+            resync: repository 데이터 사용
+            deadline: 요청 처리 마감 시각
+            incremental: 소유권이 바뀐 nft 만 resync
+        """
+        changed = None
+        if incremental:
+            resync = True
+            changed = self._begin_incremental_sync(owner, cursor, deadline)
+        owned_nfts_result = self._list_owned_nfts(
+            owner, cursor, deadline, use_cache=not resync
+        )
+        nfts, pending = self._resolve_owned_nfts(
+            owned_nfts_result.owned_nfts, resync, deadline, changed
+        )
+        if incremental and not owned_nfts_result.cursor:
+            self._finish_incremental_sync(owner)
+        return OwnedNftResult(
+            cursor=owned_nfts_result.cursor, nfts=nfts, pending=pending
+        )
+
+    def _resolve_owned_nfts(
+        self,
+        owned_nfts: List[Any],
+        resync: bool,
+        deadline: Optional[timeouts.Deadline],
+        changed: Optional[Set[Tuple[str, str]]] = None,
+    ) -> Tuple[List[models.NftMetadata], List[models.PendingNft]]:
+        """changed 가 있으면 resync 는 changed 에 포함된 (contract_address, token_id) 만 적용"""
+        # deadline 이후에도 pending nft 조회를 마칠 수 있도록 worker 에는 늦은 deadline 전달
+        worker_deadline = (
+            deadline.extend(timeouts.PENDING_GRACE) if deadline is not None else None
+        )
+
+        def get_metadata(nft: Any):
+            if resync and (changed is None or self._get_sync_key(nft) in changed):
+                return self._fetch_nft_metadata(nft, worker_deadline)
+            return self._get_nft_metadata(nft, worker_deadline)
+
+        exec = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        future_to_nft = {exec.submit(get_metadata, nft): nft for nft in owned_nfts}
+        done, _ = futures.wait(
+            future_to_nft,
+            timeout=deadline.remaining() if deadline is not None else None,
+        )
+        # deadline 을 넘긴 작업을 기다리지 않음
+        exec.shutdown(wait=False)
+
+        result: List[models.NftMetadata] = []
+        pending: List[models.PendingNft] = []
+        for f, nft in future_to_nft.items():
+            if f not in done:
+                contract_address, token_id = self._get_token_key(nft)
+                pending.append(
+                    models.PendingNft(
+                        chain=self.chain.value,
+                        contract_address=contract_address,
+                        token_id=token_id,
+                    )
+                )
+                continue
+
+            try:
+                metadata = f.result()
+            except NFTServiceNegativeCacheError as e:
+                log.debug("skip nft. %s. nft=%s", e, nft)
+                continue
+            except NFTServiceTimeoutError as e:
+                log.warning("nft metadata timeout %s. nft=%s", e, nft)
+                continue
+            except self.token_errors as e:
+                log.warning("nft metadata error %s. nft=%s", e, nft)
+                continue
+            except Exception as e:
+                log.exception("nft metadata error %s. nft=%s", e, nft)
+                continue
+            if metadata:
+                result.append(metadata)
+
+        if pending:
+            log.warning(
+                "deadline exceeded. %s nft pending. chain=%s", len(pending), self.chain
+            )
+        return result, pending
+
+    def get_indexed_NFTs_by_owner(
+        self, owner: str, cursor: Optional[str] = None
+    ) -> Optional[OwnedNftResult]:
+        """ownership index 와 cache 만으로 wallet 의 nft 목록 1 page 를 만든다. api 를 호출하지 않음.
+
+        wallet 의 목록을 끝까지 조회한 적이 없으면 None.
+        cache 된 metadata 가 없는 nft 는 pending 에 담는다.
+        첫 page 조회 시 index 가 OWNERSHIP_REVALIDATE_AFTER 보다 오래되었으면
+        background 에서 목록을 다시 조회하여 index 와 cache 를 갱신한다. (stale-while-revalidate)
+        """
+        state = self.repo.get_sync_state(self.chain, owner)
+        if state is None or state.indexed_at is None:
+            return None
+        try:
+            offset = int(cursor) if cursor else 0
+        except ValueError:
+            raise NFTServiceError(f"invalid cursor {cursor}")
+
+        # 다음 page 가 있는지 알 수 있도록 1 개 더 읽는다
+        tokens = self.repo.get_owned_tokens(
+            self.chain, owner, offset, OWNERSHIP_PAGE_SIZE + 1
+        )
+        page = tokens[:OWNERSHIP_PAGE_SIZE]
+        nfts: List[models.NftMetadata] = []
+        pending: List[models.PendingNft] = []
+        for token in page:
+            metadata = self.repo.get_NFT_metadata(
+                self.chain, token.contract_address, token.token_id
+            )
+            if metadata:
+                nfts.append(metadata)
+            else:
+                pending.append(
+                    models.PendingNft(
+                        chain=self.chain.value,
+                        contract_address=token.contract_address,
+                        token_id=token.token_id,
+                    )
+                )
+
+        if not cursor and time.time() - state.indexed_at > OWNERSHIP_REVALIDATE_AFTER:
+            self._revalidate_owner(owner)
+        next_offset = offset + len(page)
+        return OwnedNftResult(
+            cursor=str(next_offset) if len(tokens) > len(page) else None,
+            nfts=nfts,
+            pending=pending,
+        )
+
+    def _revalidate_owner(self, owner: str):
+        if self.refresher is None:
+            return
+
+        def revalidate():
+            # owner_cache 의 page 는 index 를 갱신하지 않으므로 목록은 api 로 다시 조회한다
+            cursor = None
+            while True:
+                result = self._list_owned_nfts(owner, cursor, use_cache=False)
+                self._resolve_owned_nfts(result.owned_nfts, False, None, None)
+                cursor = result.cursor
+                if not cursor:
+                    return
+
+        self.refresher.submit(("owner", self.chain, owner.lower()), revalidate)
+
+    def _index_owned_nfts(self, owner: str, cursor: Optional[str], result: Any):
+        """목록 page 의 nft 를 ownership index 에 기록한다.
+
+        첫 page 부터 마지막 page 까지 조회하면 첫 page 이전에 확인된 (더 이상 소유하지 않는) 항목을 지우고
+        index 완성 시각을 기록한다.
+        """
+        now = int(time.time())
+        try:
+            self.repo.set_owned_tokens(
+                self.chain,
+                owner,
+                [self._get_token_key(nft) for nft in result.owned_nfts],
+                now,
+            )
+            if cursor and result.cursor:
+                return
+            state = self.repo.get_sync_state(self.chain, owner)
+            if state is None:
+                state = models.SyncState(chain=self.chain.value, owner=owner.lower())
+            if not cursor:
+                state.listed_at = now
+            if not result.cursor and state.listed_at is not None:
+                self.repo.delete_owned_tokens(self.chain, owner, state.listed_at)
+                state.indexed_at, state.listed_at = state.listed_at, None
+            self.repo.set_sync_state(state)
+        except Exception as e:
+            log.warning("ownership index error. %s. owner=%s", e, owner)
+
+    def _begin_incremental_sync(
+        self,
+        owner: str,
+        cursor: Optional[str],
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> Optional[Set[Tuple[str, str]]]:
+        """지난 sync 이후 소유권이 바뀐 nft 의 key 목록. None 이면 전체 resync.
+
+        첫 page 조회 시각을 기록해 두고, 마지막 page 까지 조회하면 그 시각을 sync 완료 시각으로 저장한다.
+        """
+        state = self.repo.get_sync_state(self.chain, owner)
+        if state is None:
+            state = models.SyncState(chain=self.chain.value, owner=owner.lower())
+        if not cursor:
+            state.started_at = int(time.time())
+            self.repo.set_sync_state(state)
+        if state.synced_at is None:
+            return None
+
+        try:
+            changed = self._get_transferred_tokens(owner, state.synced_at, deadline)
+        except self.token_errors as e:
+            log.warning("transfer history error. %s. owner=%s", e, owner)
+            return None
+        if changed is not None:
+            log.debug(
+                "incremental sync. owner=%s since=%s changed=%s",
+                owner,
+                state.synced_at,
+                len(changed),
+            )
+        return changed
+
+    def _finish_incremental_sync(self, owner: str):
+        state = self.repo.get_sync_state(self.chain, owner)
+        # 첫 page 부터 조회하지 않은 경우 앞 page 의 변경이 반영되지 않았으므로 갱신하지 않음
+        if state is None or state.started_at is None:
+            return
+        state.synced_at, state.started_at = state.started_at, None
+        self.repo.set_sync_state(state)
+
+    def _get_transferred_tokens(
+        self, owner: str, since: int, deadline: Optional[timeouts.Deadline] = None
+    ) -> Optional[Set[Tuple[str, str]]]:
+        """since 이후 owner 가 주고 받은 nft 의 key 목록. 전송 기록을 조회할 수 없는 chain 은 None"""
+        return None
+
+    def _get_sync_key(self, nft: Any) -> Tuple[str, str]:
+        contract_address, token_id = self._get_token_key(nft)
+        return contract_address.lower(), token_id
+
+    def _get_nft_metadata(
+        self, nft: Any, deadline: Optional[timeouts.Deadline] = None
+    ) -> Optional[models.NftMetadata]:
+        metadata = self._get_fresh_cached_nft_metadata(nft)
+        if metadata:
+            return metadata
+        return self._fetch_nft_metadata(nft, deadline, use_cache=True)
+
+    def _get_fresh_cached_nft_metadata(self, nft: Any) -> Optional[models.NftMetadata]:
+        """freshness policy 에 따라 cache 를 사용한다.
+        stale 이면 cache 를 return 하고 background 에서 갱신, expired 이면 None.
+        """
+        metadata = self._get_cached_nft_metadata(nft)
+        if not metadata or self.freshness_policy is None:
+            return metadata
+
+        state = self.freshness_policy.check(metadata)
+        if state == freshness.Freshness.EXPIRED:
+            return None
+        if state == freshness.Freshness.STALE and self.refresher is not None:
+            contract_address, token_id = self._get_token_key(nft)
+            self.refresher.submit(
+                ("nft", self.chain, contract_address, token_id),
+                self._fetch_nft_metadata,
+                nft,
+            )
+        return metadata
+
+    def _fetch_nft_metadata(
+        self,
+        nft: Any,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
+    ) -> Optional[models.NftMetadata]:
+        """api 로 nft metadata 를 조회한다.
+        token_errors 로 실패한 token 은 negative cache 에 기록하여 재시도 시각 전까지 조회하지 않는다.
+
+        use_cache = True 면 token uri 데이터에 token_uri_cache 를 사용한다. 목록 조회의 cache miss 에만 사용하고
+        resync, stale 갱신은 바뀐 token uri 데이터를 가져와야 하므로 사용하지 않는다.
+        """
+        if self.negative_cache is None:
+            return self._get_nft_metadata_from_api(nft, deadline, use_cache)
+
+        key = backoff.token_key(self.chain.value, *self._get_token_key(nft))
+        if self.negative_cache.is_blocked(key):
+            raise NFTServiceNegativeCacheError(key)
+        try:
+            metadata = self._get_nft_metadata_from_api(nft, deadline, use_cache)
+        except self.token_errors:
+            self.negative_cache.record_failure(key)
+            raise
+        self.negative_cache.record_success(key)
+        return metadata
+
+    def iter_NFTs_by_owner(
+        self, owner: str, resync: bool = False
+    ) -> Iterator[models.NftMetadata]:
+        """wallet 의 모든 page 를 순회하며 nft metadata 가 준비되는 대로 하나씩 반환한다.
+
+        page 마다 cache 된 nft 를 먼저 반환하고, cache 가 없는 nft 는 api 로 조회하여
+        완료되는 순서대로 반환한다. resync = True 인 경우 모든 nft 를 api 로 조회한다.
+        """
+        cursor = None
+        while True:
+            owned_nfts_result = self._list_owned_nfts(
+                owner, cursor, use_cache=not resync
+            )
+
+            uncached = []
+            for nft in owned_nfts_result.owned_nfts:
+                metadata = None if resync else self._get_fresh_cached_nft_metadata(nft)
+                if metadata:
+                    yield metadata
+                else:
+                    uncached.append(nft)
+
+            with futures.ThreadPoolExecutor(max_workers=self.max_workers) as exec:
+                future_to_nft = {
+                    exec.submit(self._fetch_nft_metadata, nft, None, not resync): nft
+                    for nft in uncached
+                }
+                for f in futures.as_completed(future_to_nft):
+                    nft = future_to_nft[f]
+                    try:
+                        metadata = f.result()
+                    except NFTServiceNegativeCacheError as e:
+                        log.debug("skip nft. %s. nft=%s", e, nft)
+                        continue
+                    except NFTServiceTimeoutError as e:
+                        log.warning("nft metadata timeout %s. nft=%s", e, nft)
+                        continue
+                    except self.token_errors as e:
+                        log.warning("nft metadata error %s. nft=%s", e, nft)
+                        continue
+                    except Exception as e:
+                        log.exception("nft metadata error %s. nft=%s", e, nft)
+                        continue
+                    if metadata:
+                        yield metadata
+
+            cursor = owned_nfts_result.cursor
+            if not cursor:
+                return
+
+    @abc.abstractmethod
+    def _get_owned_nfts(
+        self,
+        owner: str,
+        cursor: Optional[str],
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> Any:
+        """wallet 이 소유한 nft 목록 1 page. cursor, owned_nfts 속성을 가진 결과 return"""
+        raise NotImplementedError
+
+    def _list_owned_nfts(
+        self,
+        owner: str,
+        cursor: Optional[str],
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = True,
+    ) -> Any:
+        """owner_cache 를 거쳐 _get_owned_nfts 를 조회한다. use_cache = False 면 api 결과로 cache 갱신
+
+        api 로 조회한 page 만 ownership index 에 기록한다. cache 된 page 는 이미 기록되어 있음.
+        """
+        key = cache.owner_key(owner, cursor)
+        if use_cache and self.owner_cache is not None:
+            result = self.owner_cache.get(key)
+            if result is not None:
+                return result
+        result = self._get_owned_nfts_page(owner, cursor, deadline)
+        self._index_owned_nfts(owner, cursor, result)
+        if self.owner_cache is not None:
+            self.owner_cache.set(key, result)
+        return result
+
+    def _get_owned_nfts_page(
+        self, owner: str, cursor: Optional[str], deadline: Optional[timeouts.Deadline]
+    ) -> Any:
+        # deadline 이 없으면 deadline 인자를 받지 않는 _get_owned_nfts 구현도 호출할 수 있도록 넘기지 않음
+        if deadline is None:
+            return self._get_owned_nfts(owner, cursor)
+        return self._get_owned_nfts(owner, cursor, deadline)
+
+    @abc.abstractmethod
+    def _get_token_key(self, nft: Any) -> Tuple[str, str]:
+        """owned nft 의 (contract_address, token_id)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _get_cached_nft_metadata(self, nft: Any) -> Optional[models.NftMetadata]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _get_nft_metadata_from_api(
+        self,
+        nft: Any,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
+    ) -> Optional[models.NftMetadata]:
+        raise NotImplementedError
 
-    def _get_token_data_by_uri(self, uri: str) -> NFTTokenJson:
-        """uri 에 따른 데이터 parsing
+    def _get_token_data_by_uri(
+        self,
+        uri: str,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
+    ) -> NFTTokenJson:
+        """uri 에 따른 데이터 parsing. use_cache = True 면 token_uri_cache 를 읽고 쓴다.
 
         data:application/json;base64,
         data:image/svg+xml;utf8,
@@ -62,43 +624,106 @@ class NFTServiceBase(NFTServiceProtocol):
 
         """
 
-        if uri.startswith("ipfs://"):
-            return self.ipfs.get_json(uri)
-        elif uri.startswith("data:application/json;base64"):
-            return self._get_base_64_json(uri)
-        else:  # http
-            return self._get_json_from_http(uri)
-
-    def _get_base_64_json(self, uri: str) -> NFTTokenJson:
+        if uri.startswith("data:application/json;base64"):
+            return self._get_base_64_json(uri, deadline)
+
+        # 연결 불가, 파일 없음 등 실패한 uri 는 재시도 시각 전까지 요청하지 않음
+        key = backoff.uri_key(uri)
+        if self.negative_cache is not None and self.negative_cache.is_blocked(key):
+            raise NFTServiceNegativeCacheError(uri)
+        if use_cache and self.token_uri_cache is not None:
+            token_data = self.token_uri_cache.get(key)
+            if token_data is not None:
+                return token_data
+        try:
+            if uri.startswith("ipfs://"):
+                token_data = self._decode_token_json(
+                    codec.decode_json, self.ipfs.get_bytes(uri, deadline), deadline
+                )
+            else:  # http
+                token_data = self._get_json_from_http(uri, deadline)
+        except ipfs.IPFSTimeoutError as e:
+            # timeout 은 요청의 남은 시간이 짧아서일 수 있으므로 실패로 기록하지 않음
+            raise NFTServiceTimeoutError(e)
+        except (NFTServiceTokenDataError, ipfs.IPFSDownloadError, ValueError):
+            if self.negative_cache is not None:
+                self.negative_cache.record_failure(key)
+            raise
+
+        if self.negative_cache is not None:
+            self.negative_cache.record_success(key)
+        if use_cache and self.token_uri_cache is not None:
+            self.token_uri_cache.set(key, token_data)
+        return token_data
+
+    def _get_base_64_json(
+        self, uri: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> NFTTokenJson:
         _, base64_data = uri.split(",")
-        decoded_data = base64.b64decode(base64_data)
-        text = decoded_data.decode("utf-8")
-        return json.loads(text)
+        return self._decode_token_json(codec.decode_base64_json, base64_data, deadline)
+
+    def _decode_token_json(
+        self,
+        decode: Callable[[Union[str, bytes]], Any],
+        data: Union[str, bytes],
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> NFTTokenJson:
+        """TOKEN_JSON_OFFLOAD_BYTES 이상인 data 는 worker_pool 에서 decode 한다.
+        on-chain nft 가 많은 page 에서 decoding 이 GIL 을 잡고 있어 io thread 가 밀리지 않도록 하기 위함.
+        deadline 의 남은 시간과 TOKEN_JSON_DECODE_TIMEOUT 중 짧은 시간까지 기다린다.
+        """
+        if self.worker_pool is None or len(data) < TOKEN_JSON_OFFLOAD_BYTES:
+            return decode(data)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        try:
+            return self.worker_pool.run_with_buffer(
+                decode,
+                data,
+                timeout=timeouts.get_timeout(deadline, TOKEN_JSON_DECODE_TIMEOUT),
+            )
+        except (workers.WorkerTimeoutError, timeouts.DeadlineExceeded) as e:
+            # token json 의 오류가 아니므로 negative cache 에 기록하지 않음
+            raise NFTServiceTimeoutError(e)
 
-    def _get_json_from_http(self, uri: str) -> NFTTokenJson:
+    def _get_json_from_http(
+        self, uri: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> NFTTokenJson:
         try:
-            r = requests.get(uri, timeout=1, verify=False)
+            r = requests.get(
+                uri,
+                timeout=timeouts.get_timeout(deadline, TOKEN_URI_TIMEOUT),
+                verify=False,
+            )
             r.raise_for_status()
-            return r.json()
+        except requests.exceptions.Timeout as e:
+            # ConnectTimeout 은 ConnectionError 이기도 하므로 먼저 처리
+            log.warning("get token json from http. timeout. %s", e)
+            raise NFTServiceTimeoutError(e)
         except (
             requests.exceptions.ConnectionError,
             requests.exceptions.HTTPError,
-            requests.exceptions.Timeout,
         ) as e:
             log.error("get token json fomr http. request error. %s", e)
             raise NFTServiceTokenDataError(e)
+        return self._decode_token_json(codec.decode_json, r.content, deadline)
 
 
 class AlchemyBaseNFTService(NFTServiceBase):
+    token_errors = (alchemy.AlchemyApiError,)
+    owned_nfts_model = alchemy.AlchemyOwnedNftResult
+
     def __init__(
         self,
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         alchemy_api: alchemy.AlchemyApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
+        super().__init__(ipfs, negative_cache, **options)
         self.alchemy_api = alchemy_api
         self.repo = repo
-        self.ipfs = ipfs
         self.network: alchemy.AlchemyNet
         self.net_map = {
             alchemy.AlchemyNet.EthMainNet.value: models.Chain.ETHEREUM,
@@ -107,55 +732,18 @@ class AlchemyBaseNFTService(NFTServiceBase):
             alchemy.AlchemyNet.PolygonMumbaiNet.value: models.Chain.POLYGON_MUMBAI,
         }
 
-    def get_NFTs_by_owner(
-        self, owner: str, cursor: str = None, resync: bool = False
-    ) -> OwnedNftResult:
-        """ether wallet address 로부터 ethereum nft 데이터를 가져온다.
-        alchemy api 를 사용해서 wallet 의 nft 를 가져온다.
-
-        repository 로부터 caching nft metadata 데이터를 가져오고 없으면 alchemy api 를 호출한다.
-
-        resync = False 인 경우 repository cache data 사용,
-        resync = True 인 경우 repository cache data 를 사용하지 않고 API 데이터 return, repository 를 갱신함.
-
-        Args:
-            owner: wallet address
-            resync: repository 데이터 사용
-        """
-        owned_nfts_result = self.alchemy_api.get_NFTs(self.network, owner, cursor)
-        with futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as exec:
-            if resync:
-                future_list = [
-                    exec.submit(self._get_nft_metadata_from_api, nft)
-                    for nft in owned_nfts_result.owned_nfts
-                ]
-            else:
-                future_list = [
-                    exec.submit(self._get_nft_metadata, nft)
-                    for nft in owned_nfts_result.owned_nfts
-                ]
-
-            result = []
-            for f in future_list:
-                try:
-                    # AlchemyApi 오류 발생 시 결과에서 제외
-                    result.append(f.result())
-                except alchemy.AlchemyApiError as e:
-                    log.error("alchemy api error: %s", e)
-
-        return OwnedNftResult(
-            cursor=owned_nfts_result.cursor,
-            nfts=[nft for nft in result if nft is not None],
-        )
-
     def get_NFT_by_contract_token_id(
-        self, contract_address: str, token_id: str, resync: bool
+        self,
+        contract_address: str,
+        token_id: str,
+        resync: bool,
+        deadline: Optional[timeouts.Deadline] = None,
     ):
         if resync:
             nft = alchemy.AlchemyOwnedNft(
                 contract_address=contract_address, token_id=token_id
             )
-            return self._get_nft_metadata_from_api(nft)
+            return self._get_nft_metadata_from_api(nft, deadline)
 
         else:
             nft = self.repo.get_NFT_metadata(
@@ -164,25 +752,36 @@ class AlchemyBaseNFTService(NFTServiceBase):
             return nft
 
     def _get_nft_metadata_from_api(
-        self, nft: alchemy.AlchemyOwnedNft
+        self,
+        nft: alchemy.AlchemyOwnedNft,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
     ) -> Optional[models.NftMetadata]:
         nft_metadata = self.alchemy_api.get_NFT_metadata(
-            self.network, nft.contract_address, nft.token_id
+            self.network, nft.contract_address, nft.token_id, deadline
         )
 
         # NFT metadata 를 repository 에 caching
         self.repo.set_NFT_metadata(nft_metadata)
         return nft_metadata
 
-    def _get_nft_metadata(
+    def _get_cached_nft_metadata(
         self, nft: alchemy.AlchemyOwnedNft
     ) -> Optional[models.NftMetadata]:
-        metadata = self.repo.get_NFT_metadata(
+        return self.repo.get_NFT_metadata(
             self.net_map[self.network.value], nft.contract_address, nft.token_id
         )
-        if metadata:
-            return metadata
-        return self._get_nft_metadata_from_api(nft)
+
+    def _get_owned_nfts(
+        self,
+        owner: str,
+        cursor: Optional[str],
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> alchemy.AlchemyOwnedNftResult:
+        return self.alchemy_api.get_NFTs(self.network, owner, cursor, deadline)
+
+    def _get_token_key(self, nft: alchemy.AlchemyOwnedNft) -> Tuple[str, str]:
+        return nft.contract_address, nft.token_id
 
 
 class EthereumNFTService(AlchemyBaseNFTService):
@@ -191,9 +790,12 @@ class EthereumNFTService(AlchemyBaseNFTService):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         alchemy_api: alchemy.AlchemyApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, alchemy_api)
+        super().__init__(repo, ipfs, alchemy_api, negative_cache, **options)
         self.network = alchemy.AlchemyNet.EthMainNet
+        self.chain = models.Chain.ETHEREUM
 
 
 class EthereumGoerliNFTService(AlchemyBaseNFTService):
@@ -202,9 +804,12 @@ class EthereumGoerliNFTService(AlchemyBaseNFTService):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         alchemy_api: alchemy.AlchemyApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, alchemy_api)
+        super().__init__(repo, ipfs, alchemy_api, negative_cache, **options)
         self.network = alchemy.AlchemyNet.EthGoerliNet
+        self.chain = models.Chain.ETHEREUM_GOERLI
 
 
 class PolygonNFTService(AlchemyBaseNFTService):
@@ -213,9 +818,12 @@ class PolygonNFTService(AlchemyBaseNFTService):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         alchemy_api: alchemy.AlchemyApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, alchemy_api)
+        super().__init__(repo, ipfs, alchemy_api, negative_cache, **options)
         self.network = alchemy.AlchemyNet.PolygonMainNet
+        self.chain = models.Chain.POLYGON
 
 
 class PolygonMumbaiNFTService(AlchemyBaseNFTService):
@@ -224,75 +832,51 @@ class PolygonMumbaiNFTService(AlchemyBaseNFTService):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         alchemy_api: alchemy.AlchemyApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, alchemy_api)
+        super().__init__(repo, ipfs, alchemy_api, negative_cache, **options)
         self.network = alchemy.AlchemyNet.PolygonMumbaiNet
+        self.chain = models.Chain.POLYGON_MUMBAI
 
 
 class KlaytnNFTServiceBase(NFTServiceBase):
+    # kas api 오류 발생 nft 제외
+    # token uri 데이터에 connection error 발생하는 경우도 제외
+    # token uro 데이터가 ipfs 에 있는 경우. ipfs 에서 파일 받을 수 없는 경우 제외
+    token_errors = (kas.KasApiError, NFTServiceTokenDataError, ipfs.IPFSDownloadError)
+    owned_nfts_model = kas.KlaytnOwndNftResult
+    # contract 정보는 거의 바뀌지 않으므로 token 마다 조회하지 않도록 caching
+    contract_cache: Optional[cache.TieredCache] = None
+
     def __init__(
         self,
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         kas_api: kas.KasApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        contract_cache: Optional[cache.TieredCache] = None,
+        **options,
     ):
+        super().__init__(ipfs, negative_cache, **options)
         self.kas_api = kas_api
         self.repo = repo
-        self.ipfs = ipfs
+        self.contract_cache = contract_cache
         self.kas_chain = kas.ChainId.Cypress
         self.chain = models.Chain.KLAYTN
 
-    def get_NFTs_by_owner(
-        self, owner: str, cursor: str = None, resync: bool = False
-    ) -> OwnedNftResult:
-        """klaytn wallet address nft 데이터를 가져온다."""
-
-        owned_nfts_result = self.kas_api.get_tokens_by_owner(
-            self.kas_chain, owner, (kas.TokenKind.NFT, kas.TokenKind.MT), cursor
-        )
-
-        with futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as exec:
-            if resync:
-                future_to_nft = {
-                    exec.submit(self._get_nft_metadata_from_api, nft): nft
-                    for nft in owned_nfts_result.owned_nfts
-                }
-
-            else:
-                future_to_nft = {
-                    exec.submit(self._get_nft_metadata, nft): nft
-                    for nft in owned_nfts_result.owned_nfts
-                }
-
-            result = []
-            for f, nft in future_to_nft.items():
-                try:
-                    result.append(f.result())
-                except (
-                    kas.KasApiError,
-                    NFTServiceTokenDataError,
-                    ipfs.IPFSDownloadError,
-                ) as e:
-                    # kas api 오류 발생 nft 제외
-                    # token uri 데이터에 connection error 발생하는 경우도 제외
-                    # token uro 데이터가 ipfs 에 있는 경우. ipfs 에서 파일 받을 수 없는 경우 제외
-                    log.warning("kas api error %s. nft=%s", e, nft)
-                except Exception as e:
-                    log.exception("kas api error %s. nft=%s", e, nft)
-
-        return OwnedNftResult(
-            cursor=owned_nfts_result.cursor,
-            nfts=[nft for nft in result if nft is not None],
-        )
-
     def get_NFT_by_contract_token_id(
-        self, contract_address: str, token_id: str, resync: bool
+        self,
+        contract_address: str,
+        token_id: str,
+        resync: bool,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> Optional[models.NftMetadata]:
         if resync:
             owned_nft = kas.KlaytnOwnedNft(
                 contract_address=contract_address, token_id=token_id
             )
-            return self._get_nft_metadata_from_api(owned_nft)
+            return self._get_nft_metadata_from_api(owned_nft, deadline)
         else:
             nft_metadata = self.repo.get_NFT_metadata(
                 self.chain, contract_address, token_id
@@ -300,7 +884,10 @@ class KlaytnNFTServiceBase(NFTServiceBase):
             return nft_metadata
 
     def _get_nft_metadata_from_api(
-        self, nft: kas.KlaytnOwnedNft
+        self,
+        nft: kas.KlaytnOwnedNft,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
     ) -> Optional[models.NftMetadata]:
         """cache repository 를 거지치 않고 api 를 사용하여 nft metadata 를 생성한다.
 
@@ -310,7 +897,7 @@ class KlaytnNFTServiceBase(NFTServiceBase):
         try:
             # nft metadata update 도중 예외 발생하는 경우. 오류 무시
             self.kas_api.update_nft_token_metadata(
-                self.kas_chain, nft.contract_address, nft.token_id
+                self.kas_chain, nft.contract_address, nft.token_id, deadline
             )
         except kas.KasApiError as e:
             log.warning(
@@ -320,16 +907,32 @@ class KlaytnNFTServiceBase(NFTServiceBase):
                 nft.token_id,
             )
 
+        nft_metadata = self.build_nft_metadata(nft, deadline, use_cache)
+        self.repo.set_NFT_metadata(nft_metadata)
+        return nft_metadata
+
+    def build_nft_metadata(
+        self,
+        nft: kas.KlaytnOwnedNft,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
+    ) -> models.NftMetadata:
+        """contract 정보와 token uri 데이터로 nft metadata 를 만든다. repository 에 저장하지 않음
+
+        use_cache = False 면 token_uri_cache 를 거치지 않고 token uri 데이터를 새로 가져온다.
+        """
         try:
-            nft_contract = self._get_nft_contract(nft.contract_address)
+            nft_contract = self._get_nft_contract(nft.contract_address, deadline)
             if nft.token_uri:
-                token_data = self._get_token_data_by_uri(nft.token_uri)
+                token_data = self._get_token_data_by_uri(
+                    nft.token_uri, deadline, use_cache
+                )
             else:
                 nft_result = self.kas_api.get_nft(
-                    self.kas_chain, nft.contract_address, nft.token_id
+                    self.kas_chain, nft.contract_address, nft.token_id, deadline
                 )
                 token_uri = nft_result["tokenUri"]
-                token_data = self._get_token_data_by_uri(token_uri)
+                token_data = self._get_token_data_by_uri(token_uri, deadline, use_cache)
 
         except kas.KasApiError as e:
             log.error(
@@ -347,7 +950,7 @@ class KlaytnNFTServiceBase(NFTServiceBase):
             )
             raise NFTServiceError(e)
 
-        nft_metadata = models.NftMetadata(
+        return models.NftMetadata(
             chain=self.chain.value,
             contract_address=nft.contract_address,
             contract_name=nft_contract.name,
@@ -368,22 +971,69 @@ class KlaytnNFTServiceBase(NFTServiceBase):
             external_url=token_data.get("external_url"),
             token_data=token_data,
         )
-        self.repo.set_NFT_metadata(nft_metadata)
-        return nft_metadata
 
-    def _get_nft_metadata(
+    def _get_cached_nft_metadata(
         self, nft: kas.KlaytnOwnedNft
     ) -> Optional[models.NftMetadata]:
-        nft_metadata = self.repo.get_NFT_metadata(
+        return self.repo.get_NFT_metadata(
             self.chain, nft.contract_address, nft.token_id
         )
-        if nft_metadata:
-            return nft_metadata
 
-        return self._get_nft_metadata_from_api(nft)
+    def _get_owned_nfts(
+        self,
+        owner: str,
+        cursor: Optional[str],
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> kas.KlaytnOwndNftResult:
+        return self.kas_api.get_tokens_by_owner(
+            self.kas_chain,
+            owner,
+            (kas.TokenKind.NFT, kas.TokenKind.MT),
+            cursor,
+            deadline,
+        )
 
-    def _get_nft_contract(self, contract_address: str) -> models.KlaytnNftContract:
-        result = self.kas_api.get_nft_contract_raw(self.kas_chain, contract_address)
+    def _get_token_key(self, nft: kas.KlaytnOwnedNft) -> Tuple[str, str]:
+        return nft.contract_address, nft.token_id
+
+    def _get_transferred_tokens(
+        self, owner: str, since: int, deadline: Optional[timeouts.Deadline] = None
+    ) -> Optional[Set[Tuple[str, str]]]:
+        changed: Set[Tuple[str, str]] = set()
+        cursor = None
+        for _ in range(TRANSFER_HISTORY_MAX_PAGES):
+            result = self.kas_api.get_nft_transfer_history_by_owner(
+                self.kas_chain, owner, since, cursor, deadline
+            )
+            for history in result.transfer_history:
+                changed.add((history.contract.address.lower(), history.token_id))
+            cursor = result.cursor
+            if not cursor:
+                return changed
+        # 전송이 아주 많은 wallet 은 전체 resync 가 더 저렴함
+        log.info("too many transfers. owner=%s since=%s", owner, since)
+        return None
+
+    def _get_nft_contract(
+        self, contract_address: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> models.KlaytnNftContract:
+        key = cache.contract_key(self.chain.value, contract_address)
+        if self.contract_cache is not None:
+            contract = self.contract_cache.get(key)
+            if contract is not None:
+                return contract
+
+        contract = self._get_nft_contract_from_api(contract_address, deadline)
+        if self.contract_cache is not None:
+            self.contract_cache.set(key, contract.copy(update={"cached": True}))
+        return contract
+
+    def _get_nft_contract_from_api(
+        self, contract_address: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> models.KlaytnNftContract:
+        result = self.kas_api.get_nft_contract_raw(
+            self.kas_chain, contract_address, deadline
+        )
         return models.KlaytnNftContract(
             address=result["address"],
             name=result["name"],
@@ -405,8 +1055,11 @@ class KlaytnNFTService(KlaytnNFTServiceBase):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         kas_api: kas.KasApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        contract_cache: Optional[cache.TieredCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, kas_api)
+        super().__init__(repo, ipfs, kas_api, negative_cache, contract_cache, **options)
         self.kas_chain = kas.ChainId.Cypress
         self.chain = models.Chain.KLAYTN
 
@@ -417,86 +1070,62 @@ class KlaytnBaobobNFTService(KlaytnNFTServiceBase):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         kas_api: kas.KasApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        contract_cache: Optional[cache.TieredCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, kas_api)
+        super().__init__(repo, ipfs, kas_api, negative_cache, contract_cache, **options)
         self.kas_chain = kas.ChainId.Baobab
         self.chain = models.Chain.KLAYTN_BAOBAB
 
 
 class BinanceNFTServiceBase(NFTServiceBase):
+    token_errors = (NFTServiceTokenDataError,)
+    owned_nfts_model = moralis.MoralisOwnedNftResult
+    # multithread 실행 시 moralis API 가 Too many request 발생함
+    max_workers = 1
+
     def __init__(
         self,
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         moralis_api: moralis.MorailsApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
+        super().__init__(ipfs, negative_cache, **options)
         self.moralis_api = moralis_api
         self.repo = repo
-        self.ipfs = ipfs
         self.binance_chain = moralis.MorailsNetwork.BinanceMainNet
         self.chain = models.Chain.BINANCE
 
-    def get_NFTs_by_owner(
-        self, owner: str, cursor: str = None, resync: bool = False
-    ) -> OwnedNftResult:
-
-        owned_nfts_result = self.moralis_api.get_NFTs(self.binance_chain, owner, cursor)
-
-        result = []
-        for nft in owned_nfts_result.owned_nfts:
-            try:
-                if resync:
-                    metadata = self._get_nft_metadata_from_api(nft)
-                else:
-                    metadata = self._get_nft_metadata(nft)
-                result.append(metadata)
-            except NFTServiceTokenDataError as e:
-                log.warning(
-                    "binance nft token data error. %s. contract_address=%s, token_id=%s",
-                    e,
-                    nft.token_address,
-                    nft.token_id,
-                )
-
-        # multithread 실행 시 moralis API 가 Too many request 발생함
-        # with futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as exec:
-        #     if resync:
-        #         future_list = [
-        #             exec.submit(self._get_nft_metadata_from_api, nft)
-        #             for nft in owned_nfts_result.owned_nfts
-        #         ]
-        #     else:
-        #         future_list = [
-        #             exec.submit(self._get_nft_metadata, nft)
-        #             for nft in owned_nfts_result.owned_nfts
-        #         ]
-        #     result = [f.result() for f in future_list]
-
-        return OwnedNftResult(
-            cursor=owned_nfts_result.cursor,
-            nfts=[nft for nft in result if nft is not None],
-        )
-
     def get_NFT_by_contract_token_id(
-        self, contract_address: str, token_id: str, resync: bool
+        self,
+        contract_address: str,
+        token_id: str,
+        resync: bool,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> Optional[models.NftMetadata]:
 
         nft = moralis.MoralisOwnedNft(token_address=contract_address, token_id=token_id)
         if resync:
-            return self._get_nft_metadata_from_api(nft)
+            return self._get_nft_metadata_from_api(nft, deadline)
         else:
             return self.repo.get_NFT_metadata(
                 self.chain, nft.token_address, nft.token_id
             )
 
     def _get_nft_metadata_from_api(
-        self, nft: moralis.MoralisOwnedNft
+        self,
+        nft: moralis.MoralisOwnedNft,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
     ) -> models.NftMetadata:
         nft_metadata = self.moralis_api.get_NFT_metadata(
-            self.binance_chain, nft.token_address, nft.token_id
+            self.binance_chain, nft.token_address, nft.token_id, deadline
         )
 
-        token_data = self._get_token_data(nft_metadata)
+        token_data = self._get_token_data(nft_metadata, deadline, use_cache)
 
         name = token_data.get("name")
         if not name:
@@ -548,25 +1177,39 @@ class BinanceNFTServiceBase(NFTServiceBase):
         result.cached = False
         return result
 
-    def _get_nft_metadata(self, nft: moralis.MoralisOwnedNft) -> models.NftMetadata:
-        metadata = self.repo.get_NFT_metadata(
-            self.chain, nft.token_address, nft.token_id
-        )
-        if metadata:
-            return metadata
-        return self._get_nft_metadata_from_api(nft)
+    def _get_cached_nft_metadata(
+        self, nft: moralis.MoralisOwnedNft
+    ) -> Optional[models.NftMetadata]:
+        return self.repo.get_NFT_metadata(self.chain, nft.token_address, nft.token_id)
+
+    def _get_owned_nfts(
+        self,
+        owner: str,
+        cursor: Optional[str],
+        deadline: Optional[timeouts.Deadline] = None,
+    ) -> moralis.MoralisOwnedNftResult:
+        return self.moralis_api.get_NFTs(self.binance_chain, owner, cursor, deadline)
 
-    def _parse_metadata(self, metadata: str) -> NFTTokenJson:
-        data = json.loads(metadata)
-        return data
+    def _get_token_key(self, nft: moralis.MoralisOwnedNft) -> Tuple[str, str]:
+        return nft.token_address, nft.token_id
 
-    def _get_token_data(self, nft: moralis.MoralisNFTMetadata) -> NFTTokenJson:
+    def _parse_metadata(
+        self, metadata: str, deadline: Optional[timeouts.Deadline] = None
+    ) -> NFTTokenJson:
+        return self._decode_token_json(codec.decode_json, metadata, deadline)
+
+    def _get_token_data(
+        self,
+        nft: moralis.MoralisNFTMetadata,
+        deadline: Optional[timeouts.Deadline] = None,
+        use_cache: bool = False,
+    ) -> NFTTokenJson:
         """metadata 에 data 있는 경우"""
         if nft.metadata is not None:
-            return self._parse_metadata(nft.metadata)
+            return self._parse_metadata(nft.metadata, deadline)
         elif nft.token_uri is not None:
             log.debug("moralis nft metadata nft.metadata is None. %s", nft)
-            return self._get_token_data_by_uri(nft.token_uri)
+            return self._get_token_data_by_uri(nft.token_uri, deadline, use_cache)
         else:
             log.warning("can't get token data from moralis nft metadata. nft=%s", nft)
             return {
@@ -583,8 +1226,10 @@ class BinanceNFTService(BinanceNFTServiceBase):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         moralis_api: moralis.MorailsApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, moralis_api)
+        super().__init__(repo, ipfs, moralis_api, negative_cache, **options)
         self.binance_chain = moralis.MorailsNetwork.BinanceMainNet
         self.chain = models.Chain.BINANCE
 
@@ -595,8 +1240,10 @@ class BinanceTestNFTService(BinanceNFTServiceBase):
         repo: repository.NFTMetadataRespository,
         ipfs: ipfs.IPFSProxy,
         moralis_api: moralis.MorailsApi,
+        negative_cache: Optional[backoff.NegativeCache] = None,
+        **options,
     ):
-        super().__init__(repo, ipfs, moralis_api)
+        super().__init__(repo, ipfs, moralis_api, negative_cache, **options)
         self.binance_chain = moralis.MorailsNetwork.BinanceTestNet
         self.chain = models.Chain.BINANCE_TESTNET
 
@@ -625,30 +1272,152 @@ class NFTService:
         }
 
     def get_NFTs_by_owner(
-        self, chain: models.Chain, owner: str, cursor: str = None, resync: bool = False
+        self,
+        chain: models.Chain,
+        owner: str,
+        cursor: str = None,
+        resync: bool = False,
+        deadline: Optional[timeouts.Deadline] = None,
+        incremental: bool = False,
     ) -> OwnedNftResult:
         nft_srv: NFTServiceProtocol = self.chains[chain]
-        owned_nfts_result = nft_srv.get_NFTs_by_owner(owner, cursor, resync)
+        owned_nfts_result = nft_srv.get_NFTs_by_owner(
+            owner, cursor, resync, deadline, incremental
+        )
         return owned_nfts_result
 
+    def get_indexed_NFTs_by_owner(
+        self, chain: models.Chain, owner: str, cursor: Optional[str] = None
+    ) -> Optional[OwnedNftResult]:
+        nft_srv: NFTServiceProtocol = self.chains[chain]
+        return nft_srv.get_indexed_NFTs_by_owner(owner, cursor)
+
+    def get_NFTs_by_owner_multi_chain(
+        self,
+        owner: str,
+        chains: Optional[List[models.Chain]] = None,
+        cursor: Optional[str] = None,
+        resync: bool = False,
+        deadline: Optional[timeouts.Deadline] = None,
+        incremental: bool = False,
+    ) -> MultiChainOwnedNftResult:
+        """여러 chain 의 nft 목록을 동시에 조회하여 합친다.
+
+        cursor 가 있는 경우 chains 대신 cursor 에 남아있는 chain 만 조회한다.
+        각 chain 은 전체 deadline 보다 조금 이른 deadline 으로 조회하여 부분 결과를 반환한다.
+        deadline 내에 응답하지 않은 chain 은 결과에서 제외하고 다음 cursor 에 이전 cursor 를 남긴다.
+        응답하지 않은 chain 의 작업은 계속 진행되어 repository 에 caching 된다.
+        """
+        if deadline is None:
+            deadline = timeouts.Deadline(MULTI_CHAIN_TIMEOUT)
+        chain_deadline = deadline.shrink(CHAIN_DEADLINE_MARGIN)
+
+        if cursor:
+            chain_cursors = decode_multi_chain_cursor(cursor)
+        else:
+            chain_cursors = {chain: None for chain in (chains or DEFAULT_MULTI_CHAINS)}
+
+        exec = futures.ThreadPoolExecutor(max_workers=max(len(chain_cursors), 1))
+        future_to_chain = {
+            exec.submit(
+                self.get_NFTs_by_owner,
+                chain,
+                owner,
+                chain_cursor,
+                resync,
+                chain_deadline,
+                incremental,
+            ): chain
+            for chain, chain_cursor in chain_cursors.items()
+        }
+        done, _ = futures.wait(future_to_chain, timeout=deadline.remaining())
+        # 제한시간을 넘긴 chain 의 작업을 기다리지 않음
+        exec.shutdown(wait=False)
+
+        chain_to_future = {chain: f for f, chain in future_to_chain.items()}
+        nfts: List[models.NftMetadata] = []
+        pending: List[models.PendingNft] = []
+        next_cursors: Dict[models.Chain, Optional[str]] = {}
+        pending_chains: List[models.Chain] = []
+        failed_chains: List[models.Chain] = []
+        for chain, chain_cursor in chain_cursors.items():
+            f = chain_to_future[chain]
+            if f not in done:
+                log.warning("multi chain timeout. chain=%s owner=%s", chain, owner)
+                pending_chains.append(chain)
+                next_cursors[chain] = chain_cursor
+                continue
+
+            try:
+                result = f.result()
+            except Exception as e:
+                log.error("multi chain error. %s. chain=%s owner=%s", e, chain, owner)
+                failed_chains.append(chain)
+                continue
+
+            nfts.extend(result.nfts)
+            pending.extend(result.pending)
+            if result.cursor:
+                next_cursors[chain] = result.cursor
+
+        return MultiChainOwnedNftResult(
+            cursor=encode_multi_chain_cursor(next_cursors) if next_cursors else None,
+            nfts=nfts,
+            pending=pending,
+            pending_chains=pending_chains,
+            failed_chains=failed_chains,
+        )
+
+    def iter_NFTs_by_owner(
+        self, chain: models.Chain, owner: str, resync: bool = False
+    ) -> Iterator[models.NftMetadata]:
+        nft_srv: NFTServiceProtocol = self.chains[chain]
+        return nft_srv.iter_NFTs_by_owner(owner, resync)
+
+    def load_token_data(
+        self, nfts: List[models.NftMetadata]
+    ) -> List[models.NftMetadata]:
+        return [
+            self.chains[models.Chain(nft.chain)].load_token_data(nft) for nft in nfts
+        ]
+
     def get_NFT_by_contract_token_id(
-        self, chain: models.Chain, contract_address: str, token_id: str, resync: bool
+        self,
+        chain: models.Chain,
+        contract_address: str,
+        token_id: str,
+        resync: bool,
+        deadline: Optional[timeouts.Deadline] = None,
     ) -> Optional[models.NftMetadata]:
         try:
             nft_srv: NFTServiceProtocol = self.chains[chain]
             nft = nft_srv.get_NFT_by_contract_token_id(
-                contract_address, token_id, resync
+                contract_address, token_id, resync, deadline
             )
             return nft
 
         except (alchemy.AlchemyApiError, kas.KasApiError, moralis.MoralisApiError) as e:
             log.error("api error. %s", e)
             raise NFTServiceError(e)
+        except (timeouts.DeadlineExceeded, requests.exceptions.Timeout) as e:
+            log.error("api timeout. %s", e)
+            raise NFTServiceTimeoutError(e)
 
 
-class NFTServiceError(Exception):
-    pass
+def encode_multi_chain_cursor(chain_cursors: Dict[models.Chain, Optional[str]]) -> str:
+    """chain 별 cursor 를 하나의 cursor 문자열로 만든다. 첫 page 를 조회할 chain 은 '' 값."""
+    data = {
+        chain.value: chain_cursor or "" for chain, chain_cursor in chain_cursors.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
 
 
-class NFTServiceTokenDataError(Exception):
-    pass
+def decode_multi_chain_cursor(cursor: str) -> Dict[models.Chain, Optional[str]]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {
+            models.Chain(chain): chain_cursor or None
+            for chain, chain_cursor in data.items()
+        }
+    except (ValueError, AttributeError) as e:
+        raise NFTServiceError(f"invalid multi chain cursor. {e}")
@@ -0,0 +1,150 @@
+import logging
+import os
+import pathlib
+import threading
+import time
+from typing import Optional
+
+import orjson
+
+from anv import cache, codec, models, repository
+
+log = logging.getLogger(f"anv.{__name__}")
+
+SNAPSHOT_VERSION = 1
+
+# snapshot 에 저장하는 cache 항목 수. 최근에 사용한 항목부터 저장
+SNAPSHOT_SIZE = 5_000
+
+# snapshot 저장 주기 (seconds)
+SNAPSHOT_INTERVAL = 10 * 60
+
+# 이 시간(seconds) 보다 오래된 snapshot 은 사용하지 않음
+SNAPSHOT_MAX_AGE = 60 * 60
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def save_snapshot(
+    path: pathlib.Path,
+    metadata_cache: Optional[cache.LRUCache],
+    contract_cache: Optional[cache.LRUCache],
+    limit: int = SNAPSHOT_SIZE,
+) -> int:
+    """cache 에서 최근에 사용한 항목을 limit 개 까지 파일로 저장하고 저장한 항목 수를 return"""
+    metadata = [
+        codec.to_document(nft, exclude=repository.TOKEN_DATA_EXCLUDE)
+        for _, nft in (
+            metadata_cache.items(limit) if metadata_cache is not None else []
+        )
+    ]
+    contracts = [
+        {"key": key, "contract": contract.dict()}
+        for key, contract in (
+            contract_cache.items(limit) if contract_cache is not None else []
+        )
+    ]
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "metadata": metadata,
+        "contracts": contracts,
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 여러 process 가 같은 파일에 저장해도 깨진 파일이 남지 않도록 rename 으로 교체
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(orjson.dumps(data))
+    os.replace(tmp_path, path)
+    log.debug(
+        "cache snapshot saved. metadata=%s contracts=%s", len(metadata), len(contracts)
+    )
+    return len(metadata) + len(contracts)
+
+
+def load_snapshot(
+    path: pathlib.Path,
+    metadata_cache: Optional[cache.LRUCache],
+    contract_cache: Optional[cache.LRUCache],
+    max_age: Optional[float] = None,
+) -> int:
+    """snapshot 파일의 항목을 cache 에 넣고 넣은 항목 수를 return.
+    파일이 없거나 max_age(seconds) 보다 오래된 snapshot 은 사용하지 않는다.
+    """
+    if not path.exists():
+        return 0
+    try:
+        data = orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError) as e:
+        raise SnapshotError(e)
+
+    if data.get("version") != SNAPSHOT_VERSION:
+        log.warning("unknown cache snapshot version %s", data.get("version"))
+        return 0
+    age = time.time() - data.get("created_at", 0)
+    if max_age is not None and age > max_age:
+        log.info("cache snapshot too old. age=%ds", age)
+        return 0
+
+    count = 0
+    # 최근에 사용한 항목이 cache 의 최근 항목이 되도록 오래된 항목부터 넣음
+    if metadata_cache is not None:
+        for document in reversed(data.get("metadata", [])):
+            nft = codec.from_document(document)
+            key = cache.metadata_key(nft.chain, nft.contract_address, nft.token_id)
+            metadata_cache.set(key, nft)
+            count += 1
+    if contract_cache is not None:
+        for item in reversed(data.get("contracts", [])):
+            contract = models.KlaytnNftContract.parse_obj(item["contract"])
+            contract_cache.set(item["key"], contract)
+            count += 1
+    log.info("cache snapshot loaded. items=%s age=%ds", count, age)
+    return count
+
+
+class SnapshotWriter:
+    """interval 마다 cache snapshot 을 저장한다. stop() 할 때 한 번 더 저장한다."""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        metadata_cache: Optional[cache.LRUCache],
+        contract_cache: Optional[cache.LRUCache],
+        limit: int = SNAPSHOT_SIZE,
+        interval: float = SNAPSHOT_INTERVAL,
+    ):
+        self.path = path
+        self.metadata_cache = metadata_cache
+        self.contract_cache = contract_cache
+        self.limit = limit
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="cache-snapshot", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.save()
+
+    def save(self):
+        try:
+            save_snapshot(
+                self.path, self.metadata_cache, self.contract_cache, self.limit
+            )
+        except Exception as e:
+            log.exception("cache snapshot save error. %s", e)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.save()
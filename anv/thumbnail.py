@@ -0,0 +1,233 @@
+import io
+import logging
+import os
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Sequence
+
+# Pillow 는 이미지를 변환할 때 import 한다
+if TYPE_CHECKING:
+    from PIL import Image
+
+log = logging.getLogger(f"anv.{__name__}")
+
+# models.NftUrl 의 h250, h500, h750, h1000
+HEIGHTS = (250, 500, 750, 1000)
+
+# decompression bomb 방지. 넘는 이미지는 resize 하지 않음
+MAX_PIXELS = 12_000 * 12_000
+
+# animation 이미지의 전체 frame pixel 수 최대값. 넘으면 resize 하지 않고 format 변환만 함
+MAX_ANIMATION_PIXELS = 200_000_000
+
+# resize 결과 저장 format. 나머지 format 은 PNG 로 저장
+SAVE_FORMATS = {
+    "JPEG": ("image/jpeg", ".jpg"),
+    "PNG": ("image/png", ".png"),
+    "WEBP": ("image/webp", ".webp"),
+}
+
+# 원본 외에 추가로 만드는 format. models.NftUrl 의 webp, avif
+TRANSCODE_FORMATS = {
+    "WEBP": ("image/webp", ".webp"),
+    "AVIF": ("image/avif", ".avif"),
+}
+
+# 추가로 만들 format 목록. 예) "webp,avif". 빈 값이면 만들지 않음
+IMAGE_FORMATS = tuple(
+    fmt.strip().upper()
+    for fmt in os.getenv("IMAGE_TRANSCODE_FORMATS", "webp").split(",")
+    if fmt.strip()
+)
+
+# format 변환 품질 preset
+QUALITY_PRESETS = {
+    "low": {"quality": 60, "method": 4},
+    "medium": {"quality": 80, "method": 4},
+    "high": {"quality": 90, "method": 6},
+    "lossless": {"lossless": True, "quality": 100, "method": 6},
+}
+QUALITY_PRESET = os.getenv("IMAGE_QUALITY_PRESET", "medium")
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+class Thumbnail(NamedTuple):
+    data: bytes
+    content_type: str
+    suffix: str
+
+
+def make_thumbnails(
+    data: bytes, heights: Sequence[int] = HEIGHTS
+) -> Dict[int, Thumbnail]:
+    """원본 format 의 높이별 thumbnail"""
+    return {
+        height: thumb
+        for height, thumb in make_variants(data, heights).get(None, {}).items()
+        if height is not None
+    }
+
+
+def make_variants(
+    data: bytes,
+    heights: Sequence[int] = HEIGHTS,
+    formats: Sequence[str] = (),
+    preset: str = QUALITY_PRESET,
+) -> Dict[Optional[str], Dict[Optional[int], Thumbnail]]:
+    """이미지를 한 번 decode 하여 format 별, 높이별 이미지를 만든다.
+
+    return 값의 첫 key 는 format(원본 format 은 None), 두번째 key 는 높이(원본 크기는 None).
+    원본보다 큰 높이는 만들지 않는다.
+    animation 이미지는 frame 별로 resize 하여 animation 으로 저장한다.
+    전체 frame 이 MAX_ANIMATION_PIXELS 를 넘으면 resize 하지 않고 원본 크기의 format 변환만 한다.
+    process pool 에서 실행되므로 module level 함수로 둔다.
+    """
+    from PIL import Image
+
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Exception as e:
+        raise ThumbnailError(e)
+
+    if img.width * img.height > MAX_PIXELS:
+        raise ThumbnailError(f"image too large. size={img.size}")
+
+    img_format = img.format if img.format and img.format in SAVE_FORMATS else "PNG"
+    # 원본과 같은 format 은 변환하지 않음
+    formats = [fmt for fmt in formats if fmt != img.format and can_encode(fmt)]
+    options = QUALITY_PRESETS[preset]
+
+    if getattr(img, "is_animated", False):
+        return _make_animated_variants(img, img_format, heights, formats, options)
+
+    try:
+        img.load()
+    except Exception as e:
+        raise ThumbnailError(e)
+
+    result: Dict[Optional[str], Dict[Optional[int], Thumbnail]] = {None: {}}
+    for fmt in formats:
+        thumb = _try_save(img, fmt, TRANSCODE_FORMATS, **options)
+        if thumb:
+            result[fmt] = {None: thumb}
+
+    # 큰 크기부터 만들고, 이전 결과를 다시 줄여 resize 비용을 줄임
+    source: "Image.Image" = img
+    for height in sorted(heights, reverse=True):
+        if height >= img.height:
+            continue
+        width = max(round(img.width * height / img.height), 1)
+        try:
+            source = source.resize((width, height), Image.Resampling.LANCZOS)
+        except Exception as e:
+            log.warning("image resize error. %s. height=%s", e, height)
+            break
+        thumb = _try_save(source, img_format, SAVE_FORMATS)
+        if thumb:
+            result[None][height] = thumb
+        for transcode_format in result:
+            if transcode_format is None:
+                continue
+            thumb = _try_save(source, transcode_format, TRANSCODE_FORMATS, **options)
+            if thumb:
+                result[transcode_format][height] = thumb
+    return result
+
+
+def _make_animated_variants(
+    img: "Image.Image",
+    img_format: str,
+    heights: Sequence[int],
+    formats: Sequence[str],
+    options: dict,
+) -> Dict[Optional[str], Dict[Optional[int], Thumbnail]]:
+    from PIL import Image, ImageSequence
+
+    formats = [fmt for fmt in formats if fmt in Image.SAVE_ALL]
+    result: Dict[Optional[str], Dict[Optional[int], Thumbnail]] = {None: {}}
+    for fmt in formats:
+        thumb = _try_save(img, fmt, TRANSCODE_FORMATS, save_all=True, **options)
+        if thumb:
+            result[fmt] = {None: thumb}
+
+    if img_format not in Image.SAVE_ALL:
+        return result
+    n_frames = getattr(img, "n_frames", 1)
+    if n_frames * img.width * img.height > MAX_ANIMATION_PIXELS:
+        log.warning("animation too large to resize. frames=%s", n_frames)
+        return result
+    try:
+        frames = [frame.convert("RGBA") for frame in ImageSequence.Iterator(img)]
+        durations = [frame.info.get("duration", 100) for frame in frames]
+    except Exception as e:
+        raise ThumbnailError(e)
+    animation = {
+        "save_all": True,
+        "duration": durations,
+        "loop": img.info.get("loop", 0),
+    }
+
+    # 큰 크기부터 만들고, 이전 결과를 다시 줄여 resize 비용을 줄임
+    for height in sorted(heights, reverse=True):
+        if height >= img.height:
+            continue
+        width = max(round(img.width * height / img.height), 1)
+        try:
+            frames = [
+                frame.resize((width, height), Image.Resampling.LANCZOS)
+                for frame in frames
+            ]
+        except Exception as e:
+            log.warning("animation resize error. %s. height=%s", e, height)
+            break
+        thumb = _try_save(
+            frames[0],
+            img_format,
+            SAVE_FORMATS,
+            append_images=frames[1:],
+            **animation,
+        )
+        if thumb:
+            result[None][height] = thumb
+        for transcode_format in result:
+            if transcode_format is None:
+                continue
+            thumb = _try_save(
+                frames[0],
+                transcode_format,
+                TRANSCODE_FORMATS,
+                append_images=frames[1:],
+                **animation,
+                **options,
+            )
+            if thumb:
+                result[transcode_format][height] = thumb
+    return result
+
+
+def can_encode(img_format: str) -> bool:
+    from PIL import Image
+
+    Image.init()
+    return img_format in TRANSCODE_FORMATS and img_format in Image.SAVE
+
+
+def _save(img: "Image.Image", img_format: str, formats: dict, **options) -> Thumbnail:
+    if img_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    content_type, suffix = formats[img_format]
+    with io.BytesIO() as buffer:
+        img.save(buffer, format=img_format, **options)
+        return Thumbnail(buffer.getvalue(), content_type, suffix)
+
+
+def _try_save(
+    img: "Image.Image", img_format: str, formats: dict, **options
+) -> Optional[Thumbnail]:
+    """encoder 가 없거나 변환할 수 없는 mode 등 저장에 실패한 경우 해당 이미지만 제외한다."""
+    try:
+        return _save(img, img_format, formats, **options)
+    except Exception as e:
+        log.warning("image encode error. %s. format=%s", e, img_format)
+        return None
@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+# deadline 이 없는 외부 API 요청의 기본 timeout (seconds)
+DEFAULT_TIMEOUT = 10
+
+# API 요청 하나에 허용되는 기본 처리 시간 (seconds)
+REQUEST_TIMEOUT = 10
+
+# 응답에서 pending 으로 빠진 token 이 background 에서 조회를 계속할 수 있는 추가 시간 (seconds)
+PENDING_GRACE = 30
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """요청 처리 마감 시각.
+
+    FastAPI handler 에서 생성하여 service, api client 까지 전달한다.
+    외부 요청의 timeout 은 남은 시간을 넘지 않도록 timeout() 으로 계산한다.
+    """
+
+    def __init__(self, timeout: float):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, limit: Optional[float] = None) -> float:
+        """외부 요청에 사용할 timeout. 남은 시간과 limit 중 작은 값.
+        이미 마감된 경우 DeadlineExceeded.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("deadline exceeded")
+        if limit is None:
+            return remaining
+        return min(remaining, limit)
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded("deadline exceeded")
+
+    def shrink(self, seconds: float) -> "Deadline":
+        """seconds 만큼 먼저 마감되는 deadline"""
+        return Deadline(max(self.remaining() - seconds, 0.0))
+
+    def extend(self, seconds: float) -> "Deadline":
+        """seconds 만큼 늦게 마감되는 deadline"""
+        return Deadline(self.remaining() + seconds)
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f})"
+
+
+def get_timeout(deadline: Optional[Deadline], limit: float = DEFAULT_TIMEOUT) -> float:
+    """deadline 이 없으면 limit, 있으면 남은 시간과 limit 중 작은 값"""
+    if deadline is None:
+        return limit
+    return deadline.timeout(limit)
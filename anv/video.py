@@ -0,0 +1,111 @@
+import logging
+import os
+import pathlib
+import subprocess
+import tempfile
+from typing import List, NamedTuple, Optional
+
+log = logging.getLogger(f"anv.{__name__}")
+
+FFMPEG = os.getenv("FFMPEG_PATH", "ffmpeg")
+
+# poster 이미지를 추출할 위치 (seconds). 영상이 더 짧으면 첫 frame
+POSTER_OFFSET = 1
+
+# preview clip 설정
+PREVIEW_SECONDS = 5
+PREVIEW_HEIGHT = 360
+PREVIEW_VIDEO_BITRATE = "400k"
+PREVIEW_AUDIO_BITRATE = "64k"
+
+# ffmpeg 실행 하나에 허용되는 시간 (seconds)
+FFMPEG_TIMEOUT = 30
+
+
+class VideoError(Exception):
+    pass
+
+
+class VideoAssets(NamedTuple):
+    poster: Optional[bytes]  # jpeg
+    preview: Optional[bytes]  # video 는 mp4, audio 는 m4a
+    preview_content_type: Optional[str]
+
+
+def extract_video_assets(path: str, content_type: str) -> VideoAssets:
+    """video, audio 파일에서 poster 이미지와 짧은 저용량 preview 를 추출한다.
+    audio 는 앨범 이미지가 있는 경우에만 poster 를 만든다.
+    process pool 에서 실행되므로 module level 함수로 둔다.
+    """
+    is_audio = content_type.startswith("audio/")
+    with tempfile.TemporaryDirectory() as dir:
+        poster = _extract_poster(path, pathlib.Path(dir) / "poster.jpg", is_audio)
+
+        suffix = ".m4a" if is_audio else ".mp4"
+        preview_path = pathlib.Path(dir) / f"preview{suffix}"
+        try:
+            _run_ffmpeg(_preview_args(path, preview_path, is_audio))
+            preview = preview_path.read_bytes()
+        except VideoError as e:
+            log.debug("preview not extracted. %s", e)
+            preview = None
+
+    if poster is None and preview is None:
+        raise VideoError("no poster and preview")
+    preview_content_type = "audio/mp4" if is_audio else "video/mp4"
+    return VideoAssets(poster, preview, preview_content_type if preview else None)
+
+
+def _extract_poster(path: str, output: pathlib.Path, is_audio: bool) -> Optional[bytes]:
+    # POSTER_OFFSET 보다 짧은 영상은 frame 이 추출되지 않으므로 첫 frame 으로 다시 시도
+    offsets = [0] if is_audio else [POSTER_OFFSET, 0]
+    for offset in offsets:
+        try:
+            _run_ffmpeg(_poster_args(path, output, offset))
+        except VideoError as e:
+            log.debug("poster not extracted. %s", e)
+            continue
+        if output.exists() and output.stat().st_size:
+            return output.read_bytes()
+    return None
+
+
+def _poster_args(path: str, output: pathlib.Path, offset: float) -> List[str]:
+    args = ["-ss", str(offset)] if offset else []
+    return args + ["-i", path, "-an", "-frames:v", "1", "-q:v", "3", str(output)]
+
+
+def _preview_args(path: str, output: pathlib.Path, is_audio: bool) -> List[str]:
+    args = ["-i", path, "-t", str(PREVIEW_SECONDS)]
+    if is_audio:
+        return args + ["-vn", "-c:a", "aac", "-b:a", PREVIEW_AUDIO_BITRATE, str(output)]
+    return args + [
+        "-vf",
+        f"scale=-2:'min({PREVIEW_HEIGHT},ih)'",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-b:v",
+        PREVIEW_VIDEO_BITRATE,
+        "-c:a",
+        "aac",
+        "-b:a",
+        PREVIEW_AUDIO_BITRATE,
+        "-movflags",
+        "+faststart",
+        str(output),
+    ]
+
+
+def _run_ffmpeg(args: List[str]):
+    cmd = [FFMPEG, "-y", "-nostdin", "-loglevel", "error"] + args
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except FileNotFoundError as e:
+        raise VideoError(f"ffmpeg not found. {e}")
+    except subprocess.TimeoutExpired:
+        raise VideoError(f"ffmpeg timeout {FFMPEG_TIMEOUT}s")
+
+    if result.returncode != 0:
+        raise VideoError(result.stderr.decode("utf-8", "replace").strip())
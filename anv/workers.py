@@ -0,0 +1,129 @@
+import logging
+import multiprocessing
+import multiprocessing.pool
+from multiprocessing import resource_tracker, shared_memory
+import os
+import signal
+import threading
+from typing import Any, Callable, Optional
+
+log = logging.getLogger(f"anv.{__name__}")
+
+# process pool 크기. 기본값은 cpu 개수
+PROCESSES = int(os.getenv("WORKER_PROCESSES", "0")) or os.cpu_count() or 1
+
+# 작업 하나에 허용되는 기본 처리 시간 (seconds)
+TASK_TIMEOUT = 10
+
+# worker 가 timeout 으로 종료된 뒤 결과를 기다리지 않고 WorkerTimeoutError 를 낼 때까지의 여유 (seconds)
+TIMEOUT_GRACE = 0.5
+
+# 이 크기(byte) 이상의 buffer 는 pickle 로 pipe 에 복사하지 않고 shared memory 로 전달
+SHARED_MEMORY_MIN_BYTES = int(os.getenv("WORKER_SHARED_MEMORY_MIN_BYTES", 1024 * 1024))
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerTimeoutError(WorkerError):
+    pass
+
+
+class ProcessWorkerPool:
+    """CPU 작업(이미지 변환 등)을 별도 process 에서 실행하는 pool.
+
+    GIL 에 묶이지 않도록 caching thread 대신 process 에서 실행한다.
+    timeout 을 넘긴 작업은 그 작업을 실행하던 worker process 만 SIGALRM 으로 종료되고
+    pool 이 새 worker 를 채운다. 비정상적인 입력이 core 를 계속 점유하지 않도록 하면서
+    다른 worker 에서 실행중인 작업은 그대로 끝나도록 하기 위함.
+    """
+
+    def __init__(self, processes: int = PROCESSES, maxtasksperchild: int = 100):
+        self.processes = processes
+        self.maxtasksperchild = maxtasksperchild
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        self._lock = threading.Lock()
+
+    def run(
+        self, func: Callable[..., Any], *args: Any, timeout: float = TASK_TIMEOUT
+    ) -> Any:
+        """func(*args) 를 process 에서 실행하고 결과를 return.
+        timeout 을 넘기면 WorkerTimeoutError. func 에서 발생한 예외는 그대로 전달.
+        """
+        pool = self._get_pool()
+        result = pool.apply_async(_run_with_alarm, (timeout, func) + args)
+        try:
+            return result.get(timeout + TIMEOUT_GRACE)
+        except multiprocessing.TimeoutError:
+            log.warning("worker timeout. func=%s timeout=%s", func.__name__, timeout)
+            raise WorkerTimeoutError(f"{func.__name__} timeout {timeout}s")
+
+    def run_with_buffer(
+        self,
+        func: Callable[..., Any],
+        data: bytes,
+        *args: Any,
+        timeout: float = TASK_TIMEOUT,
+    ) -> Any:
+        """func(data, *args) 를 process 에서 실행하고 결과를 return.
+        SHARED_MEMORY_MIN_BYTES 이상인 data 는 shared memory 에 복사하여 이름만 전달한다.
+        """
+        if len(data) < SHARED_MEMORY_MIN_BYTES:
+            return self.run(func, data, *args, timeout=timeout)
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        try:
+            shm.buf[: len(data)] = data
+            return self.run(
+                _run_with_shared_buffer,
+                func,
+                shm.name,
+                len(data),
+                *args,
+                timeout=timeout,
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    def _get_pool(self) -> multiprocessing.pool.Pool:
+        with self._lock:
+            if self._pool is None:
+                # pool 의 process 가 shared memory 를 따로 추적하여 삭제하지 않도록
+                # resource tracker 를 먼저 실행하여 같이 사용하게 한다
+                resource_tracker.ensure_running()
+                self._pool = multiprocessing.Pool(
+                    self.processes, maxtasksperchild=self.maxtasksperchild
+                )
+            return self._pool
+
+
+def _run_with_alarm(timeout: float, func: Callable[..., Any], *args: Any) -> Any:
+    """worker process 에서 func(*args) 를 실행한다. timeout 을 넘기면 SIGALRM 기본 동작으로
+    이 worker 만 종료된다. C extension 안에서 멈춘 경우에도 종료되도록 handler 를 두지 않음.
+    """
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    signal.setitimer(signal.ITIMER_REAL, max(timeout, 0.001))
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _run_with_shared_buffer(
+    func: Callable[..., Any], name: str, size: int, *args: Any
+) -> Any:
+    """process 에서 shared memory 의 buffer 를 읽어 func(data, *args) 를 실행한다."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    return func(data, *args)
@@ -0,0 +1,60 @@
+"""NftMetadata cache decode 비용 비교.
+
+    python -m benchmarks.bench_codec
+"""
+import json
+import pathlib
+import timeit
+
+from anv import codec, models
+
+ROOT = pathlib.Path(__file__).parent.parent
+NUMBER = 20_000
+
+
+def make_nft() -> models.NftMetadata:
+    token_data = json.loads((ROOT / "alchemy_nft_metadata.json").read_text())
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0x2931b181ae9dc8f8109ec41c42480933f411ef94",
+        token_id="0x262",
+        token_type="ERC721",
+        name="SlimHood #610",
+        description="They all wear hoods, but each SlimHood is unique.",
+        image="ipfs://QmPCzRHRgCdPrhNnfG9tPvM5jp18TmoJwBrfkgcyF",
+        source_url=models.NftUrl(
+            original="https://bucket.s3.local/hash.png",
+            h250="https://bucket.s3.local/resized/hash_h250.png",
+            content_type="image/png",
+        ),
+        attributes=[
+            models.NftAttribute(trait_type=f"trait {i}", value=i) for i in range(8)
+        ],
+        token_data=token_data,
+    )
+
+
+def bench(name: str, func):
+    seconds = timeit.timeit(func, number=NUMBER)
+    print(f"{name:<32} {seconds / NUMBER * 1e6:8.2f} us/doc")
+
+
+def main():
+    nft = make_nft()
+    raw_json = nft.json().encode("utf-8")
+    raw_codec = codec.encode(nft)
+    document = nft.dict()
+    versioned_document = codec.to_document(nft)
+
+    print(f"json size  {len(raw_json)} bytes")
+    print(f"codec size {len(raw_codec)} bytes")
+    bench("parse_raw (before)", lambda: models.NftMetadata.parse_raw(raw_json))
+    bench("codec.decode (after)", lambda: codec.decode(raw_codec))
+    bench("parse_obj (before)", lambda: models.NftMetadata.parse_obj(document))
+    bench(
+        "codec.from_document (after)", lambda: codec.from_document(versioned_document)
+    )
+
+
+if __name__ == "__main__":
+    main()
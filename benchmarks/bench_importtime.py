@@ -0,0 +1,78 @@
+"""app module 의 import 시간 측정. budget 을 넘거나 늦게 import 해야 하는 package 가
+시작 시 import 되면 exit code 1.
+
+    python -m benchmarks.bench_importtime
+    IMPORT_TIME_BUDGET_MS=300 python -m benchmarks.bench_importtime
+"""
+import os
+import re
+import subprocess
+import sys
+from typing import Dict
+
+MODULE = "anv.main"
+RUNS = 5
+TOP = 15
+
+# anv.main import 시간 (ms). 가장 빠른 실행 기준
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 500))
+
+# 사용하는 backend 에 따라 처음 사용할 때 import 하는 package
+LAZY_MODULES = (
+    "boto3",
+    "mypy_boto3_s3",
+    "google.cloud.storage",
+    "pymongo",
+    "redis",
+    "magic",
+    "PIL",
+    "reportlab",
+    "svglib",
+)
+
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(module: str = MODULE) -> Dict[str, int]:
+    """새 python process 에서 module 을 import 하고 module 별 누적 import 시간 (us) 을 return"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def main() -> int:
+    runs = [measure() for _ in range(RUNS)]
+    times = min(runs, key=lambda run: run[MODULE])
+    total_ms = times[MODULE] / 1000
+
+    print(f"{'module':<48} {'cumulative':>10}")
+    for name, us in sorted(times.items(), key=lambda item: -item[1])[:TOP]:
+        print(f"{name:<48} {us / 1000:8.1f}ms")
+
+    failed = False
+    loaded = [
+        name
+        for name in times
+        if any(name == lazy or name.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+    ]
+    if loaded:
+        print(f"lazy modules imported at startup: {', '.join(sorted(loaded))}")
+        failed = True
+    print(f"{MODULE} {total_ms:.1f}ms (budget {BUDGET_MS:.0f}ms)")
+    if total_ms > BUDGET_MS:
+        print("import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
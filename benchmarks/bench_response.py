@@ -0,0 +1,90 @@
+"""nft 목록 응답 직렬화 비용 비교.
+
+    python -m benchmarks.bench_response
+"""
+import json
+import pathlib
+import timeit
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from anv import codec, models, responses
+
+ROOT = pathlib.Path(__file__).parent.parent
+NUMBER = 200
+FIXTURES = ("nft_result.json", "alchemy_get_nfts_result.json")
+
+
+def make_nfts(fixture: str) -> List[models.NftMetadata]:
+    owned_nfts = json.loads((ROOT / fixture).read_text())["ownedNfts"]
+    token_data = json.loads((ROOT / "alchemy_nft_metadata.json").read_text())[
+        "metadata"
+    ]
+    return [
+        models.NftMetadata(
+            chain="ethereum",
+            contract_address=nft["contract"]["address"],
+            token_id=nft["id"]["tokenId"],
+            token_type="ERC721",
+            name=token_data["name"],
+            description=token_data["description"],
+            image=token_data["image"],
+            source_url=models.NftUrl(
+                original="https://bucket.s3.local/hash.gif",
+                h250="https://bucket.s3.local/resized/hash_h250.gif",
+                content_type="image/gif",
+                webp=models.NftUrl(original="https://bucket.s3.local/hash.webp"),
+            ),
+            attributes=[
+                models.NftAttribute(**attribute)
+                for attribute in token_data["attributes"]
+            ],
+            token_data=token_data,
+        )
+        for nft in owned_nfts
+    ]
+
+
+def bench(name: str, func, count: int):
+    seconds = timeit.timeit(func, number=NUMBER)
+    print(
+        f"{name:<28} {seconds / NUMBER * 1e3:8.3f} ms/response"
+        f" {NUMBER * count / seconds:10.0f} nfts/s"
+    )
+
+
+def main():
+    for fixture in FIXTURES:
+        nfts = make_nfts(fixture)
+        for exclude in ({"token_data"}, set()):
+            response = models.NftResponse(items=nfts)
+            item_exclude = {"items": {"__all__": exclude}}
+            print(f"{fixture} items={len(nfts)} exclude={sorted(exclude)}")
+            bench(
+                "jsonable_encoder + json",
+                lambda: json.dumps(
+                    jsonable_encoder(response, exclude=item_exclude)
+                ).encode("utf-8"),
+                len(nfts),
+            )
+            bench(
+                "model.json (before)",
+                lambda: response.json(exclude=item_exclude).encode("utf-8"),
+                len(nfts),
+            )
+            bench(
+                "codec.to_json (orjson)",
+                lambda: codec.to_json(response, item_exclude),
+                len(nfts),
+            )
+            # 두번째 호출부터 nft 마다 보관된 fragment 를 사용
+            bench(
+                "dumps_nft_list (fragments)",
+                lambda: responses.dumps_nft_list(response, exclude),
+                len(nfts),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from anv import config, main
+
+
+def test_service_graph_is_shared(tmp_path, monkeypatch):
+    monkeypatch.setenv("NFT_METADATA_REPOSITORY", "sqlite")
+    monkeypatch.setenv("NFT_METADATA_SQLITE_PATH", str(tmp_path / "nft.db"))
+    app_config = config.AppConfig()
+
+    nft_service = app_config.get_nft_service()
+    assert app_config.get_nft_service() is nft_service
+    assert app_config.get_kas_api() is app_config.get_kas_api()
+    assert app_config.get_alchemy_api() is app_config.get_alchemy_api()
+
+    app_config.close()
+    assert app_config.get_nft_service() is not nft_service
+    app_config.close()
+
+
+def test_startup_and_shutdown(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.app_config, "startup", lambda: calls.append("startup"))
+    monkeypatch.setattr(main.app_config, "close", lambda: calls.append("close"))
+    with TestClient(main.app) as client:
+        assert client.get("/").status_code == 200
+    assert calls == ["startup", "close"]
+
+
+def test_chain_service_gets_shared_resources(tmp_path, monkeypatch):
+    # ingest, reveal 은 get_nft_service 를 거치지 않고 chain 별 service 를 만든다
+    monkeypatch.setenv("NFT_METADATA_REPOSITORY", "sqlite")
+    monkeypatch.setenv("NFT_METADATA_SQLITE_PATH", str(tmp_path / "nft.db"))
+    app_config = config.AppConfig()
+
+    nft_service = app_config.get_klaytn_nft_service()
+    assert nft_service.worker_pool is app_config.get_decode_pool()
+    assert nft_service.worker_pool is not app_config.get_worker_pool()
+    assert nft_service.refresher is app_config.get_refresher()
+    assert nft_service.freshness_policy is not None
+    assert nft_service.token_uri_cache is app_config.get_token_uri_cache()
+    assert nft_service.owner_cache is not None
+    app_config.close()
@@ -0,0 +1,127 @@
+import time
+
+from anv import cache, models, repository, service, snapshot
+
+
+def make_nft(token_id: str) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0xcontract",
+        token_id=token_id,
+        token_type="ERC721",
+        name=f"nft {token_id}",
+        token_data={"name": f"nft {token_id}"},
+        cached=False,
+    )
+
+
+def make_contract_raw(address: str) -> dict:
+    return {
+        "address": address,
+        "name": "contract",
+        "symbol": "C",
+        "logo": "",
+        "totalSupply": "0x1",
+        "status": "completed",
+        "type": "KIP-17",
+        "createdAt": 0,
+        "updatedAt": 0,
+        "deletedAt": 0,
+    }
+
+
+class FakeKasApi:
+    def __init__(self):
+        self.calls = 0
+
+    def get_nft_contract_raw(self, chain_id, contract_address, deadline=None):
+        self.calls += 1
+        return make_contract_raw(contract_address)
+
+
+def test_lru_cache_eviction_and_ttl(monkeypatch):
+    lru = cache.LRUCache(max_size=2, ttl=10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)  # 가장 오래 사용하지 않은 b 제거
+    assert lru.get("b") is None
+    assert [key for key, _ in lru.items()] == ["c", "a"]
+
+    now = time.time() + 11
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    assert lru.get("a") is None
+    assert lru.items() == []
+
+
+def test_cached_metadata_repository(tmp_path):
+    repo = repository.CachedMetadataRepository(
+        repository.SqliteRepository(tmp_path / "nft.db"), cache.LRUCache()
+    )
+    repo.set_NFT_metadata(make_nft("1"))
+
+    first = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert first.token_data is None
+    assert first.cached
+    assert repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1") is first
+
+    updated = make_nft("1")
+    updated.name = "updated"
+    repo.set_NFT_metadata(updated)
+    result = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert result.name == "updated"
+
+
+def test_snapshot_round_trip(tmp_path):
+    metadata_cache = cache.LRUCache()
+    contract_cache = cache.LRUCache()
+    for token_id in ("1", "2", "3"):
+        metadata_cache.set(
+            cache.metadata_key("ethereum", "0xcontract", token_id), make_nft(token_id)
+        )
+    contract_cache.set(
+        cache.contract_key("klaytn", "0xkip17"),
+        models.KlaytnNftContract(
+            **{
+                "address": "0xkip17",
+                "name": "contract",
+                "symbol": "C",
+                "logo": "",
+                "total_supply": "0x1",
+                "status": "completed",
+                "type": "KIP-17",
+                "created_at": 0,
+                "updated_at": 0,
+                "deleted_at": 0,
+                "cached": True,
+            }
+        ),
+    )
+    path = tmp_path / "snapshot.json"
+    assert snapshot.save_snapshot(path, metadata_cache, contract_cache, limit=2) == 3
+
+    new_metadata_cache = cache.LRUCache()
+    new_contract_cache = cache.LRUCache()
+    assert snapshot.load_snapshot(path, new_metadata_cache, new_contract_cache) == 3
+    # 최근에 사용한 항목 2개, 순서 유지. token_data 는 저장하지 않음
+    assert [nft.token_id for _, nft in new_metadata_cache.items()] == ["3", "2"]
+    assert new_metadata_cache.items()[0][1].token_data is None
+    assert (
+        new_contract_cache.get(cache.contract_key("klaytn", "0xKIP17")).name
+        == "contract"
+    )
+
+    assert snapshot.load_snapshot(path, cache.LRUCache(), None, max_age=-1) == 0
+    assert snapshot.load_snapshot(tmp_path / "none.json", cache.LRUCache(), None) == 0
+
+
+def test_klaytn_contract_cache():
+    kas_api = FakeKasApi()
+    nft_service = service.KlaytnNFTService(
+        repository.DBRepository(), None, kas_api, contract_cache=cache.LRUCache()
+    )
+    first = nft_service._get_nft_contract("0xkip17")
+    second = nft_service._get_nft_contract("0xkip17")
+    assert kas_api.calls == 1
+    assert not first.cached
+    assert second.cached and second.name == first.name
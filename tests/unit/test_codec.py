@@ -0,0 +1,56 @@
+import pytest
+
+from anv import codec, models
+
+
+def make_nft() -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0xcontract",
+        token_id="1",
+        token_type="ERC721",
+        name="nft 1",
+        source_url=models.NftUrl(
+            original="https://bucket/1.png",
+            webp=models.NftUrl(original="https://bucket/resized/1.webp"),
+        ),
+        attributes=[models.NftAttribute(trait_type="type", value="Male 3")],
+        token_data={"name": "nft 1"},
+    )
+
+
+def test_encode_decode():
+    nft = make_nft()
+    raw = codec.encode(nft)
+    assert raw[0] == codec.SCHEMA_VERSION
+
+    result = codec.decode(raw)
+    assert result == nft
+    assert isinstance(result.source_url, models.NftUrl)
+    assert isinstance(result.source_url.webp, models.NftUrl)
+    assert isinstance(result.attributes[0], models.NftAttribute)
+    assert result.description is None
+
+
+def test_decode_legacy_json():
+    nft = make_nft()
+    assert codec.decode(nft.json().encode("utf-8")) == nft
+
+
+def test_decode_unknown_version():
+    with pytest.raises(codec.CodecError):
+        codec.decode(b"\x09{}")
+
+
+def test_document_without_version_is_validated():
+    document = make_nft().dict()
+    document["attributes"] = "invalid"
+    with pytest.raises(ValueError):
+        codec.from_document(document)
+
+
+def test_to_document_excludes_none():
+    document = codec.to_document(make_nft())
+    assert "description" not in document
+    assert document[codec.VERSION_KEY] == codec.SCHEMA_VERSION
+    assert codec.from_document(document) == make_nft()
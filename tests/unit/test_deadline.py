@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Optional
+
+import pydantic
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from anv import main, models, service, timeouts
+
+
+class FakeOwnedNft(pydantic.BaseModel):
+    contract_address: str
+    token_id: str
+
+
+class FakeOwnedNftResult(pydantic.BaseModel):
+    cursor: Optional[str]
+    owned_nfts: list
+
+
+class SlowTokenNFTService(service.NFTServiceBase):
+    """token_id 가 'slow' 인 nft 는 release 될 때까지 조회가 끝나지 않는 service"""
+
+    def __init__(self, release: threading.Event):
+        self.chain = models.Chain.ETHEREUM
+        self.release = release
+        self.deadlines = []
+
+    def _get_owned_nfts(self, owner, cursor, deadline=None):
+        return FakeOwnedNftResult(
+            cursor=None,
+            owned_nfts=[
+                FakeOwnedNft(contract_address="0xcontract", token_id="fast"),
+                FakeOwnedNft(contract_address="0xcontract", token_id="slow"),
+            ],
+        )
+
+    def _get_token_key(self, nft):
+        return nft.contract_address, nft.token_id
+
+    def _get_cached_nft_metadata(self, nft):
+        return None
+
+    def _get_nft_metadata_from_api(self, nft, deadline=None, use_cache=False):
+        self.deadlines.append(deadline)
+        if nft.token_id == "slow":
+            self.release.wait()
+        return models.NftMetadata(
+            chain=self.chain.value,
+            contract_address=nft.contract_address,
+            token_id=nft.token_id,
+            token_type="ERC721",
+            name=nft.token_id,
+        )
+
+
+def test_deadline_timeout_is_capped_by_remaining():
+    deadline = timeouts.Deadline(0.5)
+    assert deadline.timeout(10) <= 0.5
+    assert deadline.timeout(0.1) == 0.1
+    assert timeouts.get_timeout(None, 3) == 3
+
+
+def test_expired_deadline_raises():
+    deadline = timeouts.Deadline(0)
+    assert deadline.expired
+    with pytest.raises(timeouts.DeadlineExceeded):
+        deadline.timeout()
+    with pytest.raises(timeouts.DeadlineExceeded):
+        deadline.check()
+
+
+def test_get_nfts_by_owner_returns_pending_after_deadline():
+    release = threading.Event()
+    nft_service = SlowTokenNFTService(release)
+    try:
+        start = time.monotonic()
+        result = nft_service.get_NFTs_by_owner(
+            "0xowner", deadline=timeouts.Deadline(0.3)
+        )
+        assert time.monotonic() - start < 2
+    finally:
+        release.set()
+
+    assert [nft.token_id for nft in result.nfts] == ["fast"]
+    assert result.pending == [
+        models.PendingNft(
+            chain="ethereum", contract_address="0xcontract", token_id="slow"
+        )
+    ]
+    # pending nft 가 background 에서 끝날 수 있도록 worker 에는 더 늦은 deadline 이 전달됨
+    assert all(d.remaining() > 0.3 for d in nft_service.deadlines)
+
+
+class TimeoutNFTService:
+    def __init__(self, error: Exception):
+        self.error = error
+
+    def get_NFTs_by_owner(self, **kwargs):
+        raise self.error
+
+
+@pytest.mark.parametrize(
+    "error",
+    [timeouts.DeadlineExceeded("deadline"), requests.exceptions.Timeout("owner")],
+)
+def test_owner_listing_timeout_is_504(error):
+    main.app.dependency_overrides[main.get_nft_service] = lambda: TimeoutNFTService(
+        error
+    )
+    main.app.dependency_overrides[main.get_nft_src_repository] = lambda: None
+    try:
+        client = TestClient(main.app)
+        assert client.get("/v1/nfts/klaytn?owner=0xowner").status_code == 504
+    finally:
+        main.app.dependency_overrides.clear()
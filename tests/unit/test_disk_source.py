@@ -0,0 +1,156 @@
+import io
+import os
+
+import anyio
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from anv import main, models, repository, responses
+
+with io.BytesIO() as png_buffer:
+    Image.new("RGB", (4, 4)).save(png_buffer, format="PNG")
+    PNG = png_buffer.getvalue()
+
+
+class FakeDiskSourceRepository(repository.DiskNFSSourceRepository):
+    def __init__(self, repo_dir, data=PNG, max_bytes=1024):
+        super().__init__(
+            repository.DBRepository(), None, repo_dir=repo_dir, max_bytes=max_bytes
+        )
+        self.data = data
+
+    def _get_binary_from_uri(self, uri, buffer):
+        buffer.write(self.data)
+        return buffer
+
+
+def make_nft(image: str) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0xcontract",
+        token_id="1",
+        token_type="ERC721",
+        name="nft 1",
+        image=image,
+    )
+
+
+def test_cache_nft_source(tmp_path):
+    repo = FakeDiskSourceRepository(tmp_path)
+    nft = make_nft("https://example.com/1.png")
+
+    repo.cache_nft_source(nft)
+
+    uri_hash = repository.get_sha256("https://example.com/1.png")
+    assert nft.source_url.original == f"{repository.SOURCE_BASE_URL}{uri_hash}"
+    assert nft.content_type == "image/png"
+    source = repo.get_source(uri_hash)
+    assert source.path.read_bytes() == PNG
+
+
+def test_same_content_stored_once(tmp_path):
+    repo = FakeDiskSourceRepository(tmp_path)
+    repo._cache_uri_source("https://example.com/1.png")
+    repo._cache_uri_source("ipfs://QmHash/1.png")
+    assert len(list(tmp_path.glob("objects/*/*/*"))) == 1
+    assert len(list(tmp_path.glob("refs/*/*.json"))) == 2
+
+
+def test_evict_least_recently_used(tmp_path):
+    repo = FakeDiskSourceRepository(tmp_path, max_bytes=250)
+    hashes = []
+    for i in range(3):
+        uri_hash = repository.get_sha256(str(i))
+        source = repo.store_source(uri_hash, bytes([i]) * 100, "image/png")
+        os.utime(source.path, (i, i))
+        hashes.append(uri_hash)
+
+    assert repo.get_source(hashes[0]) is None
+    assert repo.get_source(hashes[1]) is not None
+    assert repo.get_source(hashes[2]) is not None
+
+
+def test_get_source_invalid_hash(tmp_path):
+    repo = FakeDiskSourceRepository(tmp_path)
+    assert repo.get_source("../../etc/passwd") is None
+
+
+def test_get_source_route(tmp_path, monkeypatch):
+    repo = FakeDiskSourceRepository(tmp_path)
+    monkeypatch.setattr(main.app_config, "get_nft_src_repository", lambda: repo)
+    uri_hash = repository.get_sha256("https://example.com/1.png")
+    repo.store_source(uri_hash, PNG, "image/png")
+
+    client = TestClient(main.app)
+    response = client.get(f"/v1/source/{uri_hash}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == PNG
+
+    assert client.get(f"/v1/source/{'0' * 64}").status_code == 404
+
+
+def test_get_source_range_and_etag(tmp_path, monkeypatch):
+    repo = FakeDiskSourceRepository(tmp_path)
+    monkeypatch.setattr(main.app_config, "get_nft_src_repository", lambda: repo)
+    uri_hash = repository.get_sha256("https://example.com/1.mp4")
+    data = bytes(range(100))
+    source = repo.store_source(uri_hash, data, "video/mp4")
+    client = TestClient(main.app)
+
+    response = client.get(f"/v1/source/{uri_hash}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == data[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+    assert "immutable" in response.headers["cache-control"]
+
+    response = client.get(f"/v1/source/{uri_hash}", headers={"Range": "bytes=-5"})
+    assert response.content == data[-5:]
+
+    response = client.get(f"/v1/source/{uri_hash}", headers={"Range": "bytes=200-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+    etag = f'"{source.digest}"'
+    response = client.get(f"/v1/source/{uri_hash}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_disk_source_is_not_streamed_through_generator(tmp_path, monkeypatch):
+    repo = FakeDiskSourceRepository(tmp_path, max_bytes=1024 * 1024)
+    monkeypatch.setattr(main.app_config, "get_nft_src_repository", lambda: repo)
+
+    def fail(*args):
+        raise AssertionError("disk source read through generator")
+
+    monkeypatch.setattr(repo, "read_source", fail)
+    uri_hash = repository.get_sha256("https://example.com/2.mp4")
+    data = os.urandom(200 * 1024)
+    repo.store_source(uri_hash, data, "video/mp4")
+    client = TestClient(main.app)
+
+    response = client.get(f"/v1/source/{uri_hash}")
+    assert response.status_code == 200
+    assert response.content == data
+    response = client.get(
+        f"/v1/source/{uri_hash}", headers={"Range": "bytes=70000-140000"}
+    )
+    assert response.status_code == 206
+    assert response.content == data[70000:140001]
+
+
+def test_file_range_response_zerocopy(tmp_path):
+    path = tmp_path / "source"
+    path.write_bytes(bytes(range(100)))
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "extensions": {"http.response.zerocopy": {}}}
+    response = responses.FileRangeResponse(path, 10, 19, status_code=206)
+    anyio.run(response, scope, None, send)
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == "http.response.zerocopy"
+    assert (messages[1]["offset"], messages[1]["count"]) == (10, 10)
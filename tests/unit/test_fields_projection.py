@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from anv import cache, main, models, repository, service
+
+
+def make_nft(token_id: str) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0xcontract",
+        token_id=token_id,
+        token_type="ERC721",
+        name=f"nft {token_id}",
+        source_url=models.NftUrl(original="https://bucket/1.png"),
+    )
+
+
+class FakeNFTService:
+    def get_NFTs_by_owner(self, chain, owner, cursor, resync, deadline, incremental):
+        return service.OwnedNftResult(cursor=None, nfts=[make_nft("1")])
+
+    def load_token_data(self, nfts):
+        return [nft.copy(update={"token_data": {"name": nft.name}}) for nft in nfts]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.app_config, "get_nft_service", FakeNFTService)
+    monkeypatch.setattr(main.app_config, "get_nft_src_repository", lambda: None)
+    return TestClient(main.app)
+
+
+def test_list_excludes_token_data(client):
+    response = client.get("/v1/nfts/ethereum", params={"owner": "0xowner"})
+    assert response.status_code == 200
+    item = response.json()["items"][0]
+    assert item["name"] == "nft 1"
+    assert "token_data" not in item
+
+
+def test_list_fields_projection(client):
+    response = client.get(
+        "/v1/nfts/ethereum", params={"owner": "0xowner", "fields": "name,token_data"}
+    )
+    item = response.json()["items"][0]
+    assert set(item) == {"chain", "contract_address", "token_id", "name", "token_data"}
+    assert item["token_data"] == {"name": "nft 1"}
+
+
+def test_unknown_fields(client):
+    response = client.get(
+        "/v1/nfts/ethereum", params={"owner": "0xowner", "fields": "password"}
+    )
+    assert response.status_code == 400
+
+
+def test_load_token_data_does_not_change_cached_nft(tmp_path):
+    repo = repository.CachedMetadataRepository(
+        repository.SqliteRepository(tmp_path / "nft.db"), cache.LRUCache()
+    )
+    nft = make_nft("1")
+    nft.chain = "klaytn"
+    nft.token_data = {"name": "nft 1"}
+    repo.set_NFT_metadata(nft)
+    nft_service = service.KlaytnNFTService(repo, None, None)
+
+    cached = repo.get_NFT_metadata(models.Chain.KLAYTN, "0xcontract", "1")
+    loaded = nft_service.load_token_data(cached)
+    assert loaded.token_data == {"name": "nft 1"}
+    assert cached.token_data is None
+    assert repo.get_NFT_metadata(models.Chain.KLAYTN, "0xcontract", "1") is cached
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from anv import freshness, models, refresh, repository, service
+from anv.api import kas
+
+
+def make_nft(name: str, cached_at=None) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="klaytn",
+        contract_address="0xcontract",
+        token_id="0x1",
+        token_type="KIP-17",
+        name=name,
+        cached_at=cached_at,
+    )
+
+
+class FakeNFTService(service.KlaytnNFTService):
+    def __init__(self, repo):
+        super().__init__(repo, None, None)
+        self.name = "revealed"
+        self.fetched = 0
+
+    def _get_nft_metadata_from_api(self, nft, deadline=None, use_cache=False):
+        self.fetched += 1
+        metadata = make_nft(self.name)
+        self.repo.set_NFT_metadata(metadata)
+        return metadata
+
+
+def test_freshness_policy():
+    policy = freshness.FreshnessPolicy(fresh_ttl=10, expire_ttl=100)
+    now = time.time()
+    assert policy.check(make_nft("a", now - 5), now) == freshness.Freshness.FRESH
+    assert policy.check(make_nft("a", now - 50), now) == freshness.Freshness.STALE
+    assert policy.check(make_nft("a", now - 500), now) == freshness.Freshness.EXPIRED
+    # 저장 시각이 없는 이전 데이터는 한꺼번에 갱신하지 않음
+    assert policy.check(make_nft("a"), now) == freshness.Freshness.FRESH
+    assert (
+        freshness.FreshnessPolicy(fresh_ttl=10).check(make_nft("a", 0), now)
+        == freshness.Freshness.STALE
+    )
+
+
+def test_repository_keeps_cached_at(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    repo.set_NFT_metadata(make_nft("placeholder"))
+    cached = repo.get_NFT_metadata(models.Chain.KLAYTN, "0xcontract", "0x1")
+    assert cached.cached_at is not None
+
+    # 다시 저장해도 api 로 조회한 시각은 유지
+    cached.cached_at -= 100
+    repo.set_NFT_metadata(cached)
+    again = repo.get_NFT_metadata(models.Chain.KLAYTN, "0xcontract", "0x1")
+    assert again.cached_at == cached.cached_at
+
+
+def test_stale_metadata_is_served_and_refreshed(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    repo.set_NFT_metadata(make_nft("placeholder", int(time.time()) - 100))
+    nft_service = FakeNFTService(repo)
+    nft_service.freshness_policy = freshness.FreshnessPolicy(fresh_ttl=10)
+    nft_service.refresher = refresh.BackgroundRefresher()
+    owned_nft = kas.KlaytnOwnedNft(contract_address="0xcontract", token_id="0x1")
+
+    assert nft_service._get_nft_metadata(owned_nft).name == "placeholder"
+    deadline = time.monotonic() + 5
+    while len(nft_service.refresher) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert nft_service.fetched == 1
+
+    # 갱신된 데이터는 fresh
+    assert nft_service._get_nft_metadata(owned_nft).name == "revealed"
+    assert nft_service.fetched == 1
+    nft_service.refresher.close()
+
+
+def test_expired_metadata_blocks_on_api(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    repo.set_NFT_metadata(make_nft("placeholder", int(time.time()) - 1000))
+    nft_service = FakeNFTService(repo)
+    nft_service.freshness_policy = freshness.FreshnessPolicy(
+        fresh_ttl=10, expire_ttl=100
+    )
+    owned_nft = kas.KlaytnOwnedNft(contract_address="0xcontract", token_id="0x1")
+
+    assert nft_service._get_nft_metadata(owned_nft).name == "revealed"
+    assert nft_service.fetched == 1
+
+
+def test_refresher_close_cancels_pending_tasks():
+    started, release = threading.Event(), threading.Event()
+    refresher = refresh.BackgroundRefresher(workers=1)
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    running = refresher.submit("a", block)
+    assert started.wait(5)
+    pending = refresher.submit("b", lambda: None)
+    refresher.close()
+    release.set()
+
+    assert pending.cancelled()
+    assert running.result(5) is None
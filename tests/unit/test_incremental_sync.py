@@ -0,0 +1,120 @@
+from anv import models, repository, service
+from anv.api import kas
+
+OWNER = "0xOwner"
+
+
+def make_owned_nft(token_id: str) -> kas.KlaytnOwnedNft:
+    return kas.KlaytnOwnedNft(
+        contract_address="0xContract",
+        token_id=token_id,
+        token_uri=f"https://token.uri/{token_id}",
+    )
+
+
+def make_history(token_id: str) -> kas.KlaytnTransferHistory:
+    return kas.KlaytnTransferHistory(
+        transfer_type=kas.TokenKind.NFT,
+        contract=kas.KlaytnContract(address="0xcontract", name="C", symbol="C"),
+        from_address="0xfrom",
+        to_address=OWNER.lower(),
+        token_id=token_id,
+        timestamp=1,
+    )
+
+
+class FakeKasApi(kas.KasApi):
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+        self.transfers = []
+        self.history_pages = 1
+        self.history_requests = []
+
+    def get_tokens_by_owner(self, chain_id, owner, kind, cursor=None, deadline=None):
+        next_cursor, token_ids = self.pages[cursor]
+        return kas.KlaytnOwndNftResult(
+            cursor=next_cursor,
+            owned_nfts=[make_owned_nft(token_id) for token_id in token_ids],
+        )
+
+    def get_nft_transfer_history_by_owner(
+        self, chain_id, owner, since=None, cursor=None, deadline=None
+    ):
+        self.history_requests.append(since)
+        page = int(cursor or 0) + 1
+        return kas.KlaytnTransferHistoryResult(
+            cursor=str(page) if page < self.history_pages else None,
+            transfer_history=[make_history(token_id) for token_id in self.transfers],
+        )
+
+
+class FakeNFTService(service.KlaytnNFTService):
+    def __init__(self, repo, pages):
+        super().__init__(repo, None, FakeKasApi(pages))
+        self.fetched = []
+
+    def _get_nft_metadata_from_api(self, nft, deadline=None, use_cache=False):
+        self.fetched.append(nft.token_id)
+        metadata = models.NftMetadata(
+            chain=self.chain.value,
+            contract_address=nft.contract_address,
+            token_id=nft.token_id,
+            token_type="KIP-17",
+            name=nft.token_id,
+        )
+        self.repo.set_NFT_metadata(metadata)
+        return metadata
+
+
+def test_incremental_sync_fetches_only_transferred_tokens(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1", "0x2", "0x3"])})
+
+    # 지난 sync 기록이 없으면 전체 resync
+    result = nft_service.get_NFTs_by_owner(OWNER, incremental=True)
+    assert sorted(nft_service.fetched) == ["0x1", "0x2", "0x3"]
+    assert len(result.nfts) == 3
+    state = repo.get_sync_state(models.Chain.KLAYTN, OWNER)
+    assert state.synced_at is not None and state.started_at is None
+
+    nft_service.fetched.clear()
+    nft_service.kas_api.transfers = ["0x2"]
+    result = nft_service.get_NFTs_by_owner(OWNER, incremental=True)
+    assert nft_service.fetched == ["0x2"]
+    assert len(result.nfts) == 3
+    assert nft_service.kas_api.history_requests == [state.synced_at]
+
+
+def test_incremental_sync_marks_after_last_page(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(
+        repo, {None: ("page2", ["0x1"]), "page2": (None, ["0x2"])}
+    )
+
+    nft_service.get_NFTs_by_owner(OWNER, incremental=True)
+    state = repo.get_sync_state(models.Chain.KLAYTN, OWNER)
+    assert state.synced_at is None and state.started_at is not None
+
+    nft_service.get_NFTs_by_owner(OWNER, cursor="page2", incremental=True)
+    state = repo.get_sync_state(models.Chain.KLAYTN, OWNER)
+    assert state.synced_at is not None and state.started_at is None
+
+    # 첫 page 없이 조회한 경우 sync 완료로 기록하지 않음
+    synced_at = state.synced_at
+    repo.set_sync_state(state.copy(update={"synced_at": synced_at - 10}))
+    nft_service.get_NFTs_by_owner(OWNER, cursor="page2", incremental=True)
+    state = repo.get_sync_state(models.Chain.KLAYTN, OWNER)
+    assert state.synced_at == synced_at - 10
+
+
+def test_incremental_sync_too_many_transfers_resyncs_all(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1", "0x2"])})
+    nft_service.get_NFTs_by_owner(OWNER, incremental=True)
+
+    nft_service.fetched.clear()
+    nft_service.kas_api.transfers = ["0x1"]
+    nft_service.kas_api.history_pages = service.TRANSFER_HISTORY_MAX_PAGES + 1
+    nft_service.get_NFTs_by_owner(OWNER, incremental=True)
+    assert sorted(nft_service.fetched) == ["0x1", "0x2"]
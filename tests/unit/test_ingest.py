@@ -0,0 +1,88 @@
+import json
+import pathlib
+
+from anv import ingest, models, repository, service
+from anv.api import kas
+
+ROOT = pathlib.Path(__file__).parent.parent.parent
+
+
+class FakeKasApi(kas.KasApi):
+    def __init__(self):
+        super().__init__()
+        items = json.loads((ROOT / "kas_nft_list_by_contract_addr.json").read_text())[
+            "items"
+        ][:5]
+        self.pages = {
+            None: {"items": items[:3], "cursor": "page2"},
+            "page2": {"items": items[3:], "cursor": ""},
+        }
+        self.requests = []
+
+    def get_nft_list(
+        self, chain_id, nft_contract, size=None, cursor=None, deadline=None
+    ):
+        self.requests.append(cursor)
+        return self.pages[cursor]
+
+
+class FakeNFTService(service.KlaytnNFTService):
+    def __init__(self, repo, broken_token_id=None):
+        super().__init__(repo, None, FakeKasApi())
+        self.broken_token_id = broken_token_id
+
+    def _get_nft_contract(self, contract_address, deadline=None):
+        return models.KlaytnNftContract(
+            address=contract_address,
+            name="contract",
+            symbol="C",
+            logo="",
+            total_supply="0x5",
+            status="completed",
+            type="KIP-17",
+            created_at=0,
+            updated_at=0,
+            deleted_at=0,
+            cached=False,
+        )
+
+    def _get_token_data_by_uri(self, uri, deadline=None, use_cache=False):
+        if self.broken_token_id and self.broken_token_id in uri:
+            raise service.NFTServiceTokenDataError(uri)
+        return {"name": uri.rsplit("/", 1)[-1], "image": "ipfs://image"}
+
+
+def test_ingest_collection(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, broken_token_id="info8965")
+    result = ingest.CollectionIngester(nft_service, rate=0).ingest("0xcontract")
+
+    assert nft_service.kas_api.requests == [None, "page2"]
+    assert (result.pages, result.tokens, result.saved, result.failed) == (2, 5, 4, 1)
+    assert result.cursor is None
+    assert (
+        len(repo.get_NFT_metadata_by_contract(models.Chain.KLAYTN, "0xcontract")) == 4
+    )
+
+    # 두번째 실행은 cache 된 token 을 건너뜀
+    nft_service.broken_token_id = None
+    result = ingest.CollectionIngester(nft_service, rate=0).ingest("0xcontract")
+    assert (result.skipped, result.saved) == (4, 1)
+
+
+def test_ingest_limit_keeps_page_cursor(tmp_path):
+    nft_service = FakeNFTService(repository.SqliteRepository(tmp_path / "nft.db"))
+    ingester = ingest.CollectionIngester(nft_service, rate=0)
+
+    result = ingester.ingest("0xcontract", limit=4)
+    assert (result.tokens, result.saved, result.cursor) == (4, 4, "page2")
+
+    result = ingester.ingest("0xcontract", cursor=result.cursor)
+    assert (result.tokens, result.skipped, result.saved) == (2, 1, 1)
+
+
+def test_rate_limiter_burst():
+    limiter = ingest.RateLimiter(rate=1000, burst=3)
+    for _ in range(3):
+        limiter.acquire()
+    assert limiter._tokens < 1
@@ -0,0 +1,13 @@
+from benchmarks import bench_importtime
+
+
+def test_backend_modules_not_imported_at_startup():
+    times = bench_importtime.measure()
+    assert bench_importtime.MODULE in times
+    loaded = [
+        name
+        for name in times
+        for lazy in bench_importtime.LAZY_MODULES
+        if name == lazy or name.startswith(f"{lazy}.")
+    ]
+    assert loaded == []
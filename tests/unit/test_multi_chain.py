@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from anv import main, models, service, timeouts
+
+
+def make_nft(chain: models.Chain, token_id: str) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain=chain.value,
+        contract_address="0xcontract",
+        token_id=token_id,
+        token_type="ERC721",
+        name=f"nft {token_id}",
+    )
+
+
+class FakeChainService:
+    def __init__(self, chain: models.Chain, next_cursor=None, error=None, wait=None):
+        self.chain = chain
+        self.next_cursor = next_cursor
+        self.error = error
+        self.wait = wait
+        self.cursors = []
+
+    def get_NFTs_by_owner(
+        self, owner, cursor=None, resync=False, deadline=None, incremental=False
+    ):
+        self.cursors.append(cursor)
+        if self.wait:
+            self.wait.wait()
+        if self.error:
+            raise self.error
+        return service.OwnedNftResult(
+            cursor=self.next_cursor, nfts=[make_nft(self.chain, "1")]
+        )
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def make_nft_service(**overrides) -> service.NFTService:
+    chains = {chain.value: FakeChainService(chain) for chain in models.Chain}
+    chains.update(overrides)
+    return service.NFTService(**chains)
+
+
+def test_multi_chain_merges_results_and_cursor(release):
+    ethereum = FakeChainService(models.Chain.ETHEREUM, next_cursor="eth-page2")
+    polygon = FakeChainService(models.Chain.POLYGON)
+    klaytn = FakeChainService(models.Chain.KLAYTN, wait=release)
+    binance = FakeChainService(models.Chain.BINANCE, error=RuntimeError("429"))
+    nft_service = make_nft_service(
+        ethereum=ethereum, polygon=polygon, klaytn=klaytn, binance=binance
+    )
+
+    result = nft_service.get_NFTs_by_owner_multi_chain(
+        "0xowner", deadline=timeouts.Deadline(0.5)
+    )
+
+    assert [nft.chain for nft in result.nfts] == ["ethereum", "polygon"]
+    assert result.pending_chains == [models.Chain.KLAYTN]
+    assert result.failed_chains == [models.Chain.BINANCE]
+    assert service.decode_multi_chain_cursor(result.cursor) == {
+        models.Chain.ETHEREUM: "eth-page2",
+        models.Chain.KLAYTN: None,
+    }
+
+
+def test_multi_chain_next_page_uses_cursor_chains():
+    ethereum = FakeChainService(models.Chain.ETHEREUM)
+    polygon = FakeChainService(models.Chain.POLYGON)
+    nft_service = make_nft_service(ethereum=ethereum, polygon=polygon)
+    cursor = service.encode_multi_chain_cursor({models.Chain.ETHEREUM: "eth-page2"})
+
+    result = nft_service.get_NFTs_by_owner_multi_chain("0xowner", cursor=cursor)
+
+    assert ethereum.cursors == ["eth-page2"]
+    assert polygon.cursors == []
+    assert result.cursor is None
+
+
+def test_decode_invalid_multi_chain_cursor():
+    with pytest.raises(service.NFTServiceError):
+        service.decode_multi_chain_cursor("not a cursor")
+
+
+class RunningLoopChainService(FakeChainService):
+    """event loop thread 에서 호출되면 실패"""
+
+    def get_NFTs_by_owner(self, *args, **kwargs):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return super().get_NFTs_by_owner(*args, **kwargs)
+
+
+class NoopSourceRepository:
+    def cache_nft_source(self, nft):
+        pass
+
+
+def test_multi_chain_endpoint_runs_in_threadpool():
+    # blocking service 조회가 event loop 를 막지 않도록 threadpool 에서 실행
+    nft_service = make_nft_service(
+        **{chain.value: RunningLoopChainService(chain) for chain in models.Chain}
+    )
+    main.app.dependency_overrides[main.get_nft_service] = lambda: nft_service
+    main.app.dependency_overrides[main.get_nft_src_repository] = NoopSourceRepository
+    try:
+        # startup 의 AppConfig 를 만들지 않도록 context manager 없이 사용
+        client = TestClient(main.app)
+        for url in ("/v1/nfts?owner=0xowner", "/v1/nfts/klaytn?owner=0xowner"):
+            assert client.get(url).status_code == 200
+    finally:
+        main.app.dependency_overrides.clear()
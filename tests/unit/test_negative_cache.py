@@ -0,0 +1,121 @@
+import pytest
+import requests
+
+from anv import backoff, models, service
+
+
+class FakeOwnedNft:
+    def __init__(self, token_id: str):
+        self.contract_address = "0xContract"
+        self.token_id = token_id
+
+
+class FakeNFTService(service.NFTServiceBase):
+    token_errors = (service.NFTServiceTokenDataError,)
+    chain = models.Chain.ETHEREUM
+
+    def __init__(self, negative_cache):
+        self.negative_cache = negative_cache
+        self.calls = []
+
+    def _get_owned_nfts(self, owner, cursor, deadline=None):
+        raise NotImplementedError
+
+    def _get_token_key(self, nft):
+        return nft.contract_address, nft.token_id
+
+    def _get_cached_nft_metadata(self, nft):
+        return None
+
+    def _get_nft_metadata_from_api(self, nft, deadline=None, use_cache=False):
+        self.calls.append(nft.token_id)
+        if nft.token_id == "broken":
+            raise service.NFTServiceTokenDataError("broken token uri")
+        return models.NftMetadata(
+            chain=self.chain.value,
+            contract_address=nft.contract_address,
+            token_id=nft.token_id,
+            token_type="ERC721",
+        )
+
+
+def test_negative_cache_backoff(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(backoff.time, "time", lambda: now)
+    cache = backoff.NegativeCache(base_delay=10, max_delay=30)
+
+    assert cache.record_failure("key") == now + 10
+    assert cache.record_failure("key") == now + 20
+    assert cache.record_failure("key") == now + 30
+    assert cache.is_blocked("key")
+
+    now += 31
+    assert not cache.is_blocked("key")
+
+    cache.record_success("key")
+    assert cache.get_retry_at("key") is None
+
+
+def test_negative_cache_max_size():
+    cache = backoff.NegativeCache(max_size=2)
+    for key in ("a", "b", "c"):
+        cache.record_failure(key)
+    assert len(cache) == 2
+    assert not cache.is_blocked("a")
+
+
+def test_failed_token_is_skipped_until_retry():
+    cache = backoff.NegativeCache()
+    nft_service = FakeNFTService(cache)
+    broken = FakeOwnedNft("broken")
+
+    with pytest.raises(service.NFTServiceTokenDataError):
+        nft_service._get_nft_metadata(broken)
+    with pytest.raises(service.NFTServiceNegativeCacheError):
+        nft_service._get_nft_metadata(broken)
+
+    assert nft_service.calls == ["broken"]
+    assert cache.is_blocked(backoff.token_key("ethereum", "0xcontract", "broken"))
+
+
+def test_token_uri_failure_is_recorded():
+    cache = backoff.NegativeCache()
+    nft_service = FakeNFTService(cache)
+    uri = "http://127.0.0.1:1/token.json"
+
+    with pytest.raises(service.NFTServiceTokenDataError):
+        nft_service._get_token_data_by_uri(uri)
+
+    assert cache.is_blocked(backoff.uri_key(uri))
+    with pytest.raises(service.NFTServiceNegativeCacheError):
+        nft_service._get_token_data_by_uri(uri)
+
+
+def test_token_uri_timeout_is_not_recorded(monkeypatch):
+    cache = backoff.NegativeCache()
+    nft_service = FakeNFTService(cache)
+    uri = "http://example.com/token.json"
+
+    def timeout(*args, **kwargs):
+        raise requests.exceptions.ConnectTimeout("slow")
+
+    monkeypatch.setattr(service.requests, "get", timeout)
+    with pytest.raises(service.NFTServiceTimeoutError):
+        nft_service._get_token_data_by_uri(uri)
+    assert not cache.is_blocked(backoff.uri_key(uri))
+
+
+def test_blocked_token_uri_does_not_extend_token_backoff():
+    cache = backoff.NegativeCache()
+    nft_service = FakeNFTService(cache)
+    blocked = FakeOwnedNft("blocked")
+
+    def blocked_uri(nft, deadline=None, use_cache=False):
+        raise service.NFTServiceNegativeCacheError("http://example.com/blocked.json")
+
+    nft_service._get_nft_metadata_from_api = blocked_uri
+    for _ in range(3):
+        with pytest.raises(service.NFTServiceNegativeCacheError):
+            nft_service._fetch_nft_metadata(blocked)
+    key = backoff.token_key("ethereum", "0xcontract", "blocked")
+    assert cache.get_retry_at(key) is None
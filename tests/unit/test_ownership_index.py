@@ -0,0 +1,178 @@
+import threading
+import time
+
+from anv import cache, models, refresh, repository, service
+from anv.api import kas
+
+OWNER = "0xOwner"
+
+
+class FakeKasApi(kas.KasApi):
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+        self.requests = []
+
+    def get_tokens_by_owner(self, chain_id, owner, kind, cursor=None, deadline=None):
+        self.requests.append(cursor)
+        next_cursor, token_ids = self.pages[cursor]
+        return kas.KlaytnOwndNftResult(
+            cursor=next_cursor,
+            owned_nfts=[
+                kas.KlaytnOwnedNft(contract_address="0xcontract", token_id=token_id)
+                for token_id in token_ids
+            ],
+        )
+
+
+class FakeNFTService(service.KlaytnNFTService):
+    def __init__(self, repo, pages):
+        super().__init__(repo, None, FakeKasApi(pages))
+
+    def _get_nft_metadata_from_api(self, nft, deadline=None, use_cache=False):
+        metadata = models.NftMetadata(
+            chain=self.chain.value,
+            contract_address=nft.contract_address,
+            token_id=nft.token_id,
+            token_type="KIP-17",
+            name=nft.token_id,
+        )
+        self.repo.set_NFT_metadata(metadata)
+        return metadata
+
+
+def test_ownership_index_serves_listed_wallet(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(
+        repo, {None: ("page2", ["0x1", "0x2"]), "page2": (None, ["0x3"])}
+    )
+    assert nft_service.get_indexed_NFTs_by_owner(OWNER) is None
+
+    result = nft_service.get_NFTs_by_owner(OWNER)
+    # 마지막 page 까지 조회하기 전에는 index 를 사용하지 않음
+    assert nft_service.get_indexed_NFTs_by_owner(OWNER) is None
+    nft_service.get_NFTs_by_owner(OWNER, result.cursor)
+
+    nft_service.kas_api.requests.clear()
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER)
+    assert [nft.token_id for nft in result.nfts] == ["0x1", "0x2", "0x3"]
+    assert result.cursor is None
+    assert nft_service.kas_api.requests == []
+
+
+def test_ownership_index_drops_transferred_tokens(tmp_path, monkeypatch):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1", "0x2"])})
+    nft_service.get_NFTs_by_owner(OWNER)
+
+    now = time.time()
+    monkeypatch.setattr(service.time, "time", lambda: now + 10)
+    nft_service.kas_api.pages = {None: (None, ["0x2"])}
+    nft_service.get_NFTs_by_owner(OWNER)
+
+    tokens = repo.get_owned_tokens(models.Chain.KLAYTN, OWNER)
+    assert [token.token_id for token in tokens] == ["0x2"]
+
+
+def test_ownership_index_pending_and_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "OWNERSHIP_PAGE_SIZE", 2)
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1", "0x2", "0x3"])})
+    nft_service.get_NFTs_by_owner(OWNER)
+    # index 에 있지만 cache 되지 않은 nft
+    repo.set_owned_tokens(
+        models.Chain.KLAYTN, OWNER, [("0xcontract", "0x4")], int(time.time())
+    )
+
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER)
+    assert [nft.token_id for nft in result.nfts] == ["0x1", "0x2"]
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER, result.cursor)
+    assert [nft.token_id for nft in result.nfts] == ["0x3"]
+    assert [nft.token_id for nft in result.pending] == ["0x4"]
+    assert result.cursor is None
+
+
+def test_owner_cache_hit_skips_index(tmp_path, monkeypatch):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1"])})
+    nft_service.owner_cache = cache.TieredCache("owner", cache.LRUCache(), None)
+    indexed = []
+    set_owned_tokens = repo.set_owned_tokens
+    monkeypatch.setattr(
+        repo,
+        "set_owned_tokens",
+        lambda *args: indexed.append(args) or set_owned_tokens(*args),
+    )
+
+    nft_service.get_NFTs_by_owner(OWNER)
+    nft_service.get_NFTs_by_owner(OWNER)
+    assert len(indexed) == 1
+    nft_service.get_NFTs_by_owner(OWNER, resync=True)
+    assert len(indexed) == 2
+
+
+def test_indexed_page_reads_only_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "OWNERSHIP_PAGE_SIZE", 2)
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1", "0x2", "0x3", "0x4"])})
+    nft_service.get_NFTs_by_owner(OWNER)
+    reads = []
+    get_owned_tokens = repo.get_owned_tokens
+    monkeypatch.setattr(
+        repo,
+        "get_owned_tokens",
+        lambda *args: reads.append(get_owned_tokens(*args)) or reads[-1],
+    )
+
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER)
+    assert result.cursor == "2"
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER, result.cursor)
+    assert [nft.token_id for nft in result.nfts] == ["0x3", "0x4"]
+    assert result.cursor is None
+    # page 크기 + 1 개만 읽음
+    assert [len(tokens) for tokens in reads] == [3, 2]
+
+
+def test_stale_index_revalidates_in_background(tmp_path, monkeypatch):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = FakeNFTService(repo, {None: (None, ["0x1"])})
+    nft_service.refresher = refresh.BackgroundRefresher()
+    nft_service.get_NFTs_by_owner(OWNER)
+
+    # 새 index 는 다시 조회하지 않음
+    nft_service.kas_api.requests.clear()
+    nft_service.get_indexed_NFTs_by_owner(OWNER)
+    assert len(nft_service.refresher) == 0
+
+    now = time.time()
+    monkeypatch.setattr(
+        service.time, "time", lambda: now + service.OWNERSHIP_REVALIDATE_AFTER + 1
+    )
+    nft_service.kas_api.pages = {None: (None, ["0x1", "0x2"])}
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER)
+    assert [nft.token_id for nft in result.nfts] == ["0x1"]
+
+    deadline = time.monotonic() + 5
+    while len(nft_service.refresher) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    result = nft_service.get_indexed_NFTs_by_owner(OWNER)
+    assert [nft.token_id for nft in result.nfts] == ["0x1", "0x2"]
+    nft_service.refresher.close()
+
+
+def test_refresher_skips_running_key():
+    refresher = refresh.BackgroundRefresher(workers=1)
+    release = threading.Event()
+    calls = []
+
+    def task(value):
+        calls.append(value)
+        release.wait(5)
+
+    first = refresher.submit("key", task, 1)
+    assert refresher.submit("key", task, 2) is None
+    release.set()
+    first.result(5)
+    assert refresher.submit("key", task, 3).result(5) is None
+    assert calls == [1, 3]
+    refresher.close()
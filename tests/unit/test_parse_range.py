@@ -0,0 +1,26 @@
+import pytest
+
+from anv import lib
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=10-", (10, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+        ("bytes=a-b", None),
+        ("bytes=5-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert lib.parse_range(header, 1000) == expected
+
+
+def test_parse_range_not_satisfiable():
+    with pytest.raises(lib.RangeNotSatisfiableError):
+        lib.parse_range("bytes=1000-", 1000)
@@ -0,0 +1,69 @@
+import json
+
+from anv import codec, models, responses
+
+
+def make_nft(**kwargs) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0xcontract",
+        token_id="1",
+        token_type="ERC721",
+        name="nft 1",
+        source_url=models.NftUrl(
+            original="https://bucket/1.png",
+            webp=models.NftUrl(original="https://bucket/1.webp"),
+        ),
+        **kwargs,
+    )
+
+
+def test_to_json_same_as_model_json():
+    nft = make_nft(token_data={"name": "nft 1", "attributes": [{"value": 1.5}]})
+    exclude = {"owner"}
+    assert json.loads(codec.to_json(nft, exclude)) == json.loads(
+        nft.json(exclude=exclude)
+    )
+
+
+def test_to_json_big_int_fallback():
+    nft = make_nft(token_data={"id": 2**70})
+    assert json.loads(codec.to_json(nft))["token_data"]["id"] == 2**70
+
+
+def test_model_response():
+    response = responses.ModelResponse(
+        models.NftResponse(items=[make_nft()]), {"items": {"__all__": {"name"}}}
+    )
+    assert response.media_type == "application/json"
+    item = json.loads(response.body)["items"][0]
+    assert "name" not in item
+    assert item["source_url"]["webp"]["original"] == "https://bucket/1.webp"
+
+
+def test_nft_list_response_splices_fragments():
+    nfts = [make_nft(token_data={"name": "nft 1"}), make_nft(owner="0xowner")]
+    data = models.NftResponse(items=nfts, cursor="next")
+    response = responses.NftListResponse(data, {"token_data"})
+    assert json.loads(response.body) == json.loads(
+        data.json(exclude={"items": {"__all__": {"token_data"}}})
+    )
+    assert all(nft._json is not None for nft in nfts)
+
+
+def test_nft_list_response_projection_not_cached():
+    nft = make_nft()
+    data = models.NftResponse(items=[nft])
+    response = responses.NftListResponse(data, {"token_data", "name"})
+    assert "name" not in json.loads(response.body)["items"][0]
+    assert nft._json is None
+
+
+def test_fragment_invalidated_on_change():
+    nft = make_nft()
+    assert json.loads(codec.fragment(nft))["name"] == "nft 1"
+    nft.token_data = {"name": "nft 1"}
+    assert nft._json is not None
+    nft.name = "renamed"
+    assert nft._json is None
+    assert json.loads(codec.fragment(nft))["name"] == "renamed"
@@ -0,0 +1,92 @@
+import logging
+import random
+import threading
+
+from anv import ingest, models, repository, reveal
+from tests.unit.test_ingest import FakeNFTService
+
+
+class RevealingNFTService(FakeNFTService):
+    def __init__(self, repo):
+        super().__init__(repo)
+        self.revealed = False
+        self.use_cache = []
+
+    def _get_token_data_by_uri(self, uri, deadline=None, use_cache=False):
+        self.use_cache.append(use_cache)
+        token_data = super()._get_token_data_by_uri(uri, deadline, use_cache)
+        if self.revealed:
+            token_data["image"] = f"ipfs://revealed/{token_data['name']}"
+        return token_data
+
+
+def make_scanner(nft_service, sample_size=2):
+    ingester = ingest.CollectionIngester(nft_service, rate=0, resync=True)
+    return reveal.RevealScanner(
+        nft_service, ingester, sample_size=sample_size, rng=random.Random(0)
+    )
+
+
+def test_token_data_hash_ignores_key_order():
+    assert reveal.token_data_hash({"a": 1, "b": [1, 2]}) == reveal.token_data_hash(
+        {"b": [1, 2], "a": 1}
+    )
+    assert reveal.token_data_hash({"a": 1}) != reveal.token_data_hash({"a": 2})
+
+
+def test_unchanged_collection_is_not_refreshed(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = RevealingNFTService(repo)
+    ingest.CollectionIngester(nft_service, rate=0).ingest("0xcontract")
+
+    result = make_scanner(nft_service).scan("0xcontract")
+    assert (result.sampled, result.compared, result.changed) == (2, 2, 0)
+    assert result.refreshed is None
+
+
+def test_revealed_collection_is_refreshed(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    nft_service = RevealingNFTService(repo)
+    ingest.CollectionIngester(nft_service, rate=0).ingest("0xcontract")
+
+    nft_service.revealed = True
+    result = make_scanner(nft_service).scan("0xcontract")
+    assert result.changed == 2
+    assert result.refreshed.saved == 5
+
+    nfts = repo.get_NFT_metadata_by_contract(models.Chain.KLAYTN, "0xcontract")
+    for nft in nfts:
+        token_data = repo.get_NFT_token_data(
+            models.Chain.KLAYTN, "0xcontract", nft.token_id
+        )
+        assert token_data["image"].startswith("ipfs://revealed/")
+
+    # 갱신 후에는 바뀐 token 이 없음
+    result = make_scanner(nft_service).scan("0xcontract")
+    assert (result.changed, result.refreshed) == (0, None)
+
+
+def test_uncached_tokens_are_not_compared(tmp_path):
+    nft_service = RevealingNFTService(repository.SqliteRepository(tmp_path / "nft.db"))
+    result = make_scanner(nft_service, sample_size=10).scan("0xcontract")
+    assert (result.sampled, result.compared, result.refreshed) == (3, 0, None)
+
+
+def test_scan_fetches_token_uri_uncached(tmp_path):
+    nft_service = RevealingNFTService(repository.SqliteRepository(tmp_path / "nft.db"))
+    ingest.CollectionIngester(nft_service, rate=0).ingest("0xcontract")
+
+    nft_service.use_cache.clear()
+    make_scanner(nft_service).scan("0xcontract")
+    assert nft_service.use_cache == [False, False]
+
+
+def test_watch_loop_logs_result(tmp_path, capsys, caplog):
+    nft_service = RevealingNFTService(repository.SqliteRepository(tmp_path / "nft.db"))
+    stop = threading.Event()
+    stop.set()
+
+    with caplog.at_level(logging.INFO, logger="anv.anv.reveal"):
+        make_scanner(nft_service).run(["0xcontract"], stop=stop)
+    assert capsys.readouterr().out == ""
+    assert "reveal scan result" in caplog.text
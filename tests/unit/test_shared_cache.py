@@ -0,0 +1,167 @@
+import pytest
+
+from anv import cache, codec, config, models, repository, service
+from anv.api import kas
+from tests.unit.test_ingest import FakeNFTService
+
+
+def make_nft(token_id: str) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="klaytn",
+        contract_address="0xcontract",
+        token_id=token_id,
+        token_type="KIP-17",
+        name=token_id,
+    )
+
+
+def make_tiered(shared, namespace="test", value_codec=cache.JSON_CODEC):
+    return cache.TieredCache(namespace, cache.LRUCache(), shared, 60, value_codec)
+
+
+class BrokenSharedCache(cache.SharedCache):
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value, ttl):
+        raise ConnectionError("down")
+
+
+def test_workers_share_cache(tmp_path):
+    # 두 worker process 가 같은 sqlite 파일을 사용하는 경우
+    worker1 = make_tiered(cache.SqliteSharedCache(tmp_path / "cache.db"))
+    worker2 = make_tiered(cache.SqliteSharedCache(tmp_path / "cache.db"))
+
+    worker1.set("key", {"uri": "ipfs://a"})
+    assert worker2.get("key") == {"uri": "ipfs://a"}
+    assert worker2.get("key") == {"uri": "ipfs://a"}
+    assert worker2.get("missing") is None
+    assert worker2.stats() == {
+        "local_hits": 1,
+        "shared_hits": 1,
+        "misses": 1,
+        "shared_errors": 0,
+        "local_size": 1,
+    }
+
+
+def test_shared_cache_expires(tmp_path):
+    shared = cache.SqliteSharedCache(tmp_path / "cache.db")
+    shared.set("key", b"value", 60)
+    shared.set("expired", b"value", -1)
+    assert shared.get("key") == b"value"
+    assert shared.get("expired") is None
+    shared.delete("key")
+    assert shared.get("key") is None
+
+
+def test_shared_cache_error_is_miss():
+    tiered = make_tiered(BrokenSharedCache())
+    tiered.set("key", "value")
+    assert tiered.get("key") == "value"  # local
+    assert tiered.get("missing") is None
+    assert tiered.stats()["shared_errors"] == 2
+
+
+def test_metadata_codec_roundtrip():
+    shared = cache.MemorySharedCache()
+    value_codec = (
+        lambda data: codec.encode(data, repository.TOKEN_DATA_EXCLUDE),
+        codec.decode,
+    )
+    worker1 = make_tiered(shared, "metadata", value_codec)
+    worker2 = make_tiered(shared, "metadata", value_codec)
+    worker1.set("key", make_nft("0x1"))
+    assert worker2.get("key") == make_nft("0x1")
+
+
+def test_model_codec_roundtrip():
+    shared = cache.MemorySharedCache()
+    value_codec = cache.model_codec(models.NftMetadata)
+    make_tiered(shared, "owner", value_codec).set("key", make_nft("0x1"))
+    assert make_tiered(shared, "owner", value_codec).get("key") == make_nft("0x1")
+
+
+def test_create_shared_cache(tmp_path):
+    assert cache.create_shared_cache(None) is None
+    assert isinstance(cache.create_shared_cache("memory://"), cache.MemorySharedCache)
+    shared = cache.create_shared_cache(f"sqlite://{tmp_path / 'cache.db'}")
+    assert isinstance(shared, cache.SqliteSharedCache)
+    assert shared.db_path == tmp_path / "cache.db"
+    with pytest.raises(cache.CacheError):
+        cache.create_shared_cache("ftp://cache")
+
+
+def test_token_uri_and_owner_cache_skip_local_with_shared(tmp_path, monkeypatch):
+    # 다른 worker 가 갱신한 항목을 local 에서 계속 읽지 않도록 shared cache 만 사용
+    app_config = config.AppConfig()
+    assert app_config.get_token_uri_cache().local is not None
+    app_config.close()
+
+    monkeypatch.setenv("SHARED_CACHE_URL", f"sqlite:///{tmp_path / 'cache.db'}")
+    app_config = config.AppConfig()
+    token_uri_cache = app_config.get_token_uri_cache()
+    owner_cache = app_config.get_owner_cache("klaytn", models.NftMetadata)
+    assert token_uri_cache.local is None and token_uri_cache.shared is not None
+    assert owner_cache.local is None and owner_cache.shared is not None
+    assert app_config.get_contract_tiered_cache().local is not None
+
+    first = app_config.get_token_uri_cache()
+    other_worker = cache.TieredCache("token_uri", None, app_config.get_shared_cache())
+    first.set("uri", {"name": "placeholder"})
+    other_worker.set("uri", {"name": "revealed"})
+    assert first.get("uri") == {"name": "revealed"}
+    app_config.close()
+
+
+def test_metadata_local_cache(tmp_path, monkeypatch):
+    # worker 마다 가진 metadata cache 는 짧게 유지하고, shared cache 가 있으면 사용하지 않음
+    app_config = config.AppConfig()
+    assert app_config.get_metadata_cache().ttl == cache.LOCAL_TTL
+    app_config.close()
+
+    monkeypatch.setenv("SHARED_CACHE_URL", f"sqlite:///{tmp_path / 'cache.db'}")
+    monkeypatch.setenv("NFT_METADATA_REPOSITORY", "sqlite")
+    monkeypatch.setenv("NFT_METADATA_SQLITE_PATH", str(tmp_path / "nft.db"))
+    app_config = config.AppConfig()
+    assert app_config.get_metadata_cache() is None
+    repo = app_config.get_nft_meta_repository()
+    assert isinstance(repo, repository.CachedMetadataRepository)
+    metadata_cache = app_config._tiered_caches["metadata"]
+    assert metadata_cache.local is None and metadata_cache.ttl == cache.TTL
+    app_config.close()
+
+
+class HttpNFTService(FakeNFTService):
+    _get_token_data_by_uri = service.NFTServiceBase._get_token_data_by_uri
+
+    def __init__(self, repo):
+        super().__init__(repo)
+        self.http_requests = []
+        self.kas_api.update_nft_token_metadata = lambda *args: None
+        self.kas_api.get_nft = lambda *args: {"tokenUri": "https://example.com/1.json"}
+
+    def _get_json_from_http(self, uri, deadline=None):
+        self.http_requests.append(uri)
+        return {"name": "nft", "image": None}
+
+
+def test_token_uri_cache_only_for_listing_miss(tmp_path):
+    nft_service = HttpNFTService(repository.SqliteRepository(tmp_path / "nft.db"))
+    nft_service.token_uri_cache = make_tiered(None, "token_uri")
+    nft = kas.KlaytnOwnedNft(
+        contract_address="0xcontract",
+        token_id="0x1",
+        token_uri="https://example.com/1.json",
+    )
+
+    # 목록 조회의 cache miss 는 token uri cache 를 채우고 사용한다
+    nft_service._get_nft_metadata(nft)
+    nft_service._fetch_nft_metadata(nft, use_cache=True)
+    assert len(nft_service.http_requests) == 1
+
+    # resync, stale 갱신, ingest, reveal scan 은 token uri 를 다시 요청한다
+    nft_service._fetch_nft_metadata(nft)
+    nft_service.get_NFT_by_contract_token_id("0xcontract", "0x1", resync=True)
+    nft_service.build_nft_metadata(nft)
+    assert len(nft_service.http_requests) == 4
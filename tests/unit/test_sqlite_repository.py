@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+
+import orjson
+
+from anv import codec, models, repository
+
+
+def make_nft(token_id: str, contract_address: str = "0xcontract") -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address=contract_address,
+        token_id=token_id,
+        token_type="ERC721",
+        name=f"nft {token_id}",
+        token_data={"name": f"nft {token_id}"},
+        cached=False,
+    )
+
+
+def test_set_and_get(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    assert repo.set_NFT_metadata(make_nft("1"))
+
+    result = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert result.name == "nft 1"
+    assert result.cached
+    # token_data 는 따로 조회
+    assert result.token_data is None
+    assert repo.get_NFT_token_data(models.Chain.ETHEREUM, "0xcontract", "1") == {
+        "name": "nft 1"
+    }
+    assert repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "2") is None
+
+
+def test_scan_by_contract(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    repo.set_NFT_metadata_many(
+        [make_nft(str(i)) for i in range(5)] + [make_nft("9", "0xother")]
+    )
+
+    page = repo.get_NFT_metadata_by_contract(
+        models.Chain.ETHEREUM, "0xcontract", limit=3
+    )
+    assert [nft.token_id for nft in page] == ["0", "1", "2"]
+    page = repo.get_NFT_metadata_by_contract(
+        models.Chain.ETHEREUM, "0xcontract", after_token_id="2"
+    )
+    assert [nft.token_id for nft in page] == ["3", "4"]
+
+
+def test_concurrent_threads(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+
+    def write(i):
+        repo.set_NFT_metadata(make_nft(str(i)))
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    page = repo.get_NFT_metadata_by_contract(models.Chain.ETHEREUM, "0xcontract")
+    assert len(page) == 10
+
+
+def test_tiered_repository_backfills_local(tmp_path):
+    local = repository.SqliteRepository(tmp_path / "local.db")
+    remote = repository.SqliteRepository(tmp_path / "remote.db")
+    remote.set_NFT_metadata(make_nft("1"))
+    repo = repository.TieredRepository(local, remote)
+
+    assert repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert local.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+
+
+def test_set_without_token_data_keeps_token_data(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    repo.set_NFT_metadata(make_nft("1"))
+
+    cached = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    cached.content_type = "image/png"
+    repo.set_NFT_metadata(cached)
+
+    assert repo.get_NFT_token_data(models.Chain.ETHEREUM, "0xcontract", "1") == {
+        "name": "nft 1"
+    }
+
+
+def test_fragment_stored_with_metadata(tmp_path):
+    repo = repository.SqliteRepository(tmp_path / "nft.db")
+    repo.set_NFT_metadata(make_nft("1"))
+
+    result = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert result._json is not None
+    assert orjson.loads(result._json) == result.dict(exclude={"token_data"})
+
+
+def test_fragment_column_added_to_old_db(tmp_path):
+    db_path = tmp_path / "nft.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE nft_metadata (chain TEXT NOT NULL,"
+            " contract_address TEXT NOT NULL, token_id TEXT NOT NULL,"
+            " data BLOB NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (chain, contract_address, token_id)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "INSERT INTO nft_metadata VALUES (?, ?, ?, ?, ?)",
+            ("ethereum", "0xcontract", "1", make_nft("1").json().encode(), 0),
+        )
+    conn.close()
+
+    repo = repository.SqliteRepository(db_path)
+    result = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert result.name == "nft 1"
+    assert result._json is None
+    repo.set_NFT_metadata(make_nft("1"))
+    result = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert result._json is not None
+
+
+def test_disk_repository_keeps_token_data(tmp_path):
+    repo = repository.DiskRepository()
+    repo.repo_dir = tmp_path
+    repo.set_NFT_metadata(make_nft("1"))
+
+    cached = repo.get_NFT_metadata(models.Chain.ETHEREUM, "0xcontract", "1")
+    assert cached.token_data is None
+    cached.content_type = "image/png"
+    repo.set_NFT_metadata(cached)
+    assert repo.get_NFT_token_data(models.Chain.ETHEREUM, "0xcontract", "1") == {
+        "name": "nft 1"
+    }
+
+
+def test_mongodb_update_unsets_cleared_fields():
+    # reveal 후 None 이 된 항목은 $set 에 없으므로 $unset 으로 지움
+    nft = make_nft("0x1")
+    nft.animation_url = None
+    update = repository.metadata_update(codec.to_document(nft))
+    assert update["$set"]["name"] == nft.name
+    assert "animation_url" in update["$unset"]
+    assert "token_data" not in update["$unset"]
+    assert "name" not in update["$unset"]
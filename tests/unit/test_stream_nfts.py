@@ -0,0 +1,141 @@
+import json
+from typing import Optional
+
+import pydantic
+import pytest
+from fastapi.testclient import TestClient
+
+from anv import main, models, service
+
+
+class FakeOwnedNft(pydantic.BaseModel):
+    contract_address: str
+    token_id: str
+
+
+class FakeOwnedNftResult(pydantic.BaseModel):
+    cursor: Optional[str]
+    owned_nfts: list
+
+
+def make_nft(token_id: str, cached: bool) -> models.NftMetadata:
+    return models.NftMetadata(
+        chain="ethereum",
+        contract_address="0xcontract",
+        token_id=token_id,
+        token_type="ERC721",
+        name=f"nft {token_id}",
+        cached=cached,
+    )
+
+
+class FakeNFTService(service.NFTServiceBase):
+    token_errors = (service.NFTServiceTokenDataError,)
+
+    def __init__(self):
+        self.pages = {
+            None: FakeOwnedNftResult(
+                cursor="page2",
+                owned_nfts=[
+                    FakeOwnedNft(contract_address="0xcontract", token_id="1"),
+                    FakeOwnedNft(contract_address="0xcontract", token_id="2"),
+                ],
+            ),
+            "page2": FakeOwnedNftResult(
+                cursor=None,
+                owned_nfts=[
+                    FakeOwnedNft(contract_address="0xcontract", token_id="3"),
+                    FakeOwnedNft(contract_address="0xcontract", token_id="4"),
+                ],
+            ),
+        }
+        self.cached = {"2"}
+
+    def _get_owned_nfts(self, owner, cursor):
+        return self.pages[cursor]
+
+    def _get_token_key(self, nft):
+        return nft.contract_address, nft.token_id
+
+    def _get_cached_nft_metadata(self, nft):
+        if nft.token_id in self.cached:
+            return make_nft(nft.token_id, cached=True)
+        return None
+
+    def _get_nft_metadata_from_api(self, nft, deadline=None, use_cache=False):
+        if nft.token_id == "4":
+            raise service.NFTServiceTokenDataError("broken token uri")
+        return make_nft(nft.token_id, cached=False)
+
+
+def test_iter_nfts_by_owner_cached_first():
+    nfts = list(FakeNFTService().iter_NFTs_by_owner("0xowner"))
+    assert [nft.token_id for nft in nfts] == ["2", "1", "3"]
+    assert nfts[0].cached
+
+
+def test_iter_nfts_by_owner_resync():
+    nfts = list(FakeNFTService().iter_NFTs_by_owner("0xowner", resync=True))
+    assert sorted(nft.token_id for nft in nfts) == ["1", "2", "3"]
+    assert not any(nft.cached for nft in nfts)
+
+
+def test_stream_nfts_ndjson():
+    task_list = []
+    nfts = [make_nft("1", cached=True), make_nft("2", cached=False)]
+    lines = list(main.stream_nfts(iter(nfts), models.StreamFormat.NDJSON, task_list))
+    assert [json.loads(line)["token_id"] for line in lines] == ["1", "2"]
+    assert len(task_list) == 2
+
+
+def test_stream_nfts_sse():
+    nfts = [make_nft("1", cached=True)]
+    events = list(main.stream_nfts(iter(nfts), models.StreamFormat.SSE, []))
+    assert events[0].startswith("event: nft\ndata: ")
+    assert events[-1] == "event: end\ndata: {}\n\n"
+
+
+def test_stream_nfts_error_line():
+    def broken_nfts():
+        yield make_nft("1", cached=True)
+        raise service.NFTServiceError("upstream error")
+
+    lines = list(main.stream_nfts(broken_nfts(), models.StreamFormat.NDJSON, []))
+    assert json.loads(lines[0])["token_id"] == "1"
+    assert json.loads(lines[-1]) == {"error": "upstream error"}
+
+    events = list(main.stream_nfts(broken_nfts(), models.StreamFormat.SSE, []))
+    assert events[-1] == 'event: error\ndata: {"error":"upstream error"}\n\n'
+
+
+def test_incomplete_service_fails_at_construction():
+    class IncompleteNFTService(service.NFTServiceBase):
+        def _get_owned_nfts(self, owner, cursor, deadline=None):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteNFTService(None)
+
+
+class TokenDataNFTService:
+    """cache 에서 읽은 token_data 없는 nft 를 전송하는 service"""
+
+    def iter_NFTs_by_owner(self, chain, owner, resync=False):
+        yield make_nft("1", cached=True)
+
+    def load_token_data(self, nfts):
+        return [nft.copy(update={"token_data": {"name": nft.name}}) for nft in nfts]
+
+
+def test_stream_cached_nft_with_token_data():
+    main.app.dependency_overrides[main.get_nft_service] = TokenDataNFTService
+    main.app.dependency_overrides[main.get_nft_src_repository] = lambda: None
+    try:
+        client = TestClient(main.app)
+        response = client.get(
+            "/v1/nfts/ethereum/stream?owner=0xowner&fields=name,token_data"
+        )
+    finally:
+        main.app.dependency_overrides.clear()
+    lines = response.text.splitlines()
+    assert json.loads(lines[0])["token_data"] == {"name": "nft 1"}
@@ -0,0 +1,84 @@
+from concurrent import futures
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from anv import render, workers
+
+SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="50">'
+    '<rect x="0" y="0" width="100" height="50" fill="#713f1d"/></svg>'
+)
+
+
+def slow_task(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_render_svg_max_size():
+    png = render.render_svg_to_png(SVG, dpi=72 * 10, max_size=200)
+    assert Image.open(io.BytesIO(png)).size == (200, 100)
+
+
+def test_render_svg_too_complex():
+    svg = "<svg>" + "<rect/>" * (render.SVG_MAX_ELEMENTS + 1) + "</svg>"
+    with pytest.raises(render.SvgTooComplexError):
+        render.render_svg_to_png(svg)
+
+
+def test_svg_renderer_cache(tmp_path, monkeypatch):
+    renderer = render.SvgRenderer(cache_dir=tmp_path, max_size=200)
+    png = renderer.render(SVG)
+    assert len(list(tmp_path.glob("*/*.png"))) == 1
+
+    def fail(*args):
+        raise AssertionError("cached svg rendered again")
+
+    monkeypatch.setattr(render, "render_svg_to_png", fail)
+    assert renderer.render(SVG) == png
+
+
+def test_worker_pool_timeout():
+    pool = workers.ProcessWorkerPool(processes=1)
+    try:
+        assert pool.run(slow_task, 0, timeout=5) == 0
+        with pytest.raises(workers.WorkerTimeoutError):
+            pool.run(slow_task, 10, timeout=0.5)
+        # timeout 후 새 worker 로 계속 실행 가능
+        assert pool.run(slow_task, 0, timeout=5) == 0
+    finally:
+        pool.close()
+
+
+def test_worker_timeout_keeps_other_tasks():
+    # timeout 된 작업의 worker 만 종료되고 다른 worker 의 작업은 끝까지 실행
+    pool = workers.ProcessWorkerPool(processes=2)
+    try:
+        with futures.ThreadPoolExecutor(max_workers=2) as exec:
+            other = exec.submit(pool.run, slow_task, 1, timeout=5)
+            time.sleep(0.1)
+            with pytest.raises(workers.WorkerTimeoutError):
+                pool.run(slow_task, 10, timeout=0.3)
+            assert other.result() == 1
+    finally:
+        pool.close()
+
+
+def test_svg_renderer_cache_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(render, "SVG_CACHE_EVICT_EVERY", 1)
+    renderer = render.SvgRenderer(cache_dir=tmp_path, max_size=50)
+    first = SVG.replace("#713f1d", "#000001")
+    renderer.render(first)
+    first_path = renderer._get_cache_path(first)
+    os.utime(first_path, (0, 0))
+    renderer.cache_max_bytes = first_path.stat().st_size * 2
+
+    renderer.render(SVG.replace("#713f1d", "#000002"))
+    renderer.render(SVG.replace("#713f1d", "#000003"))
+    # 크기 제한을 넘으면 가장 오래 사용하지 않은 결과부터 삭제
+    assert not first_path.exists()
+    assert len(list(tmp_path.glob("*/*.png"))) == 2
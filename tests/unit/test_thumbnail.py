@@ -0,0 +1,173 @@
+import io
+from typing import Dict
+
+from PIL import Image
+
+from anv import models, repository, thumbnail
+
+
+def make_png(width: int, height: int) -> bytes:
+    with io.BytesIO() as buffer:
+        Image.new("RGB", (width, height), "#713f1d").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+class FakeS3Storage:
+    base_url = "https://bucket.s3.local/"
+
+    def __init__(self):
+        self.objects: Dict[str, bytes] = {}
+        self.content_types: Dict[str, str] = {}
+
+    def upload_object(self, file_obj, key, extra_args):
+        self.objects[key] = file_obj.read()
+        self.content_types[key] = extra_args["ContentType"]
+
+    def list_object(self, prefix):
+        keys = sorted(key for key in self.objects if key.startswith(prefix))
+        return {"Contents": [{"Key": key} for key in keys]}
+
+    def find_first_object(self, prefix):
+        contents = self.list_object(prefix)["Contents"]
+        return contents[0] if contents else None
+
+    def get_object(self, key):
+        return {
+            "ResponseMetadata": {
+                "HTTPHeaders": {"content-type": self.content_types[key]}
+            },
+            "Body": io.BytesIO(self.objects[key]),
+        }
+
+
+class FakeSourceRepository(repository.AWSS3SourceRepository):
+    def __init__(self, s3_storage, data: bytes):
+        super().__init__(s3_storage, repository.DBRepository(), None)
+        self.data = data
+        self.downloads = 0
+
+    def _get_binary_from_uri(self, uri, buffer):
+        self.downloads += 1
+        buffer.write(self.data)
+        return buffer
+
+
+def test_make_thumbnails_skips_larger_heights():
+    thumbnails = thumbnail.make_thumbnails(make_png(1200, 600))
+    assert sorted(thumbnails) == [250, 500]
+    assert Image.open(io.BytesIO(thumbnails[250].data)).size == (500, 250)
+    assert thumbnails[250].content_type == "image/png"
+
+
+def test_cache_uri_source_uploads_thumbnails():
+    s3 = FakeS3Storage()
+    repo = FakeSourceRepository(s3, make_png(1200, 600))
+
+    nft_url = repo._cache_uri_source("https://example.com/1.png")
+
+    uri_hash = repository.get_sha256("https://example.com/1.png")
+    assert nft_url.original == f"{s3.base_url}{uri_hash}.png"
+    assert nft_url.h250 == f"{s3.base_url}resized/{uri_hash}_h250.png"
+    assert nft_url.h500 == f"{s3.base_url}resized/{uri_hash}_h500.png"
+    # 원본보다 큰 크기는 원본 url
+    assert nft_url.h1000 == nft_url.original
+    assert f"resized/{uri_hash}_h250.png" in s3.objects
+
+    # 이미 저장된 source 는 다시 받거나 resize 하지 않음
+    assert repo._cache_uri_source("https://example.com/1.png") == nft_url
+    assert repo.downloads == 1
+
+
+def test_cache_uri_source_not_image():
+    s3 = FakeS3Storage()
+    repo = FakeSourceRepository(s3, b"not an image")
+
+    nft_url = repo._cache_uri_source("https://example.com/1.txt")
+
+    assert nft_url.content_type == "text/plain"
+    assert nft_url.h250 is None
+
+
+def make_gif(frames: int, size: int = 100) -> bytes:
+    images = [Image.new("RGB", (size, size), (i * 80, 0, 0)) for i in range(frames)]
+    with io.BytesIO() as buffer:
+        images[0].save(buffer, format="GIF", save_all=True, append_images=images[1:])
+        return buffer.getvalue()
+
+
+def test_make_variants_webp():
+    variants = thumbnail.make_variants(make_png(1200, 600), formats=["WEBP"])
+    assert sorted(variants["WEBP"], key=str) == [250, 500, None]
+    webp = Image.open(io.BytesIO(variants["WEBP"][None].data))
+    assert webp.format == "WEBP"
+    assert webp.size == (1200, 600)
+
+
+def test_make_variants_animated_gif():
+    variants = thumbnail.make_variants(make_gif(3), formats=["WEBP"])
+    # 원본보다 작은 높이가 없으므로 resize 하지 않음
+    assert variants[None] == {}
+    webp = Image.open(io.BytesIO(variants["WEBP"][None].data))
+    assert webp.is_animated
+
+
+def test_make_variants_resizes_animation():
+    variants = thumbnail.make_variants(make_gif(3, 600), formats=["WEBP"])
+    assert sorted(variants[None]) == [250, 500]
+    resized = Image.open(io.BytesIO(variants[None][250].data))
+    assert resized.size == (250, 250)
+    assert resized.n_frames == 3
+    assert variants[None][250].content_type == "image/png"
+    webp = Image.open(io.BytesIO(variants["WEBP"][250].data))
+    assert webp.size == (250, 250) and webp.n_frames == 3
+
+
+def test_make_variants_skips_failed_encoder(monkeypatch):
+    save = thumbnail._save
+
+    def broken_webp(img, img_format, formats, **options):
+        if img_format == "WEBP":
+            raise OSError("encoder webp not available")
+        return save(img, img_format, formats, **options)
+
+    monkeypatch.setattr(thumbnail, "_save", broken_webp)
+    variants = thumbnail.make_variants(make_png(1200, 600), formats=["WEBP"])
+    assert list(variants) == [None]
+    assert sorted(variants[None]) == [250, 500]
+
+
+def test_cache_uri_source_webp_url():
+    s3 = FakeS3Storage()
+    repo = FakeSourceRepository(s3, make_png(1200, 600))
+    repo.image_formats = ("WEBP",)
+
+    nft_url = repo._cache_uri_source("https://example.com/1.png")
+
+    uri_hash = repository.get_sha256("https://example.com/1.png")
+    assert nft_url.webp.original == f"{s3.base_url}resized/{uri_hash}.webp"
+    assert nft_url.webp.h250 == f"{s3.base_url}resized/{uri_hash}_h250.webp"
+    assert nft_url.webp.h1000 == nft_url.webp.original
+    assert nft_url.webp.content_type == "image/webp"
+
+    # S3 에 저장된 이미지로 같은 url 을 만듦
+    assert repo._cache_uri_source("https://example.com/1.png") == nft_url
+    assert repo.downloads == 1
+
+
+def test_cache_nft_source_download_failure():
+    s3 = FakeS3Storage()
+    repo = FakeSourceRepository(s3, b"")
+    nft = models.NftMetadata(
+        chain="klaytn",
+        contract_address="0xcontract",
+        token_id="0x1",
+        token_type="KIP17",
+        name="nft",
+        image="https://example.com/1.png",
+    )
+
+    repo.cache_nft_source(nft)
+
+    # 받지 못한 source 는 빈 object 를 저장하지 않고 source_url 도 비워둠
+    assert s3.objects == {}
+    assert nft.source_url is None
@@ -0,0 +1,92 @@
+import pytest
+
+from anv import models, repository, video
+from tests.unit.test_thumbnail import FakeS3Storage, FakeSourceRepository, make_png
+
+MP4 = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom" + b"\x00" * 64
+
+
+def test_cache_uri_source_video_assets(monkeypatch):
+    calls = []
+
+    def extract_video_assets(path, content_type):
+        calls.append(content_type)
+        return video.VideoAssets(b"poster", b"preview", "video/mp4")
+
+    monkeypatch.setattr(video, "extract_video_assets", extract_video_assets)
+    s3 = FakeS3Storage()
+    repo = FakeSourceRepository(s3, MP4)
+
+    nft_url = repo._cache_uri_source("https://example.com/1.mp4")
+
+    uri_hash = repository.get_sha256("https://example.com/1.mp4")
+    assert nft_url.content_type == "video/mp4"
+    assert nft_url.poster == f"{s3.base_url}resized/{uri_hash}_poster.jpg"
+    assert nft_url.preview == f"{s3.base_url}resized/{uri_hash}_preview.mp4"
+    assert nft_url.h250 is None
+    assert s3.content_types[f"resized/{uri_hash}_poster.jpg"] == "image/jpeg"
+
+    # S3 에 저장된 poster, preview 를 다시 만들지 않음
+    assert repo._cache_uri_source("https://example.com/1.mp4") == nft_url
+    assert calls == ["video/mp4"]
+
+
+def test_ffmpeg_not_found(monkeypatch, tmp_path):
+    monkeypatch.setattr(video, "FFMPEG", str(tmp_path / "ffmpeg"))
+    with pytest.raises(video.VideoError):
+        video.extract_video_assets(str(tmp_path / "1.mp4"), "video/mp4")
+
+
+class MediaSourceRepository(FakeSourceRepository):
+    """uri 별로 다른 source 를 받는 repository"""
+
+    def __init__(self, s3_storage, sources):
+        super().__init__(s3_storage, b"")
+        self.sources = sources
+        self.repo = FakeMetadataRepository()
+
+    def _get_binary_from_uri(self, uri, buffer):
+        buffer.write(self.sources[uri])
+        return buffer
+
+
+class FakeMetadataRepository:
+    def set_NFT_metadata(self, nft):
+        self.saved = nft
+
+
+def test_video_nft_with_preview_image(monkeypatch):
+    # image 가 있는 video nft 도 animation_url 로 poster, preview 를 만든다
+    monkeypatch.setattr(
+        video,
+        "extract_video_assets",
+        lambda path, content_type: video.VideoAssets(
+            b"poster", b"preview", "video/mp4"
+        ),
+    )
+    s3 = FakeS3Storage()
+    repo = MediaSourceRepository(
+        s3,
+        {
+            "https://example.com/1.png": make_png(600, 600),
+            "https://example.com/1.mp4": MP4,
+        },
+    )
+    nft = models.NftMetadata(
+        chain="klaytn",
+        contract_address="0xcontract",
+        token_id="0x1",
+        token_type="KIP17",
+        name="nft",
+        image="https://example.com/1.png",
+        animation_url="https://example.com/1.mp4",
+    )
+
+    repo.cache_nft_source(nft)
+
+    image_hash = repository.get_sha256("https://example.com/1.png")
+    video_hash = repository.get_sha256("https://example.com/1.mp4")
+    assert nft.source_url.content_type == "image/png"
+    assert nft.source_url.h250 == f"{s3.base_url}resized/{image_hash}_h250.png"
+    assert nft.source_url.poster == f"{s3.base_url}resized/{video_hash}_poster.jpg"
+    assert nft.source_url.preview == f"{s3.base_url}resized/{video_hash}_preview.mp4"
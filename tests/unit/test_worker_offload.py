@@ -0,0 +1,75 @@
+import base64
+import json
+import time
+
+import pytest
+
+from anv import codec, repository, service, timeouts, workers
+
+TOKEN_JSON = {"name": "on-chain", "image": "data:image/svg+xml;utf8,<svg/>"}
+
+
+def slow_decode(data):
+    time.sleep(5)
+    return codec.decode_json(data)
+
+
+@pytest.fixture
+def pool():
+    pool = workers.ProcessWorkerPool(processes=1)
+    yield pool
+    pool.close()
+
+
+def test_run_with_shared_buffer(pool, monkeypatch):
+    data = json.dumps(TOKEN_JSON).encode("utf-8")
+    assert pool.run_with_buffer(codec.decode_json, data) == TOKEN_JSON
+    # 큰 buffer 는 shared memory 로 전달
+    monkeypatch.setattr(workers, "SHARED_MEMORY_MIN_BYTES", 1)
+    assert pool.run_with_buffer(codec.decode_json, data) == TOKEN_JSON
+    with pytest.raises(ValueError):
+        pool.run_with_buffer(codec.decode_json, b"{")
+
+
+def test_base64_token_json_offload(pool, monkeypatch):
+    nft_service = service.KlaytnNFTService(None, None, None)
+    uri = "data:application/json;base64," + base64.b64encode(
+        json.dumps(TOKEN_JSON).encode("utf-8")
+    ).decode("ascii")
+    assert nft_service._get_token_data_by_uri(uri) == TOKEN_JSON
+
+    nft_service.worker_pool = pool
+    monkeypatch.setattr(service, "TOKEN_JSON_OFFLOAD_BYTES", 1)
+    monkeypatch.setattr(workers, "SHARED_MEMORY_MIN_BYTES", 1)
+    assert nft_service._get_token_data_by_uri(uri) == TOKEN_JSON
+
+
+def test_token_json_decode_timeout(pool, monkeypatch):
+    # token json 오류가 아니므로 timeout 으로 처리
+    nft_service = service.KlaytnNFTService(None, None, None, worker_pool=pool)
+    monkeypatch.setattr(service, "TOKEN_JSON_OFFLOAD_BYTES", 1)
+    monkeypatch.setattr(service, "TOKEN_JSON_DECODE_TIMEOUT", 0.2)
+    data = json.dumps(TOKEN_JSON).encode("utf-8")
+    with pytest.raises(service.NFTServiceTimeoutError):
+        nft_service._decode_token_json(slow_decode, data)
+    assert nft_service._decode_token_json(codec.decode_json, data) == TOKEN_JSON
+
+
+def test_token_json_decode_bounded_by_deadline(pool, monkeypatch):
+    nft_service = service.KlaytnNFTService(None, None, None, worker_pool=pool)
+    monkeypatch.setattr(service, "TOKEN_JSON_OFFLOAD_BYTES", 1)
+    data = json.dumps(TOKEN_JSON).encode("utf-8")
+
+    # 남은 시간이 TOKEN_JSON_DECODE_TIMEOUT 보다 짧으면 남은 시간까지만 기다림
+    started = time.monotonic()
+    with pytest.raises(service.NFTServiceTimeoutError):
+        nft_service._decode_token_json(slow_decode, data, timeouts.Deadline(0.2))
+    assert time.monotonic() - started < service.TOKEN_JSON_DECODE_TIMEOUT
+    # 이미 마감된 요청은 worker 에 보내지 않음
+    with pytest.raises(service.NFTServiceTimeoutError):
+        nft_service._decode_token_json(codec.decode_json, data, timeouts.Deadline(0))
+
+
+def test_mime_type_uses_head_of_source():
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg">' + b"<rect/>" * 100_000 + b"</svg>"
+    assert repository.get_mime_type(svg) == "image/svg+xml"